@@ -0,0 +1,206 @@
+"""
+Benchmark the compiled KeywordClassifier against the original list-scanning heuristics
+
+Usage:
+    python benchmarks/classifier_benchmark.py [--lines 20000] [--repeat 3]
+
+The reference functions below are the classifiers as they were before the
+compiled matcher was introduced; the benchmark also checks that both the
+per-line classifier and the vectorized classify_frame() produce identical
+results on the generated corpus.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nca_questionnaire.classifier import get_keyword_classifier  # noqa: E402
+
+
+# =================== REFERENCE (LIST-SCANNING) IMPLEMENTATION ===================
+
+def reference_is_question_line(line: str) -> bool:
+    question_indicators = [
+        '?', 'Please', 'Was', 'Were', 'Does', 'Is', 'Date', 'Document',
+        'Client', 'Site', 'Rationale', 'The entity', 'The annual',
+        'confirm', 'select', 'identify', 'provide', 'performed'
+    ]
+    
+    return (any(indicator in line for indicator in question_indicators)
+            and len(line) > 10
+            and not line.lower() in ['yes', 'no', 'test', 'test-director'])
+
+
+def reference_infer_question_type(question: str) -> str:
+    question_lower = question.lower()
+    
+    if '?' in question and ('yes' in question_lower or 'no' in question_lower or 'was' in question_lower or 'were' in question_lower or 'does' in question_lower or 'is' in question_lower):
+        return 'yes_no'
+    elif 'date' in question_lower:
+        return 'date'
+    elif 'select' in question_lower or 'choose' in question_lower:
+        return 'selection'
+    elif 'number' in question_lower or 'amount' in question_lower:
+        return 'numeric'
+    else:
+        return 'text'
+
+
+def reference_categorize_question(question: str) -> str:
+    question_lower = question.lower()
+    
+    categories = {
+        'Target Market Assessment': ['target market', 'assessment', 'sales force'],
+        'Site Visitation': ['site visit', 'physical', 'business operating address'],
+        'Business Operations': ['business', 'trading', 'operations', 'revenue'],
+        'Entity Structure': ['entity', 'ownership', 'shareholders', 'beneficial'],
+        'Staffing': ['employee', 'staff', 'personnel'],
+        'Compliance': ['compliance', 'regulatory', 'cii account', 'relationship'],
+        'Financial': ['financial', 'revenue', 'sales', 'l2group'],
+        'Documentation': ['document', 'provide', 'evidence']
+    }
+    
+    for category, keywords in categories.items():
+        if any(keyword in question_lower for keyword in keywords):
+            return category
+    
+    return 'General'
+
+
+def reference_extract_regulatory_context(question: str) -> str:
+    regulatory_terms = [
+        'CII account', 'L2group', 'beneficial owner', 'CSSP', 'SOEID',
+        'compliance', 'regulatory', 'assessment', 'due diligence'
+    ]
+    
+    found_terms = [term for term in regulatory_terms if term.lower() in question.lower()]
+    return ', '.join(found_terms) if found_terms else 'General'
+
+
+def reference_identify_compliance_area(question: str) -> str:
+    compliance_areas = {
+        'KYC': ['know your customer', 'client', 'customer', 'identity'],
+        'AML': ['anti money laundering', 'suspicious', 'transaction'],
+        'CDD': ['customer due diligence', 'beneficial owner', 'ownership'],
+        'Operational': ['site visit', 'physical', 'operations', 'staff'],
+        'Financial': ['revenue', 'sales', 'trading', 'financial']
+    }
+    
+    question_lower = question.lower()
+    for area, keywords in compliance_areas.items():
+        if any(keyword in question_lower for keyword in keywords):
+            return area
+    
+    return 'General'
+
+
+def reference_classify(line: str) -> Dict[str, object]:
+    return {
+        'is_question': reference_is_question_line(line),
+        'question_type': reference_infer_question_type(line),
+        'category': reference_categorize_question(line),
+        'compliance_area': reference_identify_compliance_area(line),
+        'regulatory_context': reference_extract_regulatory_context(line)
+    }
+
+
+# =================== CORPUS AND TIMING ===================
+
+FRAGMENTS = [
+    'Does the entity maintain', 'Please provide evidence of', 'Was a site visit performed at',
+    'the business operating address', 'beneficial owner', 'CII account', 'L2group', 'SOEID',
+    'Date of the last assessment', 'Select the target market', 'customer due diligence',
+    'anti money laundering controls', 'suspicious transaction', 'annual revenue', 'number of staff',
+    'shareholders and ownership', 'the regulatory relationship', 'Yes', 'No', 'N/A', 'Section 4.2',
+    'Rationale for the rating', 'Client identity documents', 'sales force', 'physical premises',
+    'The annual review', 'employee headcount', 'trading activities', 'compliance officer'
+]
+
+
+def generate_lines(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        line = ' '.join(rng.sample(FRAGMENTS, rng.randint(1, 4)))
+        if rng.random() < 0.4:
+            line += '?'
+        lines.append(line)
+    return lines
+
+
+def run(lines: List[str], repeat: int) -> Dict[str, float]:
+    classifier = get_keyword_classifier()
+    
+    mismatches: List[Optional[str]] = []
+    for line in lines:
+        result = classifier.classify(line)
+        compiled = {
+            'is_question': result.is_question,
+            'question_type': result.question_type,
+            'category': result.category,
+            'compliance_area': result.compliance_area,
+            'regulatory_context': result.regulatory_context
+        }
+        if compiled != reference_classify(line):
+            mismatches.append(line)
+    
+    series = pd.Series(lines)
+    frame = classifier.classify_frame(series)
+    for line, row in zip(lines, frame.drop(columns='has_select').to_dict('records')):
+        if row != reference_classify(line):
+            mismatches.append(line)
+    
+    def best_of(fn) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for line in lines:
+                fn(line)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    
+    reference_seconds = best_of(reference_classify)
+    compiled_seconds = best_of(classifier.classify)
+    
+    frame_timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        classifier.classify_frame(series)
+        frame_timings.append(time.perf_counter() - start)
+    frame_seconds = min(frame_timings)
+    
+    return {
+        'lines': len(lines),
+        'mismatches': len(mismatches),
+        'reference_seconds': reference_seconds,
+        'compiled_seconds': compiled_seconds,
+        'reference_us_per_line': reference_seconds / len(lines) * 1e6,
+        'compiled_us_per_line': compiled_seconds / len(lines) * 1e6,
+        'speedup': reference_seconds / compiled_seconds if compiled_seconds else float('inf'),
+        'frame_seconds': frame_seconds,
+        'frame_us_per_line': frame_seconds / len(lines) * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    results = run(generate_lines(args.lines), args.repeat)
+    for key, value in results.items():
+        print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    
+    if results['mismatches']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
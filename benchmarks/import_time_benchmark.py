@@ -0,0 +1,94 @@
+"""
+Import-time regression check for chatbot-only and validation-only workers
+
+Usage:
+    python benchmarks/import_time_benchmark.py [--repeat 5] [--budget-ms 250]
+
+Each scenario runs in a fresh interpreter. The median time to import (and, for
+the bot scenario, construct the system and bot) must stay under the budget,
+and none of the heavy ingest dependencies may be loaded. Exits with status 1
+when a scenario is over budget or pulls in a heavy module, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['fitz', 'pymupdf', 'pandas', 'numpy', 'google.generativeai', 'chromadb', 'sentence_transformers']
+
+SCENARIOS = {
+    'package': "import nca_questionnaire",
+    'shim': "import main_new; main_new.NCAQuestionnaireBot",
+    'validation': (
+        "from nca_questionnaire.models import Question, QuestionType\n"
+        "from nca_questionnaire.bot import NCAQuestionnaireBot\n"
+        "question = Question('q1', 'Is the entity regulated?', QuestionType.YES_NO, 'General', 'Qatar')\n"
+        "NCAQuestionnaireBot._validate_answer(None, question, 'Yes')"
+    ),
+    'bot': (
+        "from nca_questionnaire import NCAQuestionnaireBot, NCAQuestionnaireSystem\n"
+        "system = NCAQuestionnaireSystem('offline', db_path=DB_PATH)\n"
+        "bot = NCAQuestionnaireBot(system)"
+    ),
+}
+
+RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+DB_PATH = {db_path!r}
+exec(compile({code!r}, '<scenario>', 'exec'))
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def run_scenario(code: str, db_path: str) -> Dict[str, Any]:
+    script = RUNNER.format(db_path=db_path, code=code, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(repeat: int, budget_ms: float) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="nca_import_") as db_path:
+        for name, code in SCENARIOS.items():
+            runs = [run_scenario(code, db_path) for _ in range(repeat)]
+            median_ms = statistics.median(run['seconds'] for run in runs) * 1000
+            heavy = sorted(set(module for run in runs for module in run['heavy']))
+            results.append({
+                'scenario': name,
+                'median_ms': median_ms,
+                'max_ms': max(run['seconds'] for run in runs) * 1000,
+                'heavy_modules': heavy,
+                'ok': median_ms <= budget_ms and not heavy
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help='Maximum median import time of each scenario')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.budget_ms)
+    for result in results:
+        status = 'ok' if result['ok'] else 'FAIL'
+        heavy = ', '.join(result['heavy_modules']) or '-'
+        print(f"{result['scenario']:>12}: median {result['median_ms']:7.1f} ms  "
+              f"max {result['max_ms']:7.1f} ms  heavy: {heavy}  [{status}]")
+    print(f"budget: {args.budget_ms:.0f} ms")
+    sys.exit(0 if all(result['ok'] for result in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Scanned-page benchmark: OCR fallback, OCR cache and blank-page skipping
+
+Usage:
+    python benchmarks/ocr_benchmark.py [--pages 30] [--scanned-every 3] [--blank-every 7]
+                                       [--ocr-latency-ms 200] [--ocr-processes 4] [--json results.json]
+
+Builds a questionnaire in which every scanned-every-th page is an image with no
+text layer and every blank-every-th page is empty, then uploads it without
+OCR, with a cold OCR cache and again with a warm one, and finally through the
+bulk pipeline. Tesseract is replaced by a deterministic engine with a fixed
+per-page cost, so the numbers show pool parallelism, cache hits and Gemini
+calls saved rather than recognition quality.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from functools import partial
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+
+from offline_benchmark import (QUESTION_TEMPLATES, TOPICS, FakeGenerativeModel, OfflineSystem,  # noqa: E402
+                               make_questionnaire, peak_rss_mb, print_results)
+
+
+def fake_ocr(png: bytes, latency: float = 0.2) -> str:
+    """Stand-in for Tesseract: a fixed cost and questions derived from the image hash"""
+    time.sleep(latency)
+    seed = int(hashlib.sha256(png).hexdigest(), 16)
+    lines = ["Scanned section"]
+    for i in range(4):
+        template = QUESTION_TEMPLATES[(seed >> (8 * i)) % len(QUESTION_TEMPLATES)]
+        lines.append(template.format(topic=f"{TOPICS[(seed >> (8 * i + 4)) % len(TOPICS)]} (scan {seed % 9973}.{i})"))
+    return "\n".join(lines)
+
+
+def make_scanned_questionnaire(path: str, pages: int, scanned_every: int, blank_every: int) -> Dict[str, int]:
+    """Rasterize some pages of a text questionnaire into image-only pages and blank others"""
+    source_path = path + ".src.pdf"
+    make_questionnaire(source_path, "Qatar", pages, 6, structured=False, seed=7)
+    source = fitz.open(source_path)
+    doc = fitz.open()
+    counts = {'text': 0, 'scanned': 0, 'blank': 0}
+    for page_num in range(pages):
+        if page_num and page_num % blank_every == 0:
+            doc.new_page()
+            counts['blank'] += 1
+        elif page_num and page_num % scanned_every == 0:
+            pixmap = source[page_num].get_pixmap(dpi=72)
+            page = doc.new_page()
+            page.insert_image(page.rect, pixmap=pixmap)
+            counts['scanned'] += 1
+        else:
+            doc.insert_pdf(source, from_page=page_num, to_page=page_num)
+            counts['text'] += 1
+    doc.save(path)
+    doc.close()
+    source.close()
+    os.remove(source_path)
+    return counts
+
+
+def upload(workdir: str, pdf_path: str, use_ocr: bool, engine, processes: int, bulk: bool = False) -> Dict[str, Any]:
+    FakeGenerativeModel.calls = 0
+    system = OfflineSystem("offline", db_path=workdir, use_llm_cache=False, use_ocr=use_ocr,
+                           ocr_engine=engine, ocr_processes=processes)
+    start = time.perf_counter()
+    if bulk:
+        summary = system.bulk_upload_questionnaires(pdf_path, processes=processes)
+    else:
+        summary = system.upload_questionnaire(pdf_path)
+    seconds = time.perf_counter() - start
+    result = {
+        'seconds': seconds,
+        'questions': summary.get('total_questions', 0),
+        'llm_calls': FakeGenerativeModel.calls,
+        'extraction': system.extraction_stats()
+    }
+    if system.ocr:
+        result['ocr'] = {key: value for key, value in system.ocr.stats().items() if key != 'available'}
+        system.ocr.shutdown()
+    return result
+
+
+def run(args) -> Dict[str, Any]:
+    FakeGenerativeModel.latency = args.llm_latency_ms / 1000
+    engine = partial(fake_ocr, latency=args.ocr_latency_ms / 1000)
+    workdir = tempfile.mkdtemp(prefix="nca_ocr_bench_")
+    try:
+        pdf_path = os.path.join(workdir, "scanned.pdf")
+        pages = make_scanned_questionnaire(pdf_path, args.pages, args.scanned_every, args.blank_every)
+        return {
+            'pages': pages,
+            'without_ocr': upload(os.path.join(workdir, "a"), pdf_path, False, engine, args.ocr_processes),
+            'ocr_cold': upload(os.path.join(workdir, "b"), pdf_path, True, engine, args.ocr_processes),
+            'ocr_warm': upload(os.path.join(workdir, "b"), pdf_path, True, engine, args.ocr_processes),
+            'bulk_ocr_cold': upload(os.path.join(workdir, "c"), pdf_path, True, engine, args.ocr_processes, bulk=True),
+            'peak_rss_mb': peak_rss_mb()
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=30)
+    parser.add_argument('--scanned-every', type=int, default=3)
+    parser.add_argument('--blank-every', type=int, default=7)
+    parser.add_argument('--ocr-latency-ms', type=float, default=200.0, help='Cost of recognizing one page')
+    parser.add_argument('--ocr-processes', type=int, default=4)
+    parser.add_argument('--llm-latency-ms', type=float, default=50.0, help='Latency of each fake Gemini call')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
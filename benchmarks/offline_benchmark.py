@@ -0,0 +1,320 @@
+"""
+Offline end-to-end benchmark: ingest, catalogue reads and bot sessions without a Gemini key
+
+Usage:
+    python benchmarks/offline_benchmark.py [--documents 3] [--pages 20] [--questions-per-page 6]
+                                           [--latency-ms 50] [--sessions 200] [--structured]
+                                           [--json results.json]
+
+Gemini is replaced by a deterministic local model with configurable latency,
+ChromaDB runs in memory with a hashing embedding function (no model download),
+and the questionnaires are synthetic NCA-style PDFs. Reports throughput,
+p50/p99 latencies and peak RSS so runs can be compared for regressions.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+import chromadb  # noqa: E402
+from chromadb.api.types import EmbeddingFunction  # noqa: E402
+
+from nca_questionnaire import NCAQuestionnaireBot, NCAQuestionnaireSystem  # noqa: E402
+
+COUNTRIES = ["United Arab Emirates", "Saudi Arabia", "Kuwait", "Qatar", "Bahrain"]
+SECTIONS = ["Client Due Diligence", "Site Visitation", "Entity Structure", "Staffing", "Financial"]
+QUESTION_TEMPLATES = [
+    "Does the entity maintain client records for {topic}?",
+    "Was a site visit performed at the business operating address for {topic}?",
+    "Please provide evidence of the annual review of {topic}?",
+    "Is the beneficial owner identified for {topic}?",
+    "Does the compliance officer approve {topic}?",
+    "Were suspicious transaction reports filed for {topic}?",
+]
+TOPICS = ["retail clients", "corporate accounts", "trading activities", "the sales force",
+          "premium customers", "the L2group", "shareholders", "the CII account"]
+
+
+# =================== LOCAL STAND-INS ===================
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeGenerativeModel:
+    """Deterministic stand-in for genai.GenerativeModel with a fixed per-call latency"""
+
+    latency = 0.05
+    calls = 0
+
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, **kwargs) -> _FakeResponse:
+        FakeGenerativeModel.calls += 1
+        time.sleep(self.latency)
+
+        if 'Extract the country' in prompt:
+            text = prompt.split('Text:', 1)[-1]
+            country = next((c for c in COUNTRIES if c in text), "Unknown")
+            return _FakeResponse(country)
+
+        questions = []
+        page = 1
+        for line in prompt.split('\n'):
+            line = line.strip()
+            marker = re.match(r'=== PAGE (\d+)', line)
+            if marker:
+                page = int(marker.group(1))
+            elif line.endswith('?'):
+                questions.append({
+                    'page': page, 'text': line, 'type': 'yes_no', 'category': 'General',
+                    'required': True, 'options': None, 'help_text': ''
+                })
+        return _FakeResponse(json.dumps({'questions': questions}))
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Bag-of-words hashing embedder; stands in for SentenceTransformer"""
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in re.findall(r'\w+', text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {'dim': self.dim}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> 'HashingEmbeddingFunction':
+        return HashingEmbeddingFunction(config.get('dim', 128))
+
+
+class OfflineSystem(NCAQuestionnaireSystem):
+    """NCAQuestionnaireSystem using the fake model, hashing embeddings and an in-memory ChromaDB client"""
+
+    def _create_model(self):
+        return FakeGenerativeModel(self.model_name)
+
+    def _create_client(self):
+        return chromadb.EphemeralClient()
+
+    def _create_embedding_function(self):
+        return HashingEmbeddingFunction()
+
+
+# =================== SYNTHETIC QUESTIONNAIRES ===================
+
+def make_questionnaire(path: str, country: str, pages: int, per_page: int, structured: bool, seed: int) -> str:
+    """Write an NCA-style PDF; structured PDFs carry bold section headers and Yes/No columns"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        if page_num == 0:
+            page.insert_text((50, y), f"NCA Questionnaire - {country}", fontsize=14, fontname="hebo")
+            y += 28
+        page.insert_text((50, y), f"Section {page_num + 1}: {SECTIONS[page_num % len(SECTIONS)]}",
+                         fontsize=12, fontname="hebo" if structured else "helv")
+        y += 22
+        for i in range(per_page):
+            template = rng.choice(QUESTION_TEMPLATES)
+            text = template.format(topic=f"{rng.choice(TOPICS)} ({page_num + 1}.{i + 1})")
+            page.insert_text((50, y), text[:90], fontsize=9)
+            if structured:
+                page.insert_text((470, y), "Yes   No   N/A", fontsize=9)
+            y += 16
+            if y > 780:
+                break
+    doc.save(path)
+    doc.close()
+    return path
+
+
+# =================== MEASUREMENT ===================
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    values = np.asarray(samples) * 1000
+    return {
+        'count': len(samples),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max())
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def stage_breakdown(snapshot: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Per-stage and per-bot-operation call counts and p50/p99 from the system metrics"""
+    breakdown = {}
+    for name, label in (('stage_seconds', 'stage'), ('bot_operation_seconds', 'operation')):
+        for sample in snapshot['histograms'].get(name, []):
+            breakdown[sample['labels'][label]] = {
+                'count': sample['count'],
+                'total_ms': sample['sum'] * 1000,
+                'p50_ms': sample['p50'] * 1000,
+                'p99_ms': sample['p99'] * 1000
+            }
+    return breakdown
+
+
+def timed(samples: List[float], fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def run(args) -> Dict[str, Any]:
+    FakeGenerativeModel.latency = args.latency_ms / 1000
+    workdir = tempfile.mkdtemp(prefix="nca_bench_")
+    try:
+        system = OfflineSystem(
+            "offline",
+            db_path=workdir,
+            max_concurrency=args.concurrency,
+            use_llm_cache=False
+        )
+
+        # Ingest
+        paths = [
+            make_questionnaire(os.path.join(workdir, f"doc_{i}.pdf"), COUNTRIES[i % len(COUNTRIES)],
+                               args.pages, args.questions_per_page, args.structured, seed=i)
+            for i in range(args.documents)
+        ]
+        upload_samples: List[float] = []
+        total_questions = 0
+        countries = set()
+        start = time.perf_counter()
+        for path in paths:
+            summary = timed(upload_samples, system.upload_questionnaire, path)
+            total_questions += summary.get('total_questions', 0)
+            if summary.get('success'):
+                countries.add(summary['country'])
+        ingest_seconds = time.perf_counter() - start
+
+        # Catalogue reads
+        countries = sorted(countries)
+        catalogue_samples: List[float] = []
+        for i in range(args.catalogue_reads):
+            timed(catalogue_samples, system.get_questions_for_country, countries[i % len(countries)])
+
+        # Bot sessions
+        bot = NCAQuestionnaireBot(system)
+        next_samples: List[float] = []
+        submit_samples: List[float] = []
+        answers = 0
+        start = time.perf_counter()
+        for i in range(args.sessions):
+            session_id = bot.start_session(f"user_{i}", countries[i % len(countries)])['session_id']
+            for _ in range(args.answers_per_session):
+                question = timed(next_samples, bot.get_next_question, session_id)
+                if not question.get('success'):
+                    break
+                timed(submit_samples, bot.submit_answer, "Yes", session_id)
+                answers += 1
+            bot.get_progress(session_id, include_missing=False)
+            bot.end_session(session_id)
+        system.flush_responses()
+        session_seconds = time.perf_counter() - start
+
+        return {
+            'config': vars(args),
+            'ingest': {
+                'documents': len(paths),
+                'pages': len(paths) * args.pages,
+                'questions': total_questions,
+                'seconds': ingest_seconds,
+                'pages_per_second': len(paths) * args.pages / ingest_seconds if ingest_seconds else 0.0,
+                'llm_calls': FakeGenerativeModel.calls,
+                'upload_latency': percentiles(upload_samples),
+                'extraction': system.extraction_stats(),
+                'prompts': system.prompt_report()
+            },
+            'catalogue': percentiles(catalogue_samples),
+            'bot': {
+                'sessions': args.sessions,
+                'answers': answers,
+                'seconds': session_seconds,
+                'answers_per_second': answers / session_seconds if session_seconds else 0.0,
+                'get_next_question': percentiles(next_samples),
+                'submit_answer': percentiles(submit_samples)
+            },
+            'stages': stage_breakdown(system.metrics_snapshot()),
+            'peak_rss_mb': peak_rss_mb()
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_results(results: Dict[str, Any], prefix: str = ''):
+    for key, value in results.items():
+        if key == 'config':
+            continue
+        if isinstance(value, dict):
+            print(f"{prefix}{key}:")
+            print_results(value, prefix + '  ')
+        elif isinstance(value, float):
+            print(f"{prefix}{key}: {value:.3f}")
+        else:
+            print(f"{prefix}{key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--questions-per-page', type=int, default=6)
+    parser.add_argument('--structured', action='store_true',
+                        help='Generate forms with bold headers and Yes/No columns (layout extraction path)')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Latency of each fake Gemini call')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--catalogue-reads', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--answers-per-session', type=int, default=20)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Load benchmark for the async chat server: many concurrent users in one process
+
+Usage:
+    python benchmarks/server_benchmark.py [--users 2000] [--answers 10] [--transport ws|http]
+                                          [--workers 16] [--max-pending 1024] [--json results.json]
+
+Ingests synthetic questionnaires into the offline system from
+offline_benchmark.py, starts the aiohttp app on a local port and runs every
+user as a coroutine that starts a session, answers questions and ends the
+session. Reports message throughput, p50/p99 latency, 503 rejections, peak
+thread count and peak RSS.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from offline_benchmark import (COUNTRIES, FakeGenerativeModel, OfflineSystem, make_questionnaire,  # noqa: E402
+                               peak_rss_mb, percentiles, print_results, stage_breakdown)
+from nca_questionnaire.server import create_app  # noqa: E402
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.rejected = 0
+        self.errors = 0
+        self.completed_users = 0
+        self.peak_threads = threading.active_count()
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+
+
+async def ws_user(http: aiohttp.ClientSession, url: str, user: int, country: str, answers: int, stats: Stats):
+    async with http.ws_connect(f"{url}/ws") as ws:
+        async def send(message: Dict[str, Any]) -> Dict[str, Any]:
+            while True:
+                start = time.perf_counter()
+                await ws.send_json(message)
+                reply = await ws.receive_json()
+                stats.record(time.perf_counter() - start)
+                if reply.get('error') != 'overloaded':
+                    return reply
+                stats.rejected += 1
+                await asyncio.sleep(reply.get('retry_after', 1) * 0.1)
+
+        await send({'op': 'start_session', 'user_id': f"user_{user}", 'country': country})
+        for _ in range(answers):
+            reply = await send({'op': 'get_next_question'})
+            if 'error' in reply or not reply['result'].get('success'):
+                break
+            reply = await send({'op': 'submit_answer', 'answer': 'Yes'})
+            if 'error' in reply:
+                stats.errors += 1
+        await send({'op': 'get_progress', 'include_missing': False})
+        await send({'op': 'end_session'})
+    stats.completed_users += 1
+
+
+async def http_user(http: aiohttp.ClientSession, url: str, user: int, country: str, answers: int, stats: Stats):
+    async def request(method: str, path: str, body: Dict[str, Any] = None) -> Dict[str, Any]:
+        while True:
+            start = time.perf_counter()
+            async with http.request(method, f"{url}{path}", json=body) as response:
+                result = await response.json()
+            stats.record(time.perf_counter() - start)
+            if response.status != 503:
+                if response.status >= 500:
+                    stats.errors += 1
+                return result
+            stats.rejected += 1
+            await asyncio.sleep(0.1)
+
+    session_id = (await request('POST', '/sessions', {'user_id': f"user_{user}", 'country': country}))['session_id']
+    for _ in range(answers):
+        if not (await request('GET', f"/sessions/{session_id}/question")).get('success'):
+            break
+        await request('POST', f"/sessions/{session_id}/answer", {'answer': 'Yes'})
+    await request('GET', f"/sessions/{session_id}/progress?include_missing=0")
+    await request('DELETE', f"/sessions/{session_id}")
+    stats.completed_users += 1
+
+
+async def load(args, system: OfflineSystem, countries: List[str]) -> Dict[str, Any]:
+    app = create_app(system, max_workers=args.workers, max_pending=args.max_pending)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+
+    stats = Stats()
+    user = ws_user if args.transport == 'ws' else http_user
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                user(http, url, i, countries[i % len(countries)], args.answers, stats)
+                for i in range(args.users)
+            ))
+            seconds = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+    return {
+        'users': args.users,
+        'completed_users': stats.completed_users,
+        'messages': len(stats.latencies),
+        'seconds': seconds,
+        'messages_per_second': len(stats.latencies) / seconds if seconds else 0.0,
+        'latency': percentiles(stats.latencies),
+        'rejected': stats.rejected,
+        'errors': stats.errors,
+        'peak_threads': stats.peak_threads
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    FakeGenerativeModel.latency = 0.0
+    workdir = tempfile.mkdtemp(prefix="nca_server_bench_")
+    try:
+        system = OfflineSystem("offline", db_path=workdir, use_llm_cache=False)
+        countries = []
+        for i in range(args.documents):
+            path = make_questionnaire(os.path.join(workdir, f"doc_{i}.pdf"), COUNTRIES[i % len(COUNTRIES)],
+                                      args.pages, 6, structured=True, seed=i)
+            summary = system.upload_questionnaire(path)
+            if summary.get('success'):
+                countries.append(summary['country'])
+
+        results = asyncio.run(load(args, system, countries))
+        results['stages'] = stage_breakdown(system.metrics_snapshot())
+        results['peak_rss_mb'] = peak_rss_mb()
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000, help='Concurrent chat users')
+    parser.add_argument('--answers', type=int, default=10, help='Questions answered by each user')
+    parser.add_argument('--transport', choices=['ws', 'http'], default='ws')
+    parser.add_argument('--workers', type=int, default=16, help='Server threads for blocking bot operations')
+    parser.add_argument('--max-pending', type=int, default=1024, help='Server admission limit')
+    parser.add_argument('--documents', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+NCA questionnaire ingest, storage and chatbot
+
+Submodules are imported on first attribute access, so importing the package
+(or only the chatbot) does not load PyMuPDF, pandas, numpy, Gemini or ChromaDB:
+
+    models      Question, QuestionType, UserResponse
+    classifier  keyword heuristics for questionnaire lines
+    ingest      layout extraction, prompt packing, LLM response cache
+    store       question catalogue cache and response stores
+    embeddings  embedding model, vector cache, near-duplicate detection
+    metrics     counters and latency histograms
+    ocr         OCR fallback for scanned pages
+    system      NCAQuestionnaireSystem
+    bot         sessions and NCAQuestionnaireBot
+    server      async HTTP and WebSocket front end (needs aiohttp)
+    cli         command-line demo
+"""
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    # models
+    'QuestionType': 'models',
+    'Question': 'models',
+    'UserResponse': 'models',
+    'QUESTION_FIELDS': 'models',
+    'SearchResult': 'models',
+    'DuplicateGroup': 'models',
+    # classifier
+    'QUESTION_INDICATORS': 'classifier',
+    'NON_QUESTION_LINES': 'classifier',
+    'CATEGORY_KEYWORDS': 'classifier',
+    'REGULATORY_TERMS': 'classifier',
+    'COMPLIANCE_AREA_KEYWORDS': 'classifier',
+    'QUESTION_TYPE_KEYWORDS': 'classifier',
+    'SELECTION_PLACEHOLDER_OPTIONS': 'classifier',
+    'LineClassification': 'classifier',
+    'KeywordClassifier': 'classifier',
+    'get_keyword_classifier': 'classifier',
+    # ingest
+    'EXTRACTION_PROMPT_VERSION': 'ingest',
+    'COUNTRY_PROMPT_VERSION': 'ingest',
+    'ANSWER_COLUMN_TOKENS': 'ingest',
+    'LayoutExtraction': 'ingest',
+    'LayoutQuestionExtractor': 'ingest',
+    'LLMResponseCache': 'ingest',
+    'PageManifest': 'ingest',
+    'EXTRACTION_RESPONSE_SCHEMA': 'ingest',
+    'SECTION_BOUNDARY': 'ingest',
+    'PromptSegment': 'ingest',
+    'PromptUnit': 'ingest',
+    'PromptBuilder': 'ingest',
+    'TokenRateLimiter': 'ingest',
+    'LLMDispatcher': 'ingest',
+    'QuestionBatchWriter': 'ingest',
+    # ocr
+    'OCR_VERSION': 'ocr',
+    'OCR_MIN_TEXT_CHARS': 'ocr',
+    'PageOCR': 'ocr',
+    'tesseract_ocr': 'ocr',
+    'needs_ocr': 'ocr',
+    'page_content_hash': 'ocr',
+    # store
+    'QuestionCatalogue': 'store',
+    'QuestionCatalogueCache': 'store',
+    'ResponseStore': 'store',
+    'SQLiteResponseStore': 'store',
+    'ChromaResponseStore': 'store',
+    'WriteBehindResponseStore': 'store',
+    # metrics
+    'METRIC_BUCKETS': 'metrics',
+    'METRIC_HELP': 'metrics',
+    'MetricsRegistry': 'metrics',
+    # embeddings
+    'CHROMA_AVAILABLE': 'embeddings',
+    'EMBEDDING_MODEL_NAME': 'embeddings',
+    'EMBEDDING_SERVICE_AUTHKEY_ENV': 'embeddings',
+    'EmbeddingVectorCache': 'embeddings',
+    'embedding_function_id': 'embeddings',
+    'EmbeddingServiceManager': 'embeddings',
+    'embedding_service_authkey': 'embeddings',
+    'serve_embedding_service': 'embeddings',
+    'start_embedding_service': 'embeddings',
+    'LazyEmbeddingFunction': 'embeddings',
+    'QuestionDeduplicator': 'embeddings',
+    'QuestionSimilarityIndex': 'embeddings',
+    # system
+    'NCAQuestionnaireSystem': 'system',
+    # bot
+    'QuestionnaireSession': 'bot',
+    'SessionSpillStore': 'bot',
+    'SessionManager': 'bot',
+    'NCAQuestionnaireBot': 'bot',
+    # server
+    'AIOHTTP_AVAILABLE': 'server',
+    'SERVER_OPERATIONS': 'server',
+    'ServiceOverloaded': 'server',
+    'BotService': 'server',
+    'QuestionnaireServer': 'server',
+    'create_app': 'server',
+    'run_server': 'server',
+    # cli
+    'main': 'cli'
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,776 @@
+"""Chatbot sessions: per-user questionnaire state, session management and NCAQuestionnaireBot"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .models import Question, QuestionType
+from .store import QuestionCatalogue
+
+if TYPE_CHECKING:
+    from .system import NCAQuestionnaireSystem
+
+logger = logging.getLogger(__name__)
+
+class QuestionnaireSession:
+    """
+    State of one user's questionnaire session
+    
+    Questions come from the shared per-country catalogue. Per-category answer
+    counters are kept up to date as answers are recorded, so progress reports
+    do not need to reload questions or responses.
+    """
+    __slots__ = ('session_id', 'user_id', 'country', 'catalogue', 'current_question_index',
+                 'responses', 'answered_by_category', 'missing', 'skipped', 'last_active', 'suggestions')
+    
+    def __init__(self, session_id: str, user_id: str, country: Optional[str] = None,
+                 catalogue: Optional[QuestionCatalogue] = None, current_question_index: int = 0,
+                 responses: Optional[Dict[str, Any]] = None, skipped: int = 0):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.country = country
+        self.catalogue = catalogue
+        self.current_question_index = current_question_index
+        self.responses = responses if responses is not None else {}
+        self.answered_by_category: Dict[str, int] = {}
+        # Unanswered question ids in questionnaire order (an ordered set), built on first use
+        self.missing: Optional[Dict[str, None]] = None
+        self.skipped = skipped
+        self.last_active = time.monotonic()
+        self.suggestions: Optional[Dict[str, Dict[str, Any]]] = None  # prefill, computed on first use
+        if self.responses:
+            self.recount()
+    
+    @property
+    def questions(self) -> Tuple[Question, ...]:
+        return self.catalogue.questions if self.catalogue else ()
+    
+    def touch(self):
+        self.last_active = time.monotonic()
+    
+    def record_answer(self, question: Question, answer: Any):
+        """Store an answer and update the running counters"""
+        if question.id not in self.responses:
+            self.answered_by_category[question.category] = self.answered_by_category.get(question.category, 0) + 1
+            if self.missing is not None:
+                self.missing.pop(question.id, None)
+        self.responses[question.id] = answer
+    
+    def advance_past_answered(self):
+        """Move the current question past questions that already have answers"""
+        questions = self.questions
+        while self.current_question_index < len(questions) and questions[self.current_question_index].id in self.responses:
+            self.current_question_index += 1
+    
+    def recount(self):
+        """Rebuild the counters from the recorded answers (after restore or a catalogue change)"""
+        self.answered_by_category = {}
+        self.missing = None
+        if not self.catalogue:
+            return
+        by_id = self.catalogue.by_id
+        for question_id in self.responses:
+            question = by_id.get(question_id)
+            if question is not None:
+                self.answered_by_category[question.category] = self.answered_by_category.get(question.category, 0) + 1
+    
+    def progress_report(self, include_missing: bool = False) -> Dict[str, Any]:
+        """
+        Completion report from the running counters
+        
+        Cost depends only on the number of categories plus, when listed, the
+        number of missing questions: the missing set is kept up to date by
+        record_answer() and rebuilt only after a restore or catalogue change.
+        """
+        total_questions = len(self.questions)
+        answered_questions = len(self.responses)
+        
+        category_stats = {}
+        if self.catalogue:
+            for category, questions in self.catalogue.by_category.items():
+                answered = self.answered_by_category.get(category, 0)
+                category_stats[category] = {
+                    'total': len(questions),
+                    'answered': answered,
+                    'completion_rate': answered / len(questions) * 100
+                }
+        
+        report = {
+            'country': self.country,
+            'total_questions': total_questions,
+            'answered_questions': answered_questions,
+            'skipped_questions': self.skipped,
+            'completion_rate': (answered_questions / total_questions * 100) if total_questions > 0 else 0,
+            'category_stats': category_stats
+        }
+        if include_missing:
+            if self.missing is None:
+                self.missing = {q.id: None for q in self.questions if q.id not in self.responses}
+            report['missing_questions'] = list(self.missing)
+        return report
+
+class SessionSpillStore:
+    """SQLite store for sessions evicted from memory, so they can be resumed later"""
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, country TEXT, "
+            "current_question_index INTEGER NOT NULL, responses TEXT NOT NULL, "
+            "skipped INTEGER NOT NULL DEFAULT 0, updated_at TEXT NOT NULL)"
+        )
+        self.conn.commit()
+    
+    def save_many(self, sessions: List[QuestionnaireSession]):
+        now = datetime.now().isoformat()
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO sessions "
+                    "(session_id, user_id, country, current_question_index, responses, skipped, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(session.session_id, session.user_id, session.country, session.current_question_index,
+                      json.dumps(session.responses, default=str), session.skipped, now) for session in sessions]
+                )
+    
+    def owner(self, session_id: str) -> Optional[str]:
+        """User of a spilled session (None if it is not spilled)"""
+        with self.lock:
+            row = self.conn.execute("SELECT user_id FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+    
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return a spilled session record"""
+        with self.lock:
+            with self.conn:
+                row = self.conn.execute(
+                    "SELECT user_id, country, current_question_index, responses, skipped "
+                    "FROM sessions WHERE session_id = ?",
+                    (session_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        
+        user_id, country, current_question_index, responses, skipped = row
+        return {
+            'user_id': user_id,
+            'country': country,
+            'current_question_index': current_question_index,
+            'responses': json.loads(responses),
+            'skipped': skipped
+        }
+    
+    def delete(self, session_id: str):
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+class SessionManager:
+    """
+    Holds many concurrent questionnaire sessions keyed by session_id
+    
+    Sessions idle for longer than max_idle seconds are evicted (checked at most
+    every sweep_interval seconds); they are written to a local SQLite store
+    (sessions.sqlite3 under the system's db_path unless spill_path is given)
+    and transparently restored on next access.
+    """
+    
+    def __init__(self, system: 'NCAQuestionnaireSystem', max_idle: Optional[float] = 1800,
+                 spill_path: Optional[str] = None, sweep_interval: float = 60):
+        self.system = system
+        self.max_idle = max_idle
+        self.sweep_interval = sweep_interval
+        if spill_path is None and max_idle is not None:
+            spill_path = os.path.join(system.db_path, "sessions.sqlite3")
+        self.spill = SessionSpillStore(spill_path) if spill_path else None
+        self.sessions: Dict[str, QuestionnaireSession] = {}
+        self.lock = threading.Lock()
+        self.last_sweep = time.monotonic()
+        self.evicted = 0
+        self.restored = 0
+    
+    def __len__(self) -> int:
+        return len(self.sessions)
+    
+    def _load_catalogue(self, country: Optional[str]) -> Optional[QuestionCatalogue]:
+        if not country:
+            return None
+        try:
+            return self.system.get_question_catalogue(country)
+        except Exception as e:
+            self.system._log_error('get_questions', "Error getting questions for country", e)
+            return None
+    
+    def create(self, user_id: str, country: Optional[str] = None,
+               session_id: Optional[str] = None, resume: bool = True) -> QuestionnaireSession:
+        """
+        Create (or replace) a session; a caller-supplied session_id resumes its stored answers
+        
+        Raises:
+            PermissionError: If the session_id belongs to a live or spilled session of another user
+        """
+        if session_id:
+            with self.lock:
+                live = self.sessions.get(session_id)
+            owner = live.user_id if live is not None else (self.spill.owner(session_id) if self.spill else None)
+            if owner is not None and owner != user_id:
+                raise PermissionError(f"Session {session_id} belongs to another user")
+        
+        responses = None
+        if session_id and country and resume:
+            stored = self.system.get_user_responses(user_id, session_id)
+            responses = {question_id: response['answer'] for question_id, response in stored.items()}
+        if not session_id:
+            session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        
+        session = QuestionnaireSession(
+            session_id=session_id,
+            user_id=user_id,
+            country=country,
+            catalogue=self._load_catalogue(country),
+            responses=responses
+        )
+        session.advance_past_answered()
+        
+        with self.lock:
+            self.sessions[session_id] = session
+        if self.spill:
+            self.spill.delete(session_id)
+        self._maybe_sweep()
+        return session
+    
+    def get(self, session_id: str) -> Optional[QuestionnaireSession]:
+        """Return a live session, restoring it from the spill store if it was evicted"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+        
+        if session is None and self.spill:
+            record = self.spill.pop(session_id)
+            if record is not None:
+                session = QuestionnaireSession(
+                    session_id=session_id,
+                    user_id=record['user_id'],
+                    country=record['country'],
+                    catalogue=self._load_catalogue(record['country']),
+                    current_question_index=record['current_question_index'],
+                    responses=record['responses'],
+                    skipped=record['skipped']
+                )
+                with self.lock:
+                    session = self.sessions.setdefault(session_id, session)
+                    self.restored += 1
+        
+        if session is not None:
+            session.touch()
+        self._maybe_sweep()
+        return session
+    
+    def set_country(self, session: QuestionnaireSession, country: str):
+        session.country = country
+        session.catalogue = self._load_catalogue(country)
+        session.suggestions = None
+        session.recount()
+    
+    def end(self, session_id: str) -> Optional[QuestionnaireSession]:
+        """Remove a session from memory and from the spill store"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if self.spill:
+            self.spill.delete(session_id)
+        return session
+    
+    def _maybe_sweep(self):
+        if self.max_idle is not None and time.monotonic() - self.last_sweep >= self.sweep_interval:
+            self.evict_idle()
+    
+    def evict_idle(self) -> int:
+        """Evict sessions idle for longer than max_idle, spilling them if configured"""
+        now = time.monotonic()
+        self.last_sweep = now
+        if self.max_idle is None:
+            return 0
+        
+        with self.lock:
+            idle = [session for session in self.sessions.values() if now - session.last_active > self.max_idle]
+            for session in idle:
+                del self.sessions[session.session_id]
+        
+        if idle and self.spill:
+            try:
+                self.spill.save_many(idle)
+            except Exception as e:
+                self.system._log_error('spill_sessions', "Error spilling sessions", e)
+        
+        self.evicted += len(idle)
+        return len(idle)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active_sessions': len(self.sessions),
+            'evicted': self.evicted,
+            'restored': self.restored
+        }
+
+_bot_operation_state = threading.local()
+
+def _timed_operation(method):
+    """
+    Time a bot operation and count it by outcome (ok, rejected, completed or error)
+    
+    Operations called from within another operation (e.g. submit_answer
+    fetching the next question) are part of the outer one and not recorded.
+    """
+    operation = method.__name__
+    
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_bot_operation_state, 'active', False):
+            return method(self, *args, **kwargs)
+        
+        _bot_operation_state.active = True
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            result = method(self, *args, **kwargs)
+            status = 'ok'
+            if isinstance(result, dict) and result.get('success') is False:
+                status = 'completed' if result.get('completed') else 'rejected'
+            return result
+        finally:
+            _bot_operation_state.active = False
+            metrics = self.system.metrics
+            metrics.observe('bot_operation_seconds', time.perf_counter() - start, operation=operation)
+            metrics.inc('bot_operations_total', operation=operation, status=status)
+    
+    return wrapper
+
+class NCAQuestionnaireBot:
+    """
+    Interactive chatbot for NCA questionnaires
+    
+    One bot serves many users: every method accepts a session_id and defaults
+    to the session most recently started through this bot.
+    """
+    
+    def __init__(self, system: 'NCAQuestionnaireSystem', session_manager: Optional[SessionManager] = None,
+                 prefill: bool = False, prefill_min_confidence: float = 0.8):
+        """
+        Args:
+            system: Questionnaire system holding questions and responses
+            session_manager: Session manager to share between bots (a private one by default)
+            prefill: Suggest answers from the user's earlier sessions, including other countries
+                (embeds the session's and the user's answered questions on the first question)
+            prefill_min_confidence: Minimum confidence for a suggestion to be offered
+        """
+        self.system = system
+        self.sessions = session_manager if session_manager is not None else SessionManager(system)
+        self.current_session_id: Optional[str] = None
+        self.prefill = prefill
+        self.prefill_min_confidence = prefill_min_confidence
+    
+    @property
+    def current_session(self) -> Optional[QuestionnaireSession]:
+        """Session most recently started through this bot"""
+        return self.sessions.get(self.current_session_id) if self.current_session_id else None
+    
+    def _get_session(self, session_id: Optional[str]) -> Optional[QuestionnaireSession]:
+        session_id = session_id or self.current_session_id
+        return self.sessions.get(session_id) if session_id else None
+    
+    @_timed_operation
+    def start_session(self, user_id: str, country: str = None, session_id: str = None,
+                      resume: bool = True) -> Dict[str, Any]:
+        """
+        Start a new questionnaire session
+        
+        Args:
+            user_id: User answering the questionnaire
+            country: Country to load questions for (can be selected later)
+            session_id: Id of the session; an existing session of the same user is resumed
+            resume: Load stored answers of session_id (False for ids that are known to be new)
+        """
+        try:
+            session = self.sessions.create(user_id, country, session_id, resume)
+        except PermissionError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        self.current_session_id = session.session_id
+        
+        return {
+            'session_id': session.session_id,
+            'message': f"Welcome to the NCA Questionnaire Bot! {'Country set to ' + country if country else 'Please select a country to begin.'}",
+            'countries': self.system.get_countries() if not country else None,
+            'total_questions': len(session.questions) if country else 0
+        }
+    
+    @_timed_operation
+    def select_country(self, country: str, session_id: str = None) -> Dict[str, Any]:
+        """Select country for questionnaire"""
+        if country not in self.system.get_countries():
+            return {
+                'success': False,
+                'message': f"Country '{country}' not supported. Available countries: {', '.join(self.system.get_countries())}"
+            }
+        
+        session = self._get_session(session_id)
+        if session is None:
+            return {
+                'success': False,
+                'message': "No active session. Please start a session first."
+            }
+        
+        self.sessions.set_country(session, country)
+        
+        return {
+            'success': True,
+            'message': f"Country set to {country}. Found {len(session.questions)} questions.",
+            'total_questions': len(session.questions)
+        }
+    
+    @_timed_operation
+    def get_next_question(self, session_id: str = None) -> Dict[str, Any]:
+        """Get the next question for the user"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No questions available. Please select a country first."
+            }
+        
+        questions = session.questions
+        current_index = session.current_question_index
+        
+        if current_index >= len(questions):
+            self.system.flush_responses()
+            return {
+                'success': False,
+                'message': "All questions completed!",
+                'completed': True,
+                'completion_report': session.progress_report(include_missing=True)
+            }
+        
+        question = questions[current_index]
+        
+        return {
+            'success': True,
+            'question': {
+                'id': question.id,
+                'text': question.text,
+                'type': question.type.value,
+                'category': question.category,
+                'required': question.required,
+                'options': question.options,
+                'help_text': question.help_text
+            },
+            'suggestion': self._suggestions(session).get(question.id) if self.prefill else None,
+            'progress': {
+                'current': current_index + 1,
+                'total': len(questions),
+                'percentage': ((current_index + 1) / len(questions)) * 100
+            }
+        }
+    
+    def _suggestions(self, session: QuestionnaireSession) -> Dict[str, Dict[str, Any]]:
+        if session.suggestions is None:
+            session.suggestions = self.system.suggest_answers(
+                session.user_id,
+                session.questions,
+                exclude_session=session.session_id,
+                min_confidence=self.prefill_min_confidence
+            )
+        return session.suggestions
+    
+    @_timed_operation
+    def get_suggestions(self, session_id: str = None) -> Dict[str, Any]:
+        """Prefill suggestions for every unanswered question of the session"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        suggestions = {
+            question_id: suggestion
+            for question_id, suggestion in self._suggestions(session).items()
+            if question_id not in session.responses
+        }
+        return {
+            'success': True,
+            'suggestions': suggestions,
+            'total': len(suggestions)
+        }
+    
+    @_timed_operation
+    def accept_suggestion(self, session_id: str = None) -> Dict[str, Any]:
+        """Answer the current question with its suggested answer"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions or session.current_question_index >= len(session.questions):
+            return {
+                'success': False,
+                'message': "No question to answer."
+            }
+        
+        suggestion = self._suggestions(session).get(session.questions[session.current_question_index].id)
+        if suggestion is None:
+            return {
+                'success': False,
+                'message': "No suggestion available for this question."
+            }
+        return self.submit_answer(suggestion['answer'], session.session_id, confidence=suggestion['confidence'])
+    
+    @_timed_operation
+    def accept_suggestions(self, session_id: str = None, min_confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Record every suggestion at or above min_confidence in one step
+        
+        Accepted answers keep the suggestion confidence; the session then
+        continues at the first question still without an answer.
+        """
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        accepted = 0
+        for question in session.questions:
+            suggestion = self._suggestions(session).get(question.id)
+            if (question.id in session.responses or suggestion is None
+                    or suggestion['confidence'] < min_confidence
+                    or not self._validate_answer(question, suggestion['answer'])['valid']):
+                continue
+            self.system.save_user_response(
+                session.user_id,
+                question.id,
+                suggestion['answer'],
+                session.session_id,
+                confidence=suggestion['confidence']
+            )
+            session.record_answer(question, suggestion['answer'])
+            accepted += 1
+        
+        session.advance_past_answered()
+        
+        return {
+            'success': True,
+            'accepted': accepted,
+            'next_question': self.get_next_question(session.session_id)
+        }
+    
+    @_timed_operation
+    def submit_answer(self, answer: Any, session_id: str = None, confidence: float = 1.0) -> Dict[str, Any]:
+        """Submit answer for current question (confidence < 1 for accepted suggestions)"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session. Please start a session first."
+            }
+        
+        questions = session.questions
+        current_index = session.current_question_index
+        
+        if current_index >= len(questions):
+            return {
+                'success': False,
+                'message': "No more questions to answer."
+            }
+        
+        question = questions[current_index]
+        
+        # Validate answer based on question type
+        validation_result = self._validate_answer(question, answer)
+        if not validation_result['valid']:
+            return {
+                'success': False,
+                'message': validation_result['message']
+            }
+        
+        # Save response
+        self.system.save_user_response(
+            session.user_id,
+            question.id,
+            answer,
+            session.session_id,
+            confidence=confidence
+        )
+        
+        # Update session
+        session.record_answer(question, answer)
+        session.current_question_index += 1
+        
+        return {
+            'success': True,
+            'message': "Answer saved successfully!",
+            'next_question': self.get_next_question(session.session_id)
+        }
+    
+    def _validate_answer(self, question: Question, answer: Any) -> Dict[str, Any]:
+        """Validate answer based on question type"""
+        if question.required and (answer is None or answer == ""):
+            return {
+                'valid': False,
+                'message': "This question is required. Please provide an answer."
+            }
+        
+        if question.type == QuestionType.YES_NO:
+            if str(answer).lower() not in ['yes', 'no', 'y', 'n', 'true', 'false']:
+                return {
+                    'valid': False,
+                    'message': "Please answer with Yes or No."
+                }
+        
+        elif question.type == QuestionType.DATE:
+            try:
+                datetime.strptime(str(answer), '%Y-%m-%d')
+            except ValueError:
+                return {
+                    'valid': False,
+                    'message': "Please provide date in YYYY-MM-DD format."
+                }
+        
+        elif question.type == QuestionType.SELECTION:
+            if question.options and answer not in question.options:
+                return {
+                    'valid': False,
+                    'message': f"Please select from: {', '.join(question.options)}"
+                }
+        
+        elif question.type == QuestionType.NUMERIC:
+            try:
+                float(answer)
+            except ValueError:
+                return {
+                    'valid': False,
+                    'message': "Please provide a numeric value."
+                }
+        
+        return {'valid': True}
+    
+    @_timed_operation
+    def get_progress(self, session_id: str = None, include_missing: bool = True,
+                     recompute: bool = False) -> Dict[str, Any]:
+        """
+        Get current progress
+        
+        Args:
+            session_id: Session to report on (defaults to the current session)
+            include_missing: List the IDs of unanswered questions (kept as a running set)
+            recompute: Rebuild the report from the database instead of the session counters
+        """
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        if recompute:
+            return self.system.generate_completion_report(
+                session.user_id,
+                session.country,
+                session.session_id
+            )
+        
+        return session.progress_report(include_missing)
+    
+    @_timed_operation
+    def verify_progress(self, session_id: str = None) -> Dict[str, Any]:
+        """Consistency check of the running counters against a full recompute"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        incremental = session.progress_report(include_missing=True)
+        full = self.system.generate_completion_report(session.user_id, session.country, session.session_id)
+        mismatches = [
+            key for key in ('total_questions', 'missing_questions')
+            if incremental[key] != full[key]
+        ]
+        mismatches.extend(
+            f"category_stats.{category}" for category in full['category_stats']
+            if full['category_stats'][category]['answered'] != incremental['category_stats'].get(category, {}).get('answered')
+        )
+        
+        return {
+            'success': True,
+            'consistent': not mismatches,
+            'mismatches': mismatches
+        }
+    
+    @_timed_operation
+    def end_session(self, session_id: str = None) -> Dict[str, Any]:
+        """End a session, making sure all of its answers are persisted"""
+        session_id = session_id or self.current_session_id
+        session = self.sessions.end(session_id) if session_id else None
+        if session is None:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        self.system.flush_responses()
+        if session_id == self.current_session_id:
+            self.current_session_id = None
+        
+        return {
+            'success': True,
+            'message': f"Session {session_id} ended."
+        }
+    
+    @_timed_operation
+    def skip_question(self, session_id: str = None) -> Dict[str, Any]:
+        """Skip current question (if not required)"""
+        session = self._get_session(session_id)
+        if session is None or not session.questions:
+            return {
+                'success': False,
+                'message': "No active session."
+            }
+        
+        questions = session.questions
+        current_index = session.current_question_index
+        
+        if current_index >= len(questions):
+            return {
+                'success': False,
+                'message': "No more questions to skip."
+            }
+        
+        question = questions[current_index]
+        
+        if question.required:
+            return {
+                'success': False,
+                'message': "This question is required and cannot be skipped."
+            }
+        
+        session.current_question_index += 1
+        session.skipped += 1
+        
+        return {
+            'success': True,
+            'message': "Question skipped.",
+            'next_question': self.get_next_question(session.session_id)
+        }
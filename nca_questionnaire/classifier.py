@@ -0,0 +1,330 @@
+"""Keyword heuristics that classify questionnaire lines (question type, category, compliance area)"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Keyword tables for the heuristic classifiers (first matching entry wins for dicts)
+QUESTION_INDICATORS = [  # case-sensitive
+    '?', 'Please', 'Was', 'Were', 'Does', 'Is', 'Date', 'Document',
+    'Client', 'Site', 'Rationale', 'The entity', 'The annual',
+    'confirm', 'select', 'identify', 'provide', 'performed'
+]
+NON_QUESTION_LINES = ['yes', 'no', 'test', 'test-director']
+
+CATEGORY_KEYWORDS = {
+    'Target Market Assessment': ['target market', 'assessment', 'sales force'],
+    'Site Visitation': ['site visit', 'physical', 'business operating address'],
+    'Business Operations': ['business', 'trading', 'operations', 'revenue'],
+    'Entity Structure': ['entity', 'ownership', 'shareholders', 'beneficial'],
+    'Staffing': ['employee', 'staff', 'personnel'],
+    'Compliance': ['compliance', 'regulatory', 'cii account', 'relationship'],
+    'Financial': ['financial', 'revenue', 'sales', 'l2group'],
+    'Documentation': ['document', 'provide', 'evidence']
+}
+
+REGULATORY_TERMS = [
+    'CII account', 'L2group', 'beneficial owner', 'CSSP', 'SOEID',
+    'compliance', 'regulatory', 'assessment', 'due diligence'
+]
+
+COMPLIANCE_AREA_KEYWORDS = {
+    'KYC': ['know your customer', 'client', 'customer', 'identity'],
+    'AML': ['anti money laundering', 'suspicious', 'transaction'],
+    'CDD': ['customer due diligence', 'beneficial owner', 'ownership'],
+    'Operational': ['site visit', 'physical', 'operations', 'staff'],
+    'Financial': ['revenue', 'sales', 'trading', 'financial']
+}
+
+# Question type rules, checked in order; yes_no additionally requires a '?'
+QUESTION_TYPE_KEYWORDS = [
+    ('yes_no', ['yes', 'no', 'was', 'were', 'does', 'is']),
+    ('date', ['date']),
+    ('selection', ['select', 'choose']),
+    ('numeric', ['number', 'amount'])
+]
+
+SELECTION_PLACEHOLDER_OPTIONS = ['Option 1', 'Option 2', 'Option 3']
+
+@dataclass
+class LineClassification:
+    """Everything the heuristic classifiers derive from one line of text"""
+    is_question: bool
+    question_type: str
+    category: str
+    compliance_area: str
+    regulatory_context: str
+    has_select: bool
+
+class KeywordClassifier:
+    """
+    Single-pass classifier compiled from the keyword tables
+    
+    All keywords are folded into one trie-shaped regular expression matched
+    against the lower-cased text. For each keyword the effect of every keyword
+    it contains (category and compliance-area rank, regulatory terms, question
+    type hints, question indicators) is precomputed, so a line is classified by
+    one scan plus a few integer operations per match. After a match the scan
+    resumes at the first offset where a longer keyword could overlap it, which
+    keeps results identical to testing every keyword separately.
+    """
+    
+    NO_RANK = 1 << 30
+    
+    def __init__(self):
+        import numpy as np
+        
+        # lower-cased keyword -> [(group, label, exact text for case-sensitive indicators)]
+        entries: Dict[str, List[Tuple[str, Any, Optional[str]]]] = {}
+        
+        def add(keyword: str, group: str, label: Any, exact: Optional[str] = None):
+            entries.setdefault(keyword.lower(), []).append((group, label, exact))
+        
+        for indicator in QUESTION_INDICATORS:
+            add(indicator, 'indicator', indicator, indicator)
+        for rank, keywords in enumerate(CATEGORY_KEYWORDS.values()):
+            for keyword in keywords:
+                add(keyword, 'category', rank)
+        for rank, keywords in enumerate(COMPLIANCE_AREA_KEYWORDS.values()):
+            for keyword in keywords:
+                add(keyword, 'area', rank)
+        for rank, term in enumerate(REGULATORY_TERMS):
+            add(term, 'term', rank)
+        for rank, (_, keywords) in enumerate(QUESTION_TYPE_KEYWORDS):
+            for keyword in keywords:
+                add(keyword, 'type', rank)
+        
+        self.categories = list(CATEGORY_KEYWORDS)
+        self.areas = list(COMPLIANCE_AREA_KEYWORDS)
+        self.type_names = [name for name, _ in QUESTION_TYPE_KEYWORDS]
+        self.term_contexts: Dict[int, str] = {0: 'General'}
+        self.info = {keyword: self._keyword_info(keyword, entries) for keyword in entries}
+        self.pattern = re.compile(self._trie_regex(list(entries)))
+        
+        # keyword -> label incidence matrices for classify_frame
+        self.keywords = list(entries)
+        groups = [('category', len(self.categories)), ('area', len(self.areas)),
+                  ('term', len(REGULATORY_TERMS)), ('type', len(self.type_names))]
+        self.label_matrix = np.hstack([self._incidence(entries, group, width) for group, width in groups])
+        self.label_splits = np.cumsum([width for _, width in groups])[:-1]
+    
+    def _incidence(self, entries: Dict[str, List[Tuple[str, Any, Optional[str]]]], group: str, width: int) -> 'np.ndarray':
+        import numpy as np
+        
+        matrix = np.zeros((len(self.keywords), width), dtype=np.float32)
+        for row, keyword in enumerate(self.keywords):
+            for entry_group, label, _ in entries[keyword]:
+                if entry_group == group:
+                    matrix[row, label] = 1
+        return matrix
+    
+    def _keyword_info(self, keyword: str, entries: Dict[str, List[Tuple[str, Any, Optional[str]]]]) -> Tuple:
+        """(category rank, area rank, term mask, type mask, plain indicator, cased indicators, resume offset)"""
+        category = area = self.NO_RANK
+        terms = types = 0
+        plain_indicator = False
+        cased_indicators = []
+        
+        for other, other_entries in entries.items():
+            offset = keyword.find(other)
+            while offset != -1:
+                for group, label, exact in other_entries:
+                    if group == 'category':
+                        category = min(category, label)
+                    elif group == 'area':
+                        area = min(area, label)
+                    elif group == 'term':
+                        terms |= 1 << label
+                    elif group == 'type':
+                        types |= 1 << label
+                    elif exact.lower() == exact.upper():
+                        plain_indicator = True  # no letters, case cannot differ
+                    else:
+                        cased_indicators.append((offset, exact))
+                offset = keyword.find(other, offset + 1)
+        
+        # A longer keyword may start inside this one and run past its end
+        resume = next(
+            (offset for offset in range(1, len(keyword))
+             if any(len(other) > len(keyword) - offset and other.startswith(keyword[offset:]) for other in entries)),
+            len(keyword)
+        )
+        return category, area, terms, types, plain_indicator, tuple(cased_indicators), resume
+    
+    @classmethod
+    def _trie_regex(cls, keywords: List[str]) -> str:
+        """Regex for a set of literals with shared prefixes factored out; prefers longer matches"""
+        trie: Dict[str, Any] = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        return cls._node_regex(trie)
+    
+    @classmethod
+    def _node_regex(cls, node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + cls._node_regex(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+    
+    def classify(self, text: str) -> LineClassification:
+        """Classify a line (or question) in one pass over its text"""
+        text_lower = text.lower()
+        # Offsets only line up if lower-casing kept the length (true except for rare Unicode)
+        aligned = len(text_lower) == len(text)
+        category = area = self.NO_RANK
+        terms = types = 0
+        is_indicated = False
+        
+        search = self.pattern.search
+        info = self.info
+        position = 0
+        match = search(text_lower, position)
+        while match is not None:
+            start = match.start()
+            m_category, m_area, m_terms, m_types, plain, cased, resume = info[match.group()]
+            if m_category < category:
+                category = m_category
+            if m_area < area:
+                area = m_area
+            terms |= m_terms
+            types |= m_types
+            if not is_indicated:
+                if plain:
+                    is_indicated = True
+                else:
+                    for offset, exact in cased:
+                        if text.startswith(exact, start + offset) if aligned else exact in text:
+                            is_indicated = True
+                            break
+            match = search(text_lower, start + resume)
+        
+        if '?' in text and types & 1:
+            question_type = 'yes_no'
+        elif types & 2:
+            question_type = 'date'
+        elif types & 4:
+            question_type = 'selection'
+        elif types & 8:
+            question_type = 'numeric'
+        else:
+            question_type = 'text'
+        
+        regulatory_context = self.term_contexts.get(terms)
+        if regulatory_context is None:
+            regulatory_context = ', '.join(term for rank, term in enumerate(REGULATORY_TERMS) if terms >> rank & 1)
+            self.term_contexts[terms] = regulatory_context
+        
+        return LineClassification(
+            is_question=is_indicated and len(text) > 10 and text_lower not in NON_QUESTION_LINES,
+            question_type=question_type,
+            category=self.categories[category] if category != self.NO_RANK else 'General',
+            compliance_area=self.areas[area] if area != self.NO_RANK else 'General',
+            regulatory_context=regulatory_context,
+            has_select='select' in text_lower
+        )
+    
+    def classify_frame(self, lines: 'pd.Series') -> 'pd.DataFrame':
+        """
+        Classify many lines at once with vectorized string operations
+        
+        Repeated lines are classified once. Results match classify() row for row.
+        
+        Args:
+            lines: Candidate lines, e.g. every line of a document
+            
+        Returns:
+            DataFrame indexed like lines with the LineClassification columns
+        """
+        import numpy as np
+        import pandas as pd
+        
+        lines = pd.Series(lines, dtype=object)
+        codes, uniques = pd.factorize(lines.fillna('').astype(str))
+        text = pd.Series(uniques, dtype=object)
+        text_lower = text.str.lower()
+        lengths = text.str.len().to_numpy(dtype=np.int64)
+        
+        # hits[i, k]: keyword k occurs in line i. One product with the stacked
+        # keyword -> label incidence matrices gives every label group at once.
+        hits = self._keyword_hits(text_lower, self.keywords, text_lower.str.len().to_numpy(dtype=np.int64))
+        labels = hits.astype(np.float32) @ self.label_matrix > 0
+        category_hits, area_hits, term_hits, type_hits = np.split(labels, self.label_splits, axis=1)
+        
+        def first_label(matched: 'np.ndarray', names: List[str]) -> 'np.ndarray':
+            rank = np.where(matched.any(axis=1), matched.argmax(axis=1), len(names))
+            return np.array(names + ['General'], dtype=object)[rank]
+        
+        indicator_hits = self._keyword_hits(text, QUESTION_INDICATORS, lengths)
+        is_question = (
+            indicator_hits.any(axis=1)
+            & (lengths > 10)
+            & ~text_lower.isin(NON_QUESTION_LINES).to_numpy(dtype=bool)
+        )
+        
+        has_question_mark = indicator_hits[:, QUESTION_INDICATORS.index('?')]
+        question_type = np.select(
+            [has_question_mark & type_hits[:, 0], type_hits[:, 1], type_hits[:, 2], type_hits[:, 3]],
+            self.type_names,
+            default='text'
+        )
+        
+        terms = pd.DataFrame(term_hits, columns=REGULATORY_TERMS)
+        regulatory_context = terms.dot(pd.Index(REGULATORY_TERMS) + ', ').str[:-2].replace('', 'General')
+        
+        unique_frame = pd.DataFrame({
+            'is_question': is_question,
+            'question_type': question_type,
+            'category': first_label(category_hits, self.categories),
+            'compliance_area': first_label(area_hits, self.areas),
+            'regulatory_context': regulatory_context.to_numpy(dtype=object),
+            'has_select': hits[:, self.keywords.index('select')]
+        })
+        frame = unique_frame.take(codes)
+        frame.index = lines.index
+        return frame
+    
+    @staticmethod
+    def _keyword_hits(text: 'pd.Series', keywords: List[str], lengths: 'np.ndarray') -> 'np.ndarray':
+        """
+        Boolean (line, keyword) occurrence matrix
+        
+        All lines are joined into one array of code points. For each keyword the
+        positions holding its first character are narrowed down one character at
+        a time, and the survivors are mapped back to lines.
+        """
+        import numpy as np
+        
+        hits = np.zeros((len(text), len(keywords)), dtype=bool)
+        if not len(text):
+            return hits
+        # No keyword contains a newline, so matches never span two lines
+        joined = np.frombuffer('\n'.join(text).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        line_ends = np.cumsum(lengths + 1)
+        first_positions: Dict[int, np.ndarray] = {}
+        
+        for column, keyword in enumerate(keywords):
+            chars = np.frombuffer(keyword.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            first = int(chars[0])
+            if first not in first_positions:
+                first_positions[first] = np.flatnonzero(joined == first)
+            candidates = first_positions[first]
+            candidates = candidates[candidates <= len(joined) - len(chars)]
+            for offset in range(1, len(chars)):
+                if not candidates.size:
+                    break
+                candidates = candidates[joined[candidates + offset] == chars[offset]]
+            hits[np.searchsorted(line_ends, candidates, side='right'), column] = True
+        return hits
+
+@lru_cache(maxsize=None)
+def get_keyword_classifier() -> KeywordClassifier:
+    """Shared classifier, compiled on first use"""
+    return KeywordClassifier()
@@ -0,0 +1,58 @@
+"""Command-line demo: upload a questionnaire and answer its first question"""
+import argparse
+import json
+import logging
+import os
+
+from .bot import NCAQuestionnaireBot
+from .system import NCAQuestionnaireSystem
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="NCA questionnaire upload and chatbot demo")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Gemini API key (defaults to $GEMINI_API_KEY)")
+    parser.add_argument("--db-path", default=os.environ.get("NCA_DB_PATH", "./nca_system_db"))
+    parser.add_argument("--pdf", help="Questionnaire PDF to upload before starting the chatbot")
+    parser.add_argument("--incremental", action="store_true", help="Only re-extract pages that changed")
+    parser.add_argument("--country", default="United Arab Emirates")
+    parser.add_argument("--user", default="user123")
+    args = parser.parse_args()
+    
+    if not args.api_key:
+        parser.error("a Gemini API key is required (--api-key or GEMINI_API_KEY)")
+    
+    # Initialize system
+    system = NCAQuestionnaireSystem(
+        gemini_api_key=args.api_key,
+        db_path=args.db_path
+    )
+    
+    # CASE 1: Upload questionnaire from PDF
+    if args.pdf:
+        print("=== CASE 1: Upload Questionnaire ===")
+        result = system.upload_questionnaire(args.pdf, incremental=args.incremental)
+        print(json.dumps(result, indent=2))
+    
+    # CASE 2: Interactive chatbot
+    print("\n=== CASE 2: Interactive Chatbot ===")
+    bot = NCAQuestionnaireBot(system)
+    
+    # Start session
+    session = bot.start_session(user_id=args.user, country=args.country)
+    print("Session started:", session)
+    
+    # Get first question
+    question = bot.get_next_question()
+    print("First question:", question)
+    
+    # Submit answer
+    answer_result = bot.submit_answer("Yes")
+    print("Answer submitted:", answer_result)
+    
+    # Get progress
+    progress = bot.get_progress()
+    print("Progress:", progress)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+"""
+Question embeddings: the lazily loaded embedding model (local or shared
+service), the on-disk vector cache, near-duplicate detection and the
+cross-country similarity index
+
+Importing this module loads numpy and ChromaDB; the rest of the package only
+imports it once embeddings are needed.
+"""
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import replace
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .models import DuplicateGroup, Question
+
+# Vector Database imports
+try:
+    from chromadb.api.types import EmbeddingFunction
+    from chromadb.utils import embedding_functions
+    CHROMA_AVAILABLE = True
+except ImportError:
+    EmbeddingFunction = object
+    CHROMA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Environment variable holding the embedding service's shared secret
+EMBEDDING_SERVICE_AUTHKEY_ENV = "NCA_EMBEDDING_AUTHKEY"
+
+class EmbeddingVectorCache:
+    """
+    Embedding vectors keyed by text hash, kept in a float32 memory-mapped file
+    
+    A SQLite index maps the hash of (embedding function, text) to a row of the
+    vector file, which grows by doubling. Rows are allocated inside a SQLite
+    write transaction, so processes sharing the files never write the same
+    row. Only texts that are not cached yet are sent to the embedding model,
+    in large batches.
+    """
+    
+    def __init__(self, path: str, model_name: str, batch_size: int = 512):
+        """
+        Args:
+            path: Path prefix of the index and vector files
+            model_name: Identity of the embedding function (see embedding_function_id)
+            batch_size: Texts sent to the embedding model per call
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.vectors_path = path + ".f32"
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        self.conn = sqlite3.connect(path + ".sqlite3", check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.vectors: Optional[np.memmap] = None
+        self._refresh()
+    
+    def _refresh(self):
+        """Pick up the dimension and row count, which other processes may have changed"""
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()
+        if row:
+            self.count = int(row[0])
+        else:
+            self.count = self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+        if self.dim:
+            self._map(self.count)
+    
+    def _map(self, min_rows: int):
+        """(Re)map the vector file with room for at least min_rows rows"""
+        row_bytes = 4 * self.dim
+        rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        if rows < min_rows or rows == 0:
+            rows = max(1024, min_rows, 2 * rows)
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(rows * row_bytes)
+        if self.vectors is None or len(self.vectors) != rows:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(rows, self.dim))
+    
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(json.dumps([self.model_name, text]).encode()).hexdigest()
+    
+    def get_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given texts (missing texts are left out)"""
+        keys = {self.make_key(text): text for text in texts}
+        found = {}
+        with self.lock:
+            if self.vectors is None:
+                self._refresh()
+                if self.vectors is None:
+                    return found
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                if rows and max(row for _, row in rows) >= len(self.vectors):
+                    self._map(max(row for _, row in rows) + 1)  # grown by another process
+                for key, row in rows:
+                    found[keys[key]] = np.array(self.vectors[row])
+        return found
+    
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Append vectors; the index is committed only after the vectors are written"""
+        with self.lock:
+            # The write transaction serializes row allocation across processes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+                if vectors.shape[1] != self.dim:
+                    logger.warning("Not caching embeddings of dimension %d (cache holds %d)", vectors.shape[1], self.dim)
+                    self.conn.execute("ROLLBACK")
+                    return
+                
+                keys = [self.make_key(text) for text in texts]
+                existing = set()
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    existing.update(key for key, in self.conn.execute(
+                        f"SELECT key FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+                new = [i for i, key in enumerate(keys) if key not in existing]
+                if new:
+                    start = self.count
+                    self._map(start + len(new))
+                    self.vectors[start:start + len(new)] = vectors[new]
+                    self.vectors.flush()
+                    self.conn.executemany(
+                        "INSERT INTO vectors (key, row) VALUES (?, ?)",
+                        [(keys[i], start + j) for j, i in enumerate(new)]
+                    )
+                    self.count = start + len(new)
+                    self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('rows', ?)", (str(self.count),))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def embed(self, texts: List[str], embed: Callable[[List[str]], Any]) -> np.ndarray:
+        """Vectors for texts (in order), embedding only the ones not cached yet"""
+        unique = list(dict.fromkeys(texts))
+        found = self.get_many(unique)
+        missing = [text for text in unique if text not in found]
+        with self.lock:
+            self.hits += len(unique) - len(missing)
+            self.misses += len(missing)
+        
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            vectors = np.asarray(embed(batch), dtype=np.float32)
+            self.put_many(batch, vectors)
+            found.update(zip(batch, vectors))
+        
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[text] for text in texts])
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'vectors': self.count, 'dim': self.dim, 'hits': self.hits, 'misses': self.misses}
+
+def embedding_function_id(embedding_function: Any) -> str:
+    """Identity of an embedding function for cache keys: its name and config when it reports them"""
+    name = getattr(embedding_function, 'name', None)
+    get_config = getattr(embedding_function, 'get_config', None)
+    if callable(name) and callable(get_config):
+        return json.dumps([name(), get_config()], sort_keys=True, default=str)
+    return f"{type(embedding_function).__module__}.{type(embedding_function).__qualname__}"
+
+def embedding_service_authkey(authkey: Optional[bytes] = None) -> bytes:
+    """
+    Shared secret of the embedding service: the given key, else NCA_EMBEDDING_AUTHKEY
+    
+    Raises:
+        ValueError: If neither is set (the service speaks pickle, so it must not run unauthenticated)
+    """
+    if authkey:
+        return authkey
+    authkey = os.environ.get(EMBEDDING_SERVICE_AUTHKEY_ENV, '').encode()
+    if not authkey:
+        raise ValueError(f"The embedding service needs an authkey; pass one or set {EMBEDDING_SERVICE_AUTHKEY_ENV}")
+    return authkey
+
+class EmbeddingServiceManager(BaseManager):
+    """Manager exposing one shared embedding model to every worker on a host"""
+
+class _EmbeddingServer:
+    """Embedding model living in the embedding service process"""
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.embedding_function = None
+        self.load_seconds = None
+        self.requests = 0
+        self.lock = threading.Lock()
+    
+    def _load(self):
+        with self.lock:
+            if self.embedding_function is None:
+                start = time.perf_counter()
+                self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=self.model_name
+                )
+                self.load_seconds = time.perf_counter() - start
+        return self.embedding_function
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        return [np.asarray(vector, dtype=np.float32) for vector in self._load()(texts)]
+    
+    def info(self) -> Dict[str, Any]:
+        return {
+            'model_name': self.model_name,
+            'loaded': self.embedding_function is not None,
+            'load_seconds': self.load_seconds,
+            'requests': self.requests
+        }
+
+def serve_embedding_service(address: Tuple[str, int] = ('127.0.0.1', 50071),
+                            authkey: Optional[bytes] = None,
+                            model_name: str = EMBEDDING_MODEL_NAME, warm: bool = True):
+    """
+    Run a shared embedding service in this process (blocks)
+    
+    Args:
+        address: (host, port) to listen on (loopback only unless another host is given)
+        authkey: Shared secret workers must present (defaults to NCA_EMBEDDING_AUTHKEY)
+        model_name: SentenceTransformer model to serve
+        warm: Load the model before accepting connections
+    """
+    authkey = embedding_service_authkey(authkey)
+    server = _EmbeddingServer(model_name)
+    if warm:
+        server.embed(["warm up"])
+    EmbeddingServiceManager.register('embedding_server', callable=lambda: server)
+    manager = EmbeddingServiceManager(address=address, authkey=authkey)
+    logger.info("Embedding service for %s listening on %s:%d", model_name, address[0], address[1])
+    manager.get_server().serve_forever()
+
+def start_embedding_service(address: Tuple[str, int] = ('127.0.0.1', 50071),
+                            authkey: Optional[bytes] = None,
+                            model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Start the shared embedding service in a background process and return the process
+    
+    Without an authkey argument or NCA_EMBEDDING_AUTHKEY a random key is generated
+    and exported in NCA_EMBEDDING_AUTHKEY, so worker processes started afterwards
+    inherit it.
+    """
+    import multiprocessing
+    
+    try:
+        authkey = embedding_service_authkey(authkey)
+    except ValueError:
+        authkey = secrets.token_hex(32).encode()
+        os.environ[EMBEDDING_SERVICE_AUTHKEY_ENV] = authkey.decode()
+    process = multiprocessing.Process(
+        target=serve_embedding_service,
+        args=(address, authkey, model_name),
+        daemon=True
+    )
+    process.start()
+    return process
+
+class LazyEmbeddingFunction(EmbeddingFunction):
+    """
+    SentenceTransformer embedding function that loads nothing until first used
+    
+    When a service address is given, embeddings come from the shared
+    embedding service, authenticated with service_authkey or
+    NCA_EMBEDDING_AUTHKEY; if it cannot be reached the model is loaded locally.
+    Reports the same name and config as ChromaDB's SentenceTransformer
+    embedding function, so existing collections accept it.
+    """
+    
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME,
+                 service_address: Optional[Tuple[str, int]] = None,
+                 service_authkey: Optional[bytes] = None):
+        self.model_name = model_name
+        self.service_address = service_address
+        self.service_authkey = embedding_service_authkey(service_authkey) if service_address else None
+        self.source = None  # 'service' or 'local' once loaded
+        self.load_seconds = None
+        self._embed = None
+        self._lock = threading.Lock()
+    
+    def _load(self) -> Callable[[List[str]], Any]:
+        with self._lock:
+            if self._embed is not None:
+                return self._embed
+            
+            start = time.perf_counter()
+            if self.service_address:
+                try:
+                    EmbeddingServiceManager.register('embedding_server')
+                    manager = EmbeddingServiceManager(address=self.service_address, authkey=self.service_authkey)
+                    manager.connect()
+                    self._embed = manager.embedding_server().embed
+                    self.source = 'service'
+                except Exception as e:
+                    logger.warning("Embedding service unavailable, loading model locally: %s", e)
+            if self._embed is None:
+                self._embed = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=self.model_name
+                )
+                self.source = 'local'
+            self.load_seconds = time.perf_counter() - start
+            return self._embed
+    
+    @property
+    def loaded(self) -> bool:
+        return self._embed is not None
+    
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        embed = self._embed or self._load()
+        return [np.asarray(vector, dtype=np.float32) for vector in embed(list(input))]
+    
+    @staticmethod
+    def name() -> str:
+        return "sentence_transformer"
+    
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "device": "cpu", "normalize_embeddings": False, "kwargs": {}}
+    
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> 'LazyEmbeddingFunction':
+        return LazyEmbeddingFunction(model_name=config.get("model_name", EMBEDDING_MODEL_NAME))
+
+class QuestionDeduplicator:
+    """
+    Finds semantically equivalent questions
+    
+    Question texts are embedded in batches and normalised. Small sets are
+    compared exhaustively; larger ones use random-hyperplane LSH tables, where
+    questions sharing a bucket in any table become candidate pairs. Pairs whose
+    cosine similarity reaches the threshold are merged with union-find, and the
+    first question of each group (in input order) is kept as canonical.
+    """
+    
+    def __init__(self, embed: Callable[[List[str]], Any], threshold: float = 0.92,
+                 batch_size: int = 256, num_tables: int = 12, bucket_size: int = 64,
+                 exhaustive_limit: int = 2048, seed: int = 0):
+        self.embed_fn = embed
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.num_tables = num_tables
+        self.bucket_size = bucket_size
+        self.exhaustive_limit = exhaustive_limit
+        self.seed = seed
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches; returns unit-length float32 rows"""
+        batches = [
+            np.asarray(self.embed_fn(texts[i:i + self.batch_size]), dtype=np.float32)
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.vstack(batches)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _candidate_blocks(self, vectors: np.ndarray) -> Iterator[np.ndarray]:
+        """Yield index arrays whose members should be compared pairwise"""
+        count = len(vectors)
+        if count <= self.exhaustive_limit:
+            yield np.arange(count)
+            return
+        
+        rng = np.random.default_rng(self.seed)
+        num_planes = int(min(24, max(1, np.log2(count / self.bucket_size))))
+        weights = 1 << np.arange(num_planes, dtype=np.int64)
+        for _ in range(self.num_tables):
+            planes = rng.standard_normal((vectors.shape[1], num_planes)).astype(np.float32)
+            keys = ((vectors @ planes) > 0) @ weights
+            order = np.argsort(keys, kind='stable')
+            boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) > 1:
+                    yield bucket
+    
+    def group(self, vectors: np.ndarray) -> List[List[int]]:
+        """Indices of near-duplicate groups (only groups with more than one member), in input order"""
+        parent = list(range(len(vectors)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        for block in self._candidate_blocks(vectors):
+            block_vectors = vectors[block]
+            for start in range(0, len(block), 1024):
+                rows = block[start:start + 1024]
+                similar = (vectors[rows] @ block_vectors.T) >= self.threshold
+                for row, column in zip(*np.nonzero(similar)):
+                    i, j = find(int(rows[row])), find(int(block[column]))
+                    if i != j:
+                        parent[max(i, j)] = min(i, j)
+        
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(vectors)):
+            groups.setdefault(find(i), []).append(i)
+        return [members for members in groups.values() if len(members) > 1]
+    
+    def find_groups(self, questions: List[Question]) -> List[DuplicateGroup]:
+        """Group near-duplicate questions; the first question of each group is canonical"""
+        if len(questions) < 2:
+            return []
+        
+        vectors = self.embed([q.text for q in questions])
+        duplicate_groups = []
+        for members in self.group(vectors):
+            canonical = questions[members[0]]
+            similarities = vectors[members] @ vectors[members[0]]
+            duplicate_groups.append(DuplicateGroup(
+                canonical_id=canonical.id,
+                canonical_text=canonical.text,
+                countries=sorted({questions[i].country for i in members}),
+                members=[
+                    {
+                        'id': questions[i].id,
+                        'text': questions[i].text,
+                        'country': questions[i].country,
+                        'page': questions[i].page,
+                        'similarity': round(float(similarity), 4)
+                    }
+                    for i, similarity in zip(members, similarities)
+                ]
+            ))
+        return duplicate_groups
+    
+    def deduplicate(self, questions: List[Question]) -> Tuple[List[Question], List[DuplicateGroup]]:
+        """
+        Drop near-duplicates, keeping the canonical question of each group
+        
+        The canonical question's duplicates field lists the questions merged into it.
+        """
+        duplicate_groups = self.find_groups(questions)
+        merged = set()
+        canonical = {}
+        for duplicate_group in duplicate_groups:
+            canonical[duplicate_group.canonical_id] = [
+                {k: v for k, v in member.items() if k != 'text'} for member in duplicate_group.members[1:]
+            ]
+            merged.update(member['id'] for member in duplicate_group.members[1:])
+        
+        kept = []
+        for question in questions:
+            if question.id in merged:
+                continue
+            if question.id in canonical:
+                question = replace(question, duplicates=canonical[question.id])
+            kept.append(question)
+        return kept, duplicate_groups
+
+class QuestionSimilarityIndex:
+    """
+    Precomputed nearest neighbours of every stored question, across countries
+    
+    Candidate pairs come from the same LSH buckets as near-duplicate detection;
+    each question keeps its most similar other questions above min_similarity.
+    """
+    
+    def __init__(self, questions: List[Question], vectors: np.ndarray, version: int,
+                 min_similarity: float = 0.85, max_neighbours: int = 5):
+        self.version = version
+        self.min_similarity = min_similarity
+        self.countries = {q.id: q.country for q in questions}
+        self.neighbours: Dict[str, List[Tuple[str, float]]] = {}
+        
+        ids = [q.id for q in questions]
+        best: Dict[int, Dict[int, float]] = {}
+        blocks = QuestionDeduplicator(None)._candidate_blocks(vectors) if len(vectors) else ()
+        for block in blocks:
+            block_vectors = vectors[block]
+            for start in range(0, len(block), 1024):
+                rows = block[start:start + 1024]
+                similarities = vectors[rows] @ block_vectors.T
+                for row, column in zip(*np.nonzero(similarities >= min_similarity)):
+                    i, j = int(rows[row]), int(block[column])
+                    if i != j:
+                        best.setdefault(i, {})[j] = float(similarities[row, column])
+        
+        for i, candidates in best.items():
+            ranked = sorted(candidates.items(), key=lambda item: -item[1])[:max_neighbours]
+            self.neighbours[ids[i]] = [(ids[j], round(similarity, 4)) for j, similarity in ranked]
+    
+    def similar(self, question_id: str) -> List[Tuple[str, float]]:
+        """(question_id, cosine similarity) of the most similar other questions"""
+        return self.neighbours.get(question_id, [])
@@ -0,0 +1,669 @@
+"""
+PDF ingest building blocks: layout-based extraction, Gemini prompt packing,
+response caching, rate limiting and batched question writes
+
+PyMuPDF is only needed for the widget constants of filled-in forms and is
+imported there.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .classifier import SELECTION_PLACEHOLDER_OPTIONS, get_keyword_classifier
+from .models import Question
+
+if TYPE_CHECKING:
+    from .system import NCAQuestionnaireSystem
+
+logger = logging.getLogger(__name__)
+
+# Bump when the corresponding prompt template changes so cached responses are not reused
+EXTRACTION_PROMPT_VERSION = "2"
+COUNTRY_PROMPT_VERSION = "1"
+
+# Tokens of printed response columns ("Yes  No  N/A", "[ ] Yes [ ] No")
+ANSWER_COLUMN_TOKENS = {'yes', 'no', 'n/a', 'na', 'y', 'n', '☐', '□', '■', '☑', '☒', '[', ']', '[]', '(', ')', '()', '/', '|'}
+
+@dataclass
+class LayoutExtraction:
+    """Questions pulled from a page's layout, with how much of the page they explain"""
+    records: List[Dict[str, Any]]  # same shape as the Gemini question records
+    confidence: float
+
+class LayoutQuestionExtractor:
+    """
+    Deterministic question extraction from PyMuPDF page layout
+    
+    Bold or enlarged short lines are section headers and become the category.
+    Question lines are recognised by the keyword classifier, wrapped lines are
+    joined to the question above, and printed Yes/No columns and form widgets
+    next to a question determine its type and options. The confidence is the
+    share of text lines explained this way, scaled down when questions have no
+    answer field next to them.
+    """
+    
+    def __init__(self, header_size_ratio: float = 1.15, max_header_length: int = 80):
+        self.header_size_ratio = header_size_ratio
+        self.max_header_length = max_header_length
+    
+    @staticmethod
+    def _page_lines(page) -> List[Dict[str, Any]]:
+        lines = []
+        for block in page.get_text('dict', sort=True)['blocks']:
+            if block.get('type') != 0:
+                continue
+            for line in block['lines']:
+                spans = [span for span in line['spans'] if span['text'].strip()]
+                if not spans:
+                    continue
+                x0, y0, x1, y1 = line['bbox']
+                lines.append({
+                    'text': ' '.join(''.join(span['text'] for span in spans).split()),
+                    'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1,
+                    'size': max(span['size'] for span in spans),
+                    'bold': any(span['flags'] & 16 or 'bold' in span['font'].lower() for span in spans)
+                })
+        return lines
+    
+    @staticmethod
+    def _is_answer_column(text: str) -> bool:
+        tokens = text.lower().replace('[', ' [ ').replace(']', ' ] ').split()
+        return bool(tokens) and all(token in ANSWER_COLUMN_TOKENS for token in tokens) and (
+            'yes' in tokens or 'no' in tokens or 'y' in tokens
+        )
+    
+    def extract(self, page) -> LayoutExtraction:
+        lines = self._page_lines(page)
+        if not lines:
+            return LayoutExtraction([], 1.0)
+        
+        classifier = get_keyword_classifier()
+        sizes = sorted(line['size'] for line in lines)
+        body_size = sizes[len(sizes) // 2]
+        
+        widgets = list(page.widgets() or [])
+        
+        def on_field_row(line: Dict[str, Any]) -> bool:
+            return any(line['y0'] - 2 <= (w.rect.y0 + w.rect.y1) / 2 <= line['y1'] + 2 for w in widgets)
+        
+        questions: List[Dict[str, Any]] = []
+        section = None
+        explained = 0
+        current = None
+        
+        for line in lines:
+            text = line['text']
+            if self._is_answer_column(text):
+                # Same row as the question, or directly below it
+                if current is not None and line['y0'] - current['y1'] < 2 * line['size']:
+                    current['answer_column'] = True
+                    explained += 1
+                continue
+            
+            classification = classifier.classify(text)
+            is_header = (
+                (line['bold'] or line['size'] >= body_size * self.header_size_ratio)
+                and len(text) <= self.max_header_length and not text.endswith('?')
+            )
+            continues = (
+                current is not None and not current['text'].endswith('?') and not current['answer_column']
+                and line['y0'] - current['y1'] < line['size'] and line['x0'] >= current['x0'] - 2
+                and not text[0].isupper()
+            )
+            if is_header:
+                section = text.rstrip(':').strip()
+                current = None
+                explained += 1
+            elif continues:
+                # Wrapped continuation of the question above
+                current['text'] = f"{current['text']} {text}"
+                current['y1'] = line['y1']
+                current['classification'] = classifier.classify(current['text'])
+                explained += 1
+            elif text.endswith('?') or classification.is_question or on_field_row(line):
+                current = dict(line, text=text, section=section, classification=classification,
+                               answer_column=False, widget=None)
+                questions.append(current)
+                explained += 1
+            else:
+                current = None
+        
+        for widget in widgets:
+            question = self._question_for_widget(questions, widget.rect)
+            if question is not None and question['widget'] is None:
+                question['widget'] = widget
+        
+        records = [self._record(question) for question in questions]
+        if not records:
+            return LayoutExtraction([], 0.0)
+        with_field = sum(1 for q in questions if q['answer_column'] or q['widget'] is not None) / len(questions)
+        confidence = explained / len(lines) * (0.6 + 0.4 * with_field)
+        return LayoutExtraction(records, round(confidence, 4))
+    
+    @staticmethod
+    def _question_for_widget(questions: List[Dict[str, Any]], rect) -> Optional[Dict[str, Any]]:
+        """Question on the same row as a widget, else the nearest one above it"""
+        best, best_distance = None, None
+        for question in questions:
+            if question['y0'] - 2 <= (rect.y0 + rect.y1) / 2 <= question['y1'] + 2:
+                return question
+            distance = rect.y0 - question['y1']
+            if 0 <= distance < 30 and (best_distance is None or distance < best_distance):
+                best, best_distance = question, distance
+        return best
+    
+    @staticmethod
+    def _record(question: Dict[str, Any]) -> Dict[str, Any]:
+        import fitz  # PyMuPDF
+        
+        classification = question['classification']
+        widget = question['widget']
+        question_type, options = classification.question_type, None
+        
+        if widget is not None and widget.field_type in (fitz.PDF_WIDGET_TYPE_CHECKBOX, fitz.PDF_WIDGET_TYPE_RADIOBUTTON):
+            question_type = 'yes_no'
+        elif widget is not None and widget.field_type in (fitz.PDF_WIDGET_TYPE_COMBOBOX, fitz.PDF_WIDGET_TYPE_LISTBOX):
+            question_type = 'selection'
+            options = [
+                choice if isinstance(choice, str) else choice[-1]
+                for choice in (widget.choice_values or [])
+            ] or None
+        elif widget is not None and question_type == 'yes_no':
+            question_type = 'text'  # a free-text field, not a tick box
+        elif question['answer_column']:
+            question_type = 'yes_no'
+        
+        if question_type == 'selection' and options is None and classification.has_select:
+            options = list(SELECTION_PLACEHOLDER_OPTIONS)
+        
+        return {
+            'text': question['text'],
+            'type': question_type,
+            'category': question['section'] or classification.category,
+            'required': True,
+            'options': options,
+            'help_text': ''
+        }
+
+class LLMResponseCache:
+    """Persistent, size-bounded LRU cache of LLM responses stored in SQLite"""
+    
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    
+    @staticmethod
+    def make_key(model_name: str, template_version: str, text: str) -> str:
+        """Content address for a response: hash of model, prompt template version and input text"""
+        content = json.dumps([model_name, template_version, text])
+        return hashlib.sha256(content.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return cached response and mark it as recently used"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+    
+    def put(self, key: str, value: str):
+        """Store a response, evicting least recently used entries beyond max_bytes"""
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            
+            while self.total_bytes > self.max_bytes:
+                victims = self.conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+                ).fetchall()
+                if not victims:
+                    break
+                for victim_key, victim_size in victims:
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (victim_key,))
+                    self.total_bytes -= victim_size
+                    self.evictions += 1
+    
+    def delete(self, key: str):
+        """Drop one cached response (e.g. one that turned out to be unusable)"""
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= row[0]
+    
+    def clear(self):
+        """Remove all cached responses"""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.total_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': entries,
+                'size_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+class PageManifest:
+    """Per-country record of page fingerprints and the questions extracted from each page"""
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "country TEXT NOT NULL, page_hash TEXT NOT NULL, questions TEXT NOT NULL, "
+            "updated_at TEXT NOT NULL, PRIMARY KEY (country, page_hash))"
+        )
+    
+    def get_pages(self, country: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Return {page_hash: [question records]} for a country"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT page_hash, questions FROM pages WHERE country = ?", (country,)
+            ).fetchall()
+        return {page_hash: json.loads(questions) for page_hash, questions in rows}
+    
+    def replace_pages(self, country: str, pages: Dict[str, List[Dict[str, Any]]]):
+        """Atomically replace the manifest of a country"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute("DELETE FROM pages WHERE country = ?", (country,))
+                self.conn.executemany(
+                    "INSERT INTO pages (country, page_hash, questions, updated_at) VALUES (?, ?, ?, ?)",
+                    [(country, page_hash, json.dumps(records), now) for page_hash, records in pages.items()]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+# JSON schema requested from Gemini for question extraction
+EXTRACTION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "page": {"type": "integer"},
+                    "text": {"type": "string"},
+                    "type": {"type": "string", "enum": ["yes_no", "text", "date", "selection", "numeric"]},
+                    "category": {"type": "string"},
+                    "required": {"type": "boolean"},
+                    "options": {"type": "array", "items": {"type": "string"}},
+                    "help_text": {"type": "string"}
+                },
+                "required": ["page", "text", "type"]
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+SECTION_BOUNDARY = re.compile(
+    r'^\s*(?:(?:section|part|schedule|annex|appendix)\b|\d+(?:\.\d+)*[.)]?\s+[A-Z])',
+    re.IGNORECASE
+)
+
+@dataclass
+class PromptSegment:
+    """Text of one page, or of one part of a page that was split"""
+    page_num: int  # zero-based
+    text: str
+    part: int = 0
+    last_part: bool = True
+
+@dataclass
+class PromptUnit:
+    """Segments extracted together in one Gemini call"""
+    segments: List[PromptSegment]
+    tokens: int
+
+class PromptBuilder:
+    """
+    Packs page texts into token-budgeted extraction prompts
+    
+    Consecutive small pages share one prompt up to the budget; pages over the
+    budget are split at section headings (then at line breaks). Each segment is
+    preceded by a page marker so the response can attribute questions to pages.
+    """
+    
+    def __init__(self, max_tokens: int = 4000, max_pages: int = 8,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.max_tokens = max_tokens
+        self.max_pages = max_pages
+        self.count_tokens = count_tokens or (lambda text: len(text) // 4 + 1)
+        self.template_tokens = self.count_tokens(self.render(PromptUnit([], 0)))
+    
+    @property
+    def budget(self) -> int:
+        """Tokens available for page text in one prompt"""
+        return max(1, self.max_tokens - self.template_tokens)
+    
+    def split_page(self, text: str) -> List[str]:
+        """Split a page into parts within the budget, preferring section boundaries"""
+        if self.count_tokens(text) <= self.budget:
+            return [text]
+        
+        sections: List[List[str]] = [[]]
+        for line in text.split('\n'):
+            if sections[-1] and SECTION_BOUNDARY.match(line):
+                sections.append([])
+            sections[-1].append(line)
+        
+        parts: List[str] = []
+        current: List[str] = []
+        
+        def add(piece: str):
+            if current and self.count_tokens('\n'.join(current + [piece])) > self.budget:
+                parts.append('\n'.join(current))
+                current.clear()
+            current.append(piece)
+        
+        for section in sections:
+            section_text = '\n'.join(section)
+            if self.count_tokens(section_text) <= self.budget:
+                add(section_text)
+                continue
+            for line in section:
+                if self.count_tokens(line) <= self.budget:
+                    add(line)
+                    continue
+                # A single line over the budget: cut it by characters
+                width = max(1, len(line) * self.budget // self.count_tokens(line))
+                for start in range(0, len(line), width):
+                    add(line[start:start + width])
+        if current:
+            parts.append('\n'.join(current))
+        return parts
+    
+    def units(self, pages: Iterable[Tuple[int, str]]) -> Iterator[PromptUnit]:
+        """Group a stream of (zero-based page index, text) into prompt units, in page order"""
+        pending: List[PromptSegment] = []
+        pending_tokens = 0
+        
+        for page_num, text in pages:
+            tokens = self.count_tokens(text)
+            if tokens > self.budget:
+                if pending:
+                    yield PromptUnit(pending, pending_tokens)
+                    pending, pending_tokens = [], 0
+                parts = self.split_page(text)
+                for part, part_text in enumerate(parts):
+                    yield PromptUnit(
+                        [PromptSegment(page_num, part_text, part, part == len(parts) - 1)],
+                        self.count_tokens(part_text)
+                    )
+                continue
+            
+            if pending and (pending_tokens + tokens > self.budget or len(pending) >= self.max_pages):
+                yield PromptUnit(pending, pending_tokens)
+                pending, pending_tokens = [], 0
+            pending.append(PromptSegment(page_num, text))
+            pending_tokens += tokens
+        
+        if pending:
+            yield PromptUnit(pending, pending_tokens)
+    
+    @staticmethod
+    def body(unit: PromptUnit) -> str:
+        """Page text of a unit with page markers"""
+        blocks = []
+        for segment in unit.segments:
+            marker = f"=== PAGE {segment.page_num + 1}"
+            if segment.part or not segment.last_part:
+                marker += f" (part {segment.part + 1})"
+            blocks.append(f"{marker} ===\n{segment.text}")
+        return '\n\n'.join(blocks)
+    
+    def render(self, unit: PromptUnit) -> str:
+        return f"""
+        Extract NCA questionnaire questions from the pages below.
+        DO NOT include responses (Yes/No answers).
+        
+        For each question give its text, type, category/section, whether it is
+        required, any options (for selection questions) and help text. Set
+        "page" to the number in the PAGE marker the question appears under.
+        
+        Respond with JSON only, matching this schema:
+        {json.dumps(EXTRACTION_RESPONSE_SCHEMA, separators=(',', ':'))}
+        
+        {self.body(unit)}
+        """
+    
+    @staticmethod
+    def parse_response(response_text: str, unit: PromptUnit) -> Dict[int, List[Dict]]:
+        """
+        Validate a response against the schema and attribute records to pages
+        
+        Raises:
+            ValueError: If the response holds no usable JSON
+        """
+        text = response_text.strip()
+        fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+        if fenced:
+            text = fenced.group(1)
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get('questions')
+        if not isinstance(data, list):
+            raise ValueError("Response does not contain a question list")
+        
+        allowed_types = {'yes_no', 'text', 'date', 'selection', 'numeric'}
+        pages = {segment.page_num for segment in unit.segments}
+        records: Dict[int, List[Dict]] = {page_num: [] for page_num in pages}
+        
+        for item in data:
+            if not isinstance(item, dict) or not isinstance(item.get('text'), str) or not item['text'].strip():
+                continue
+            options = item.get('options')
+            record = {
+                'text': item['text'].strip(),
+                'type': item.get('type') if item.get('type') in allowed_types else 'text',
+                'category': item.get('category') if isinstance(item.get('category'), str) else 'General',
+                'required': item.get('required') if isinstance(item.get('required'), bool) else True,
+                'options': [str(option) for option in options] if isinstance(options, list) and options else None,
+                'help_text': item.get('help_text') if isinstance(item.get('help_text'), str) else ''
+            }
+            
+            page_num = item.get('page') - 1 if isinstance(item.get('page'), int) else None
+            if page_num not in pages:
+                # Attribute by locating the question text in the segments
+                probe = record['text'][:40]
+                page_num = next(
+                    (segment.page_num for segment in unit.segments if probe in segment.text),
+                    unit.segments[0].page_num
+                )
+            records[page_num].append(record)
+        
+        return records
+
+class TokenRateLimiter:
+    """Thread-safe token bucket limiting LLM traffic to a tokens-per-minute budget"""
+    
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self, tokens: int):
+        """Block until `tokens` can be spent without exceeding the budget"""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait = (tokens - self.available) / self.rate
+            time.sleep(wait)
+    
+    def debit(self, tokens: int):
+        """Charge tokens consumed beyond the estimate (e.g. the model's output)"""
+        with self.lock:
+            self._refill()
+            self.available -= tokens
+
+class LLMDispatcher:
+    """Thread pool for LLM calls shared by many producers, with a bound on queued work"""
+    
+    def __init__(self, max_workers: int, max_pending: Optional[int] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.slots = threading.BoundedSemaphore(max_pending or max_workers * 2)
+    
+    def submit(self, fn, *args):
+        """Submit a call, blocking while the dispatcher is saturated"""
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+class QuestionBatchWriter:
+    """
+    Accumulates questions from many files and writes them to the database in large batches
+    
+    Questions are tracked per source file until they are stored. A failed write
+    marks every file with questions in it as failed (see failed) rather than
+    the file whose add() triggered the flush; a file's on_written callback runs
+    once all of its questions are stored.
+    """
+    
+    def __init__(self, system: 'NCAQuestionnaireSystem', batch_size: int):
+        self.system = system
+        self.batch_size = batch_size
+        self.pending: Dict[str, Question] = {}
+        self.sources: Dict[str, Set[str]] = {}  # question id -> files it came from
+        self.outstanding: Dict[str, int] = {}  # file -> questions not stored yet
+        self.callbacks: Dict[str, Callable[[], None]] = {}
+        self.failed: Dict[str, str] = {}  # file -> error of the write that lost its questions
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.written = 0
+        self.write_seconds = 0.0
+    
+    def add(self, questions: List[Question], source: str = '', on_written: Optional[Callable[[], None]] = None):
+        """Buffer the questions of a source file (on_written runs after all of them are stored)"""
+        if not questions:
+            return
+        with self.lock:
+            if on_written is not None:
+                self.callbacks[source] = on_written
+            for question in questions:
+                self.pending[question.id] = question
+                sources = self.sources.setdefault(question.id, set())
+                if source not in sources:
+                    sources.add(source)
+                    self.outstanding[source] = self.outstanding.get(source, 0) + 1
+            if len(self.pending) >= self.batch_size:
+                self._flush_locked()
+    
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        
+        batch = list(self.pending.values())
+        start = time.perf_counter()
+        for i in range(0, len(batch), self.batch_size):
+            chunk = batch[i:i + self.batch_size]
+            try:
+                self.system._upsert_questions(chunk)
+                error = None
+                self.batches += 1
+                self.written += len(chunk)
+            except Exception as e:
+                error = str(e)
+                self.system._log_error('save_questions', "Error saving questions", e)
+            
+            for question in chunk:
+                del self.pending[question.id]
+                for source in self.sources.pop(question.id):
+                    if error is not None:
+                        self.failed.setdefault(source, error)
+                    self.outstanding[source] -= 1
+                    if self.outstanding[source] == 0:
+                        self._finish(source)
+        self.write_seconds += time.perf_counter() - start
+    
+    def _finish(self, source: str):
+        del self.outstanding[source]
+        callback = self.callbacks.pop(source, None)
+        if callback is None or source in self.failed:
+            return
+        try:
+            callback()
+        except Exception as e:
+            self.system._log_error('save_questions', f"Error finishing {source}", e)
@@ -0,0 +1,185 @@
+"""Counters and latency histograms with Prometheus text and JSON export"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    'stage_seconds': 'Time spent in each ingest and query stage',
+    'bot_operation_seconds': 'Latency of chatbot operations',
+    'bot_operations_total': 'Chatbot operations by outcome',
+    'llm_calls_total': 'Gemini calls by outcome',
+    'llm_tokens_total': 'Gemini tokens spent on question extraction',
+    'extraction_prompts_total': 'Question extraction prompts answered (including cached answers)',
+    'extraction_parse_failures_total': 'Extraction responses that fell back to manual parsing',
+    'extraction_fallback_ratio': 'Share of extraction responses that fell back to manual parsing',
+    'extraction_pages_total': 'Pages extracted, by method',
+    'ocr_pages_total': 'Scanned pages by OCR outcome',
+    'cache_hits_total': 'Cache hits by cache',
+    'cache_misses_total': 'Cache misses by cache',
+    'errors_total': 'Errors caught and logged, by operation',
+    'server_pending_operations': 'Bot operations admitted by the server and not yet finished',
+    'server_connections': 'Open WebSocket connections',
+    'server_rejections_total': 'Server requests rejected at the admission limit'
+}
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms
+    
+    Histograms use fixed buckets so they can be exported in Prometheus text
+    format; snapshot() returns the same data as JSON with estimated
+    percentiles. Collectors report values that are kept elsewhere (such as
+    cache hit counts) at export time.
+    """
+    
+    def __init__(self, namespace: str = "nca", buckets: Iterable[float] = METRIC_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+        self.collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, Any], float]]]] = []
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple]:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one duration in a histogram"""
+        key = self._key(name, labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0, 'max': 0.0}
+                self.histograms[key] = histogram
+            histogram['counts'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            histogram['max'] = max(histogram['max'], seconds)
+    
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the enclosed block into a histogram (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, Any], float]]]):
+        """Register a callable yielding (name, 'counter' or 'gauge', labels, value) at export time"""
+        self.collectors.append(collector)
+    
+    def counter(self, name: str, **labels) -> float:
+        with self.lock:
+            return self.counters.get(self._key(name, labels), 0)
+    
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+    
+    def _quantile(self, counts: List[int], total: int, q: float, max_value: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket (like Prometheus histogram_quantile)"""
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else max_value
+                return min(lower + (upper - lower) * (rank - cumulative) / count, max_value)
+            cumulative += count
+        return max_value
+    
+    def _samples(self) -> Tuple[Dict, Dict, Dict]:
+        """Copy counters, gauges and histograms, including collected values"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self.histograms.items()}
+        gauges = {}
+        for collector in self.collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    target = gauges if kind == 'gauge' else counters
+                    key = self._key(name, labels)
+                    target[key] = target.get(key, 0) + value
+            except Exception as e:
+                logger.error("Error collecting metrics: %s", e, exc_info=True)
+        return counters, gauges, histograms
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as JSON-serializable data: {kind: {name: [{'labels': ..., ...}]}}"""
+        counters, gauges, histograms = self._samples()
+        snapshot = {'counters': {}, 'gauges': {}, 'histograms': {}}
+        for kind, samples in (('counters', counters), ('gauges', gauges)):
+            for (name, labels), value in sorted(samples.items()):
+                snapshot[kind].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), histogram in sorted(histograms.items()):
+            count = histogram['count']
+            snapshot['histograms'].setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': count,
+                'sum': histogram['sum'],
+                'mean': histogram['sum'] / count if count else 0.0,
+                'p50': self._quantile(histogram['counts'], count, 0.5, histogram['max']),
+                'p99': self._quantile(histogram['counts'], count, 0.99, histogram['max']),
+                'max': histogram['max']
+            })
+        return snapshot
+    
+    @staticmethod
+    def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+        escaped = [
+            '%s="%s"' % (label, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for label, value in labels
+        ]
+        return '{%s}' % ','.join(escaped) if escaped else ''
+    
+    def to_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        counters, gauges, histograms = self._samples()
+        lines = []
+        
+        def header(name: str, kind: str):
+            full_name = f"{self.namespace}_{name}"
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {full_name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            return full_name
+        
+        for kind, samples in (('counter', counters), ('gauge', gauges)):
+            previous = None
+            for (name, labels), value in sorted(samples.items()):
+                if name != previous:
+                    full_name = header(name, kind)
+                    previous = name
+                lines.append(f"{full_name}{self._format_labels(labels)} {value:g}")
+        
+        previous = None
+        for (name, labels), histogram in sorted(histograms.items()):
+            if name != previous:
+                full_name = header(name, 'histogram')
+                previous = name
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram['counts']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{full_name}_bucket{self._format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{full_name}_sum{self._format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{full_name}_count{self._format_labels(labels)} {histogram['count']}")
+        
+        return '\n'.join(lines) + '\n'
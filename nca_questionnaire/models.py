@@ -0,0 +1,52 @@
+"""Questionnaire data model shared by ingest, storage and the chatbot"""
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Any, Dict, List
+
+class QuestionType(Enum):
+    YES_NO = "yes_no"
+    TEXT = "text"
+    DATE = "date"
+    SELECTION = "selection"
+    MULTI_SELECT = "multi_select"
+    NUMERIC = "numeric"
+
+@dataclass
+class Question:
+    id: str
+    text: str
+    type: QuestionType
+    category: str
+    country: str
+    required: bool = True
+    options: List[str] = None
+    help_text: str = ""
+    regulatory_context: str = ""
+    compliance_area: str = ""
+    page: int = 0
+    page_hash: str = ""
+    position: int = 0
+    duplicates: List[Dict[str, Any]] = None  # near-duplicates merged into this question
+
+@dataclass
+class UserResponse:
+    question_id: str
+    answer: Any
+    timestamp: str
+    confidence: float = 1.0
+
+QUESTION_FIELDS = [field.name for field in fields(Question)]
+
+@dataclass
+class SearchResult:
+    """A question returned by semantic search, with its cosine similarity to the query"""
+    question: Question
+    score: float
+
+@dataclass
+class DuplicateGroup:
+    """Near-duplicate questions merged into one canonical question"""
+    canonical_id: str
+    canonical_text: str
+    countries: List[str]
+    members: List[Dict[str, Any]]  # id, text, country, page, similarity to the canonical question
@@ -0,0 +1,191 @@
+"""
+OCR fallback for scanned questionnaire pages
+
+A page whose text layer is (nearly) empty but which carries images is
+rendered and recognized in a process pool. The recognized text is cached by a
+hash of the page's drawing commands and images, so re-uploading a scan does
+not render or recognize it again.
+
+pytesseract and the tesseract binary are optional; without them scanned pages
+are skipped (with a warning) instead of being sent to Gemini empty.
+"""
+import hashlib
+import importlib.util
+import io
+import logging
+import shutil
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .ingest import LLMResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering or recognition changes so cached text is not reused
+OCR_VERSION = "1"
+
+# Pages with fewer characters in their text layer are treated as scanned
+OCR_MIN_TEXT_CHARS = 16
+
+def tesseract_ocr(png: bytes, lang: str = "eng") -> str:
+    """Recognize a rendered page with Tesseract"""
+    import pytesseract
+    from PIL import Image
+    
+    return pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=lang)
+
+def tesseract_available() -> bool:
+    return importlib.util.find_spec("pytesseract") is not None and shutil.which("tesseract") is not None
+
+def needs_ocr(page, text: str, min_text_chars: int = OCR_MIN_TEXT_CHARS) -> bool:
+    """Whether a PyMuPDF page has no usable text layer but has images to recognize"""
+    return len(text.strip()) < min_text_chars and bool(page.get_images())
+
+def page_content_hash(page) -> str:
+    """Hash of a page's size, drawing commands and embedded images; identifies a scan without rendering it"""
+    digest = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(page.parent.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+def _ocr_page(pdf_path: str, page_num: int, dpi: int, engine: Callable[[bytes], str]) -> str:
+    """Process-pool worker: render one page in grayscale and recognize it"""
+    import fitz  # PyMuPDF
+    
+    doc = fitz.open(pdf_path)
+    try:
+        png = doc[page_num].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+    finally:
+        doc.close()
+    return engine(png)
+
+class PageOCR:
+    """
+    Recognizes scanned pages in a process pool, caching the text per page content hash
+    
+    submit() returns a future so callers can keep reading the PDF while pages
+    are recognized; result() turns failures into empty text.
+    """
+    
+    def __init__(self, cache: Optional[LLMResponseCache] = None, engine: Optional[Callable[[bytes], str]] = None,
+                 engine_name: str = "tesseract", dpi: int = 300, processes: Optional[int] = None,
+                 min_text_chars: int = OCR_MIN_TEXT_CHARS):
+        """
+        Args:
+            cache: Cache of recognized text (None disables caching)
+            engine: Picklable callable turning a PNG into text (Tesseract when installed)
+            engine_name: Name of the engine in cache keys
+            dpi: Rendering resolution
+            processes: Size of the OCR process pool (defaults to the CPU count)
+            min_text_chars: Pages whose text layer is shorter than this are recognized
+        """
+        if engine is None and tesseract_available():
+            engine = tesseract_ocr
+        self.engine = engine
+        self.engine_name = engine_name
+        self.cache = cache
+        self.dpi = dpi
+        self.processes = processes
+        self.min_text_chars = min_text_chars
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.in_flight: Dict[Future, str] = {}  # future -> page hash, until its result is read
+        self.lock = threading.Lock()
+        self.counts = {'recognized': 0, 'cached': 0, 'failed': 0, 'unavailable': 0}
+    
+    @property
+    def available(self) -> bool:
+        return self.engine is not None
+    
+    def needs_ocr(self, page, text: str) -> bool:
+        return needs_ocr(page, text, self.min_text_chars)
+    
+    def _count(self, outcome: str):
+        with self.lock:
+            self.counts[outcome] += 1
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self.pool
+    
+    def cache_key(self, page_hash: str) -> str:
+        return LLMResponseCache.make_key(self.engine_name, f"ocr-{OCR_VERSION}-{self.dpi}", page_hash)
+    
+    def submit(self, pdf_path: str, page_num: int, page_hash: str, pool: Optional[Executor] = None) -> Future:
+        """
+        Start recognizing a page (or return its cached text)
+        
+        Args:
+            pdf_path: PDF containing the page
+            page_num: Zero-based page index
+            page_hash: page_content_hash() of the page
+            pool: Executor to run on instead of the OCR pool (e.g. the bulk ingest pool)
+        """
+        future: Future = Future()
+        cached = self.cache.get(self.cache_key(page_hash)) if self.cache else None
+        if cached is not None:
+            self._count('cached')
+            future.set_result(cached)
+        elif self.engine is None:
+            with self.lock:
+                if not self.counts['unavailable']:
+                    logger.warning("Scanned pages found but OCR is not available "
+                                   "(pip install pytesseract and install tesseract); skipping them")
+                self.counts['unavailable'] += 1
+            future.set_result("")
+        else:
+            future = (pool or self._get_pool()).submit(_ocr_page, pdf_path, page_num, self.dpi, self.engine)
+            with self.lock:
+                self.in_flight[future] = page_hash
+        return future
+    
+    def result(self, future: Future) -> str:
+        """Text of a submitted page; empty if recognition failed"""
+        with self.lock:
+            page_hash = self.in_flight.pop(future, None)
+        try:
+            text = future.result()
+        except Exception as e:
+            self._count('failed')
+            logger.error("Error recognizing scanned page: %s", e, exc_info=True)
+            return ""
+        
+        if page_hash is not None:
+            self._count('recognized')
+            if self.cache:
+                self.cache.put(self.cache_key(page_hash), text)
+        return text
+    
+    def abandon(self, future: Future):
+        """
+        Give up on a submitted page whose result will not be read
+        
+        A page that has not started is cancelled; one that is being recognized
+        or is finished still has its text cached, so a later pass over the
+        same page does not recognize it again.
+        """
+        if future.cancel():
+            with self.lock:
+                self.in_flight.pop(future, None)
+        else:
+            future.add_done_callback(self.result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pages by outcome and cache hit counters"""
+        with self.lock:
+            stats: Dict[str, Any] = dict(self.counts)
+        stats['available'] = self.available
+        if self.cache:
+            cache_stats = self.cache.stats()
+            stats['hits'] = cache_stats['hits']
+            stats['misses'] = cache_stats['misses']
+        return stats
+    
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
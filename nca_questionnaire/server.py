@@ -0,0 +1,432 @@
+"""
+Async HTTP and WebSocket front end for NCAQuestionnaireBot
+
+One event loop serves every chat connection. Bot operations read and write
+SQLite and ChromaDB (and may embed text for prefill suggestions), so they run
+on a bounded thread pool shared by all users. Requests beyond the admission
+limit are answered with 503 instead of queueing without bound. Operations on
+the same session run one at a time, and each WebSocket connection is routed
+to the session it started or resumed.
+
+    python -m nca_questionnaire.server --host 0.0.0.0 --port 8080
+
+HTTP (JSON bodies and responses):
+
+    POST   /sessions                          {"user_id", "country"?, "session_id"?}
+    POST   /sessions/{id}/country             {"country"}
+    GET    /sessions/{id}/question
+    POST   /sessions/{id}/answer              {"answer", "confidence"?}
+    POST   /sessions/{id}/skip
+    GET    /sessions/{id}/progress            ?include_missing=0&recompute=1
+    GET    /sessions/{id}/suggestions
+    POST   /sessions/{id}/suggestions/accept  {"min_confidence"?} (all at once when given)
+    DELETE /sessions/{id}
+    GET    /countries, /metrics, /health
+
+WebSocket (/ws): send {"op": <bot method>, "id"?: any, ...arguments}; replies
+carry the same op and id with either "result" or "error". The connection uses
+the session from its last start_session, so later messages need no session_id.
+
+Requires aiohttp (pip install aiohttp).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple
+
+try:
+    from aiohttp import WSMsgType, web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    web = None
+    AIOHTTP_AVAILABLE = False
+
+from .bot import NCAQuestionnaireBot
+
+if TYPE_CHECKING:
+    from .system import NCAQuestionnaireSystem
+
+logger = logging.getLogger(__name__)
+
+# operation -> (required arguments, optional arguments)
+SERVER_OPERATIONS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    'start_session': (('user_id',), ('country',)),
+    'select_country': (('country',), ()),
+    'get_next_question': ((), ()),
+    'submit_answer': (('answer',), ('confidence',)),
+    'skip_question': ((), ()),
+    'get_progress': ((), ('include_missing', 'recompute')),
+    'get_suggestions': ((), ()),
+    'accept_suggestion': ((), ()),
+    'accept_suggestions': ((), ('min_confidence',)),
+    'end_session': ((), ())
+}
+
+class ServiceOverloaded(Exception):
+    """Raised when the bot service is at its admission limit"""
+
+class BotService:
+    """
+    Runs NCAQuestionnaireBot operations for an asyncio server
+    
+    Blocking bot calls go to a fixed-size thread pool, so thousands of
+    connections share a handful of threads. At most max_pending operations are
+    admitted at a time (running or waiting for a thread); beyond that call()
+    raises ServiceOverloaded so callers shed load instead of building a queue.
+    Every operation needs an explicit session_id: the bot's "current session"
+    belongs to whichever user started a session last.
+    """
+    
+    def __init__(self, bot: NCAQuestionnaireBot, max_workers: int = 16, max_pending: int = 1024):
+        """
+        Args:
+            bot: Bot shared by all connections
+            max_workers: Threads running blocking bot operations
+            max_pending: Operations admitted before new ones are rejected
+        """
+        self.bot = bot
+        self.system = bot.system
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nca-bot")
+        self.pending = 0
+        self.connections = 0
+        self.session_locks: 'weakref.WeakValueDictionary[str, asyncio.Lock]' = weakref.WeakValueDictionary()
+        self.system.metrics.add_collector(self._collect_metrics)
+    
+    def _collect_metrics(self) -> Iterator[Tuple[str, str, Dict[str, Any], float]]:
+        yield 'server_pending_operations', 'gauge', {}, self.pending
+        yield 'server_connections', 'gauge', {}, self.connections
+    
+    @staticmethod
+    def new_session_id() -> str:
+        return f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        # Locks are only referenced while an operation holds or waits for them
+        lock = self.session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.session_locks[session_id] = lock
+        return lock
+    
+    async def run(self, fn, *args, session_lock: Optional[asyncio.Lock] = None, **kwargs) -> Any:
+        """
+        Run a blocking call on the worker pool, subject to the admission limit
+        
+        Args:
+            fn: Blocking callable, called with the remaining arguments
+            session_lock: Lock held around the call (waiting for it counts as pending)
+        """
+        if self.pending >= self.max_pending:
+            self.system.metrics.inc('server_rejections_total')
+            raise ServiceOverloaded(f"{self.pending} operations pending")
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = partial(fn, *args, **kwargs)
+            if session_lock is None:
+                return await loop.run_in_executor(self.executor, call)
+            async with session_lock:
+                return await loop.run_in_executor(self.executor, call)
+        finally:
+            self.pending -= 1
+    
+    async def call(self, operation: str, session_id: Optional[str], arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run one bot operation for a session
+        
+        Args:
+            operation: Bot method name (see SERVER_OPERATIONS)
+            session_id: Session to act on; start_session creates one when omitted
+            arguments: Operation arguments; unknown keys are ignored
+        
+        Returns:
+            The bot's result dict (successful start_session results include the session_id)
+        """
+        if operation not in SERVER_OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}'")
+        
+        arguments = arguments or {}
+        required, optional = SERVER_OPERATIONS[operation]
+        missing = [name for name in required if arguments.get(name) is None]
+        if missing:
+            raise ValueError(f"{operation} requires {', '.join(missing)}")
+        kwargs = {name: arguments[name] for name in required + optional if arguments.get(name) is not None}
+        
+        if not session_id:
+            if operation != 'start_session':
+                raise ValueError(f"{operation} requires a session_id")
+            # A generated id is new, so there is nothing to resume
+            session_id = self.new_session_id()
+            kwargs['resume'] = False
+        
+        return await self.run(getattr(self.bot, operation), session_id=session_id,
+                              session_lock=self._session_lock(session_id), **kwargs)
+    
+    def close(self):
+        """Wait for running operations and persist buffered answers"""
+        self.executor.shutdown(wait=True)
+        self.system.flush_responses()
+
+def _json_error(status: int, message: str, **headers) -> 'web.Response':
+    return web.json_response({'success': False, 'message': message}, status=status, headers=headers or None)
+
+def _result_status(result: Dict[str, Any]) -> int:
+    # Finishing the questionnaire is reported with success False but is not an error
+    if isinstance(result, dict) and result.get('success') is False and not result.get('completed'):
+        return 400
+    return 200
+
+def _flag(value: Optional[str]) -> bool:
+    return value is not None and value.lower() in ('1', 'true', 'yes')
+
+class QuestionnaireServer:
+    """HTTP and WebSocket routes over a BotService"""
+    
+    def __init__(self, service: BotService, end_sessions_on_close: bool = False):
+        """
+        Args:
+            service: Service running the bot operations
+            end_sessions_on_close: End a WebSocket's session when it disconnects
+                (by default the session stays resumable until it goes idle)
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp not installed. Run: pip install aiohttp")
+        self.service = service
+        self.end_sessions_on_close = end_sessions_on_close
+    
+    def create_app(self) -> 'web.Application':
+        app = web.Application()
+        app.add_routes([
+            web.post('/sessions', self.start_session),
+            web.post('/sessions/{session_id}/country', self.select_country),
+            web.get('/sessions/{session_id}/question', self.get_next_question),
+            web.post('/sessions/{session_id}/answer', self.submit_answer),
+            web.post('/sessions/{session_id}/skip', self.skip_question),
+            web.get('/sessions/{session_id}/progress', self.get_progress),
+            web.get('/sessions/{session_id}/suggestions', self.get_suggestions),
+            web.post('/sessions/{session_id}/suggestions/accept', self.accept_suggestions),
+            web.delete('/sessions/{session_id}', self.end_session),
+            web.get('/countries', self.countries),
+            web.get('/metrics', self.metrics),
+            web.get('/health', self.health),
+            web.get('/ws', self.websocket)
+        ])
+        app.on_cleanup.append(self._cleanup)
+        return app
+    
+    async def _cleanup(self, app: 'web.Application'):
+        await asyncio.get_running_loop().run_in_executor(None, self.service.close)
+    
+    # =================== HTTP ===================
+    
+    async def _call(self, operation: str, session_id: Optional[str], arguments: Optional[Dict[str, Any]] = None) -> 'web.Response':
+        try:
+            result = await self.service.call(operation, session_id, arguments)
+        except ServiceOverloaded:
+            return _json_error(503, "Server busy, retry shortly.", **{'Retry-After': '1'})
+        except ValueError as e:
+            return _json_error(400, str(e))
+        except Exception as e:
+            self.service.system._log_error(operation, f"Error in {operation}", e)
+            return _json_error(500, "Internal error.")
+        return web.json_response(result, status=_result_status(result))
+    
+    @staticmethod
+    async def _body(request: 'web.Request') -> Dict[str, Any]:
+        if not request.can_read_body:
+            return {}
+        try:
+            body = await request.json()
+        except ValueError:
+            raise ValueError("Request body must be a JSON object")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+    
+    async def _call_with_body(self, operation: str, request: 'web.Request', session_id: Optional[str]) -> 'web.Response':
+        try:
+            body = await self._body(request)
+        except ValueError as e:
+            return _json_error(400, str(e))
+        return await self._call(operation, session_id, body)
+    
+    async def start_session(self, request: 'web.Request') -> 'web.Response':
+        try:
+            body = await self._body(request)
+        except ValueError as e:
+            return _json_error(400, str(e))
+        return await self._call('start_session', body.get('session_id'), body)
+    
+    async def select_country(self, request: 'web.Request') -> 'web.Response':
+        return await self._call_with_body('select_country', request, request.match_info['session_id'])
+    
+    async def get_next_question(self, request: 'web.Request') -> 'web.Response':
+        return await self._call('get_next_question', request.match_info['session_id'])
+    
+    async def submit_answer(self, request: 'web.Request') -> 'web.Response':
+        return await self._call_with_body('submit_answer', request, request.match_info['session_id'])
+    
+    async def skip_question(self, request: 'web.Request') -> 'web.Response':
+        return await self._call('skip_question', request.match_info['session_id'])
+    
+    async def get_progress(self, request: 'web.Request') -> 'web.Response':
+        return await self._call('get_progress', request.match_info['session_id'], {
+            'include_missing': _flag(request.query.get('include_missing', '1')),
+            'recompute': _flag(request.query.get('recompute'))
+        })
+    
+    async def get_suggestions(self, request: 'web.Request') -> 'web.Response':
+        return await self._call('get_suggestions', request.match_info['session_id'])
+    
+    async def accept_suggestions(self, request: 'web.Request') -> 'web.Response':
+        try:
+            body = await self._body(request)
+        except ValueError as e:
+            return _json_error(400, str(e))
+        operation = 'accept_suggestions' if 'min_confidence' in body else 'accept_suggestion'
+        return await self._call(operation, request.match_info['session_id'], body)
+    
+    async def end_session(self, request: 'web.Request') -> 'web.Response':
+        return await self._call('end_session', request.match_info['session_id'])
+    
+    async def countries(self, request: 'web.Request') -> 'web.Response':
+        try:
+            countries = await self.service.run(self.service.system.get_countries)
+        except ServiceOverloaded:
+            return _json_error(503, "Server busy, retry shortly.", **{'Retry-After': '1'})
+        return web.json_response({'success': True, 'countries': countries})
+    
+    async def metrics(self, request: 'web.Request') -> 'web.Response':
+        return web.Response(text=self.service.system.prometheus_metrics(), content_type='text/plain')
+    
+    async def health(self, request: 'web.Request') -> 'web.Response':
+        return web.json_response({
+            'success': True,
+            'pending': self.service.pending,
+            'max_pending': self.service.max_pending,
+            'connections': self.service.connections
+        })
+    
+    # =================== WEBSOCKET ===================
+    
+    async def websocket(self, request: 'web.Request') -> 'web.WebSocketResponse':
+        """
+        One chat connection
+        
+        Messages are handled in arrival order, one at a time; a client that
+        sends faster than the bot answers is slowed down by the socket itself.
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.service.connections += 1
+        session_id = request.query.get('session_id')
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    if message.type == WSMsgType.ERROR:
+                        logger.warning("WebSocket closed with error: %s", ws.exception())
+                    continue
+                
+                reply, session_id = await self._handle_message(message.data, session_id)
+                await ws.send_json(reply)
+        finally:
+            self.service.connections -= 1
+            if self.end_sessions_on_close and session_id:
+                try:
+                    await self.service.call('end_session', session_id)
+                except Exception as e:
+                    self.service.system._log_error('end_session', f"Error ending session {session_id}", e)
+        return ws
+    
+    async def _handle_message(self, data: str, session_id: Optional[str]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Run one WebSocket message; returns the reply and the connection's session"""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return {'error': "Message must be a JSON object"}, session_id
+        if not isinstance(message, dict):
+            return {'error': "Message must be a JSON object"}, session_id
+        
+        operation = message.get('op')
+        reply: Dict[str, Any] = {'op': operation}
+        if 'id' in message:
+            reply['id'] = message['id']
+        
+        target = message.get('session_id') or session_id
+        if operation == 'start_session':
+            target = message.get('session_id')
+        
+        try:
+            result = await self.service.call(operation, target, message)
+        except ServiceOverloaded:
+            reply.update(error="overloaded", retry_after=1)
+            return reply, session_id
+        except ValueError as e:
+            reply['error'] = str(e)
+            return reply, session_id
+        except Exception as e:
+            self.service.system._log_error(operation, f"Error in {operation}", e)
+            reply['error'] = "Internal error"
+            return reply, session_id
+        
+        if operation == 'start_session' and 'session_id' in result:
+            session_id = result['session_id']
+        elif operation == 'end_session' and target == session_id and result.get('success'):
+            session_id = None
+        reply['result'] = result
+        return reply, session_id
+
+def create_app(system: 'NCAQuestionnaireSystem', max_workers: int = 16, max_pending: int = 1024,
+               end_sessions_on_close: bool = False, **bot_options) -> 'web.Application':
+    """
+    Build the aiohttp application for a questionnaire system
+    
+    Args:
+        system: Questionnaire system holding questions and responses
+        max_workers: Threads running blocking bot operations
+        max_pending: Operations admitted before requests are rejected with 503
+        end_sessions_on_close: End a WebSocket's session when it disconnects
+        **bot_options: Passed to NCAQuestionnaireBot (e.g. prefill=True)
+    """
+    service = BotService(NCAQuestionnaireBot(system, **bot_options), max_workers, max_pending)
+    return QuestionnaireServer(service, end_sessions_on_close).create_app()
+
+def run_server(system: 'NCAQuestionnaireSystem', host: str = "0.0.0.0", port: int = 8080, **options):
+    """Serve the questionnaire bot until interrupted (options as for create_app)"""
+    web.run_app(create_app(system, **options), host=host, port=port, print=logger.info)
+
+def main():
+    from .system import NCAQuestionnaireSystem
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="NCA questionnaire chatbot server (HTTP and WebSocket)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Gemini API key (defaults to $GEMINI_API_KEY)")
+    parser.add_argument("--db-path", default=os.environ.get("NCA_DB_PATH", "./nca_system_db"))
+    parser.add_argument("--host", default=os.environ.get("NCA_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("NCA_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=16, help="Threads running blocking bot operations")
+    parser.add_argument("--max-pending", type=int, default=1024,
+                        help="Operations admitted before requests are rejected with 503")
+    parser.add_argument("--prefill", action="store_true", help="Suggest answers from earlier sessions")
+    args = parser.parse_args()
+    
+    if not args.api_key:
+        parser.error("a Gemini API key is required (--api-key or GEMINI_API_KEY)")
+    
+    system = NCAQuestionnaireSystem(gemini_api_key=args.api_key, db_path=args.db_path)
+    run_server(system, args.host, args.port, max_workers=args.workers,
+               max_pending=args.max_pending, prefill=args.prefill)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,582 @@
+"""Question catalogue cache and user response stores"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .models import Question, UserResponse
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class QuestionCatalogue:
+    """Snapshot of a country's questions with a category index; shared, treat as read-only"""
+    country: str
+    version: int
+    questions: Tuple[Question, ...]
+    by_category: Dict[str, Tuple[Question, ...]]
+    by_id: Dict[str, Question]
+    loaded_at: float
+    
+    @classmethod
+    def build(cls, country: str, version: int, questions: List[Question]) -> 'QuestionCatalogue':
+        by_category: Dict[str, List[Question]] = {}
+        for question in questions:
+            by_category.setdefault(question.category, []).append(question)
+        return cls(
+            country=country,
+            version=version,
+            questions=tuple(questions),
+            by_category={category: tuple(qs) for category, qs in by_category.items()},
+            by_id={question.id: question for question in questions},
+            loaded_at=time.monotonic()
+        )
+
+class QuestionCatalogueCache:
+    """
+    In-process per-country question catalogue cache
+    
+    Entries are invalidated by bumping the country's version stamp (done on
+    every question write in this process), expire after an optional TTL (for
+    writes made by other processes) and are evicted least recently used once
+    the total number of cached questions exceeds max_questions. Concurrent
+    misses for the same country share a single load.
+    """
+    
+    def __init__(self, loader: Callable[[str], List[Question]], ttl: Optional[float] = None,
+                 max_questions: int = 200000):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_questions = max_questions
+        self.entries: 'OrderedDict[str, QuestionCatalogue]' = OrderedDict()
+        self.versions: Dict[str, int] = {}
+        self.cached_questions = 0
+        self.lock = threading.Lock()
+        self.load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _fresh_entry(self, country: str) -> Optional[QuestionCatalogue]:
+        entry = self.entries.get(country)
+        if entry is None:
+            return None
+        if entry.version != self.versions.get(country, 0) or (
+                self.ttl is not None and time.monotonic() - entry.loaded_at > self.ttl):
+            self._drop(country)
+            return None
+        self.entries.move_to_end(country)
+        return entry
+    
+    def _drop(self, country: str):
+        entry = self.entries.pop(country, None)
+        if entry is not None:
+            self.cached_questions -= len(entry.questions)
+    
+    def get(self, country: str) -> QuestionCatalogue:
+        """Return the catalogue of a country, loading it on a miss"""
+        with self.lock:
+            entry = self._fresh_entry(country)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            load_lock = self.load_locks.setdefault(country, threading.Lock())
+        
+        with load_lock:
+            with self.lock:
+                # Another thread may have loaded it while we waited
+                entry = self._fresh_entry(country)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+                version = self.versions.get(country, 0)
+            
+            entry = QuestionCatalogue.build(country, version, self.loader(country))
+            
+            with self.lock:
+                if self.versions.get(country, 0) == version:
+                    self._drop(country)
+                    self.entries[country] = entry
+                    self.cached_questions += len(entry.questions)
+                    while self.cached_questions > self.max_questions and len(self.entries) > 1:
+                        evicted, _ = next(iter(self.entries.items()))
+                        self._drop(evicted)
+                        self.evictions += 1
+            return entry
+    
+    def invalidate(self, country: Optional[str] = None):
+        """Bump the version stamp of one country (or all) so cached catalogues are reloaded"""
+        with self.lock:
+            countries = [country] if country else list(set(self.versions) | set(self.entries))
+            for name in countries:
+                self.versions[name] = self.versions.get(name, 0) + 1
+                self._drop(name)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'countries': len(self.entries),
+                'questions': self.cached_questions
+            }
+
+class ResponseStore:
+    """Persistence interface for user responses keyed by (user_id, session_id, question_id)"""
+    
+    def save(self, user_id: str, session_id: str, response: UserResponse):
+        """Insert or replace one response"""
+        self.save_many([(user_id, session_id, response)])
+    
+    def save_many(self, records: List[Tuple[str, str, UserResponse]]):
+        """Insert or replace many (user_id, session_id, response) records in one write"""
+        raise NotImplementedError
+    
+    def get(self, user_id: str, session_id: Optional[str] = None,
+            exclude_session: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Return {question_id: {'answer', 'timestamp', 'confidence'}} for a user
+        
+        Args:
+            user_id: User whose answers are returned
+            session_id: Only answers given in this session
+            exclude_session: Leave out answers given in this session
+        """
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+class SQLiteResponseStore(ResponseStore):
+    """Response store backed by a local SQLite database in WAL mode"""
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "user_id TEXT NOT NULL, session_id TEXT NOT NULL, question_id TEXT NOT NULL, "
+            "answer TEXT NOT NULL, timestamp TEXT NOT NULL, confidence REAL NOT NULL DEFAULT 1.0, "
+            "PRIMARY KEY (user_id, session_id, question_id)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY, records INTEGER NOT NULL)")
+        self.conn.commit()
+    
+    def import_once(self, source: str, load: Callable[[], List[Tuple[str, str, UserResponse]]]) -> int:
+        """
+        Copy responses from an older store the first time this store is opened empty
+        
+        Args:
+            source: Name of the older store; each source is imported at most once
+            load: Returns the older store's (user_id, session_id, response) records
+            
+        Returns:
+            Number of imported responses
+        """
+        with self.lock:
+            done = self.conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone()
+            empty = self.conn.execute("SELECT 1 FROM responses LIMIT 1").fetchone() is None
+        if done:
+            return 0
+        
+        records = load() if empty else []
+        if records:
+            self.save_many(records)
+        with self.lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO imports (source, records) VALUES (?, ?)",
+                                  (source, len(records)))
+        return len(records)
+    
+    def save_many(self, records: List[Tuple[str, str, UserResponse]]):
+        rows = [
+            (user_id, session_id, response.question_id, str(response.answer), response.timestamp, response.confidence)
+            for user_id, session_id, response in records
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO responses (user_id, session_id, question_id, answer, timestamp, confidence) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, session_id, question_id) DO UPDATE SET "
+                    "answer = excluded.answer, timestamp = excluded.timestamp, confidence = excluded.confidence",
+                    rows
+                )
+    
+    def get(self, user_id: str, session_id: Optional[str] = None,
+            exclude_session: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        query = "SELECT question_id, answer, timestamp, confidence FROM responses WHERE user_id = ?"
+        params = [user_id]
+        if session_id:
+            query += " AND session_id = ?"
+            params.append(session_id)
+        if exclude_session:
+            query += " AND session_id != ?"
+            params.append(exclude_session)
+        # Oldest first, so the latest answer wins when several sessions answered a question
+        query += " ORDER BY timestamp"
+        
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        
+        return {
+            question_id: {'answer': answer, 'timestamp': timestamp, 'confidence': confidence}
+            for question_id, answer, timestamp, confidence in rows
+        }
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class ChromaResponseStore(ResponseStore):
+    """Legacy response store in a ChromaDB collection (embeds every answer)"""
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    def save_many(self, records: List[Tuple[str, str, UserResponse]]):
+        self.collection.upsert(
+            documents=[str(response.answer) for _, _, response in records],
+            metadatas=[{
+                'user_id': user_id,
+                'question_id': response.question_id,
+                'answer': str(response.answer),
+                'session_id': session_id,
+                'timestamp': response.timestamp,
+                'confidence': response.confidence
+            } for user_id, session_id, response in records],
+            ids=[f"{user_id}_{response.question_id}_{session_id}" for user_id, session_id, response in records]
+        )
+    
+    def all_records(self) -> List[Tuple[str, str, UserResponse]]:
+        """Every stored (user_id, session_id, response), e.g. to migrate to another store"""
+        results = self.collection.get(include=["metadatas"])
+        return [
+            (metadata['user_id'], metadata['session_id'], UserResponse(
+                question_id=metadata['question_id'],
+                answer=metadata['answer'],
+                timestamp=metadata['timestamp'],
+                confidence=metadata.get('confidence', 1.0)
+            ))
+            for metadata in results['metadatas']
+        ]
+    
+    def get(self, user_id: str, session_id: Optional[str] = None,
+            exclude_session: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        conditions = [{'user_id': user_id}]
+        if session_id:
+            conditions.append({'session_id': session_id})
+        if exclude_session:
+            conditions.append({'session_id': {'$ne': exclude_session}})
+        where_clause = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+        
+        results = self.collection.get(where=where_clause, include=["metadatas"])
+        
+        responses = {}
+        for metadata in sorted(results['metadatas'], key=lambda m: m['timestamp']):
+            responses[metadata['question_id']] = {
+                'answer': metadata['answer'],
+                'timestamp': metadata['timestamp'],
+                'confidence': metadata.get('confidence', 1.0)
+            }
+        return responses
+
+class WriteBehindResponseStore(ResponseStore):
+    """
+    Wraps a ResponseStore, acknowledging writes immediately and flushing them in batches
+    
+    Buffered answers are flushed when max_batch are pending, when the oldest is
+    max_delay seconds old, on flush() (e.g. at session end) and at exit. Reads
+    see buffered answers, including those being flushed. Durability:
+        'memory'  - answers buffered only in memory; lost if the process dies before a flush
+        'journal' - answers are appended to a local journal before being acknowledged and
+                    replayed on startup; survives a process crash
+        'fsync'   - like 'journal' but fsyncs every append; survives power loss
+    
+    Every store owns its journal (journal_path.<owner>), locked with flock for
+    as long as it is open; on startup only journals whose lock is free, i.e.
+    whose process has died, are replayed. Journaling requires a POSIX system.
+    """
+    
+    DURABILITY_LEVELS = ('memory', 'journal', 'fsync')
+    
+    def __init__(self, store: ResponseStore, max_batch: int = 100, max_delay: float = 1.0,
+                 durability: str = 'journal', journal_path: Optional[str] = None):
+        if durability not in self.DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {self.DURABILITY_LEVELS}")
+        if durability != 'memory' and not journal_path:
+            raise ValueError("journal_path is required unless durability is 'memory'")
+        
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.durability = durability
+        self.journal_path = journal_path
+        
+        self.pending: 'OrderedDict[Tuple[str, str, str], UserResponse]' = OrderedDict()
+        self.flushing: 'OrderedDict[Tuple[str, str, str], UserResponse]' = OrderedDict()  # batch being written
+        self.oldest_pending_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.closed = False
+        
+        self.flushes = 0
+        self.flushed_records = 0
+        self.failed_flushes = 0
+        self.max_pending = 0
+        self.flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        
+        self.journal = None
+        self.journal_file = None
+        self.journal_lock = None
+        if durability != 'memory':
+            owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self.journal_file = f"{journal_path}.{owner}"
+            self.journal_lock = self._lock_journal(owner, blocking=True)
+            self._replay_journals()
+            self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        
+        self.flusher = threading.Thread(target=self._run_flusher, name="response-write-behind", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+    
+    def _lock_journal(self, owner: str, blocking: bool = False):
+        """Open and flock the lock file of a journal owner; None if another process holds it"""
+        import fcntl
+        
+        lock_file = open(f"{self.journal_path}.{owner}.lock", 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+    
+    def _replay_journals(self):
+        """Replay journals of stores that died (and a journal of the single-file layout) into the store"""
+        directory = os.path.dirname(self.journal_path) or '.'
+        prefix = os.path.basename(self.journal_path) + '.'
+        owners = set()
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and not name.endswith('.tmp'):
+                owner = name[len(prefix):].split('.')[0]
+                if owner and owner != 'flushing' and f"{self.journal_path}.{owner}" != self.journal_file:
+                    owners.add(owner)
+        
+        self._replay_paths([self.journal_path + '.flushing', self.journal_path])
+        for owner in sorted(owners):
+            lock_file = self._lock_journal(owner)
+            if lock_file is None:
+                continue  # journal of a live process
+            try:
+                journal = f"{self.journal_path}.{owner}"
+                self._replay_paths([journal + '.flushing', journal])
+                os.remove(lock_file.name)
+            finally:
+                lock_file.close()
+    
+    def _replay_paths(self, paths: List[str]):
+        """Write the answers in journal files (oldest first) into the store, then delete the files"""
+        records = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    records.append((entry['user_id'], entry['session_id'], UserResponse(
+                        question_id=entry['question_id'],
+                        answer=entry['answer'],
+                        timestamp=entry['timestamp'],
+                        confidence=entry['confidence']
+                    )))
+        
+        if records:
+            self.store.save_many(records)
+            logger.info("Replayed %d buffered responses from journal", len(records))
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _append_journal(self, records: List[Tuple[str, str, UserResponse]]):
+        lines = ''.join(json.dumps({
+            'user_id': user_id,
+            'session_id': session_id,
+            'question_id': response.question_id,
+            'answer': str(response.answer),
+            'timestamp': response.timestamp,
+            'confidence': response.confidence
+        }) + '\n' for user_id, session_id, response in records)
+        self.journal.write(lines)
+        self.journal.flush()
+        if self.durability == 'fsync':
+            os.fsync(self.journal.fileno())
+    
+    def _rewrite_journal(self):
+        """Replace both journals with the pending answers in the order they must be replayed"""
+        self.journal.close()
+        self.journal = open(self.journal_file + '.tmp', 'w', encoding='utf-8')
+        self._append_journal([(user_id, session_id, response)
+                              for (user_id, session_id, _), response in self.pending.items()])
+        self.journal.close()
+        os.replace(self.journal_file + '.tmp', self.journal_file)
+        os.remove(self.journal_file + '.flushing')
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+    
+    def save_many(self, records: List[Tuple[str, str, UserResponse]]):
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("WriteBehindResponseStore is closed")
+            if self.journal:
+                self._append_journal(records)
+            for user_id, session_id, response in records:
+                key = (user_id, session_id, response.question_id)
+                self.pending.pop(key, None)
+                self.pending[key] = response
+            if self.oldest_pending_at is None:
+                self.oldest_pending_at = time.monotonic()
+            self.max_pending = max(self.max_pending, len(self.pending))
+            if len(self.pending) >= self.max_batch:
+                self.wakeup.notify()
+    
+    def get(self, user_id: str, session_id: Optional[str] = None,
+            exclude_session: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        # Snapshot the overlay first: a batch committed after this is then still in it
+        with self.lock:
+            overlay = [
+                (question_id, response)
+                for buffer in (self.flushing, self.pending)
+                for (pending_user, pending_session, question_id), response in buffer.items()
+                if (pending_user == user_id and (not session_id or pending_session == session_id)
+                    and pending_session != exclude_session)
+            ]
+        responses = self.store.get(user_id, session_id, exclude_session)
+        for question_id, response in overlay:
+            responses[question_id] = {
+                'answer': str(response.answer),
+                'timestamp': response.timestamp,
+                'confidence': response.confidence
+            }
+        return responses
+    
+    def _run_flusher(self):
+        while True:
+            with self.lock:
+                while not self.closed:
+                    if len(self.pending) >= self.max_batch:
+                        break
+                    if self.oldest_pending_at is not None:
+                        remaining = self.oldest_pending_at + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.wakeup.wait(remaining)
+                    else:
+                        self.wakeup.wait()
+                if self.closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Error flushing responses: %s", e, exc_info=True)
+                time.sleep(self.max_delay)
+    
+    def flush(self):
+        """Write all buffered answers to the underlying store"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                batch = [(user_id, session_id, response)
+                         for (user_id, session_id, _), response in self.pending.items()]
+                self.flushing = self.pending
+                self.pending = OrderedDict()
+                self.oldest_pending_at = None
+                if self.journal:
+                    # Answers arriving during the write go to a fresh journal
+                    self.journal.close()
+                    os.replace(self.journal_file, self.journal_file + '.flushing')
+                    self.journal = open(self.journal_file, 'a', encoding='utf-8')
+            
+            start = time.perf_counter()
+            try:
+                for i in range(0, len(batch), self.max_batch):
+                    self.store.save_many(batch[i:i + self.max_batch])
+            except Exception:
+                with self.lock:
+                    self.failed_flushes += 1
+                    # Re-buffer answers not superseded in the meantime, ahead of the newer ones
+                    restored = OrderedDict()
+                    for user_id, session_id, response in batch:
+                        key = (user_id, session_id, response.question_id)
+                        if key not in self.pending:
+                            restored[key] = response
+                    restored.update(self.pending)
+                    self.pending = restored
+                    self.flushing = OrderedDict()
+                    self.oldest_pending_at = time.monotonic()
+                    if self.journal:
+                        self._rewrite_journal()
+                raise
+            
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.flushes += 1
+                self.flushed_records += len(batch)
+                self.flush_seconds += elapsed
+                self.last_flush_seconds = elapsed
+                self.flushing = OrderedDict()
+                if self.journal:
+                    os.remove(self.journal_file + '.flushing')
+    
+    def stats(self) -> Dict[str, Any]:
+        """Flush metrics"""
+        with self.lock:
+            return {
+                'pending': len(self.pending),
+                'max_pending': self.max_pending,
+                'flushes': self.flushes,
+                'flushed_records': self.flushed_records,
+                'failed_flushes': self.failed_flushes,
+                'flush_seconds': self.flush_seconds,
+                'last_flush_seconds': self.last_flush_seconds,
+                'durability': self.durability
+            }
+    
+    def close(self):
+        """Flush remaining answers and stop the background flusher"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.wakeup.notify()
+        self.flusher.join()
+        self.flush()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+            if os.path.getsize(self.journal_file) == 0:
+                os.remove(self.journal_file)
+            os.remove(self.journal_lock.name)
+            self.journal_lock.close()
+        self.store.close()
+        atexit.unregister(self.close)
@@ -0,0 +1,1852 @@
+"""
+NCAQuestionnaireSystem: questionnaire ingest, storage and retrieval
+
+PyMuPDF, pandas, numpy, google.generativeai and ChromaDB are imported by the
+code paths that use them, so processes that only serve the chatbot or only
+validate answers do not pay for loading them.
+"""
+import glob
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .classifier import SELECTION_PLACEHOLDER_OPTIONS, get_keyword_classifier
+from .ingest import (
+    COUNTRY_PROMPT_VERSION, EXTRACTION_PROMPT_VERSION, EXTRACTION_RESPONSE_SCHEMA, LLMDispatcher,
+    LLMResponseCache, LayoutExtraction, LayoutQuestionExtractor, PageManifest, PromptBuilder, PromptSegment,
+    PromptUnit, QuestionBatchWriter, TokenRateLimiter
+)
+from .metrics import MetricsRegistry
+from .models import QUESTION_FIELDS, DuplicateGroup, Question, QuestionType, SearchResult, UserResponse
+from .ocr import PageOCR, needs_ocr, page_content_hash
+from .store import (ChromaResponseStore, QuestionCatalogue, QuestionCatalogueCache, ResponseStore, SQLiteResponseStore,
+                    WriteBehindResponseStore)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from .embeddings import QuestionDeduplicator, QuestionSimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+def _open_pdf(pdf_path: str):
+    import fitz  # PyMuPDF
+    return fitz.open(pdf_path)
+
+class NCAQuestionnaireSystem:
+    def __init__(self, gemini_api_key: str, db_path: str = "./nca_system_db",
+                 max_concurrency: int = 4, tokens_per_minute: Optional[int] = None,
+                 max_retries: int = 3, retry_backoff: float = 1.0,
+                 use_llm_cache: bool = True, llm_cache_max_bytes: int = 64 * 1024 * 1024,
+                 catalogue_ttl: Optional[float] = None, catalogue_max_questions: int = 200000,
+                 response_store: Optional[ResponseStore] = None, write_behind: bool = False,
+                 near_duplicate_threshold: Optional[float] = None,
+                 embedding_service: Optional[Tuple[str, int]] = None,
+                 embedding_service_authkey: Optional[bytes] = None, use_vector_cache: bool = True,
+                 search_cache_size: int = 256, layout_confidence_threshold: Optional[float] = 0.75,
+                 prompt_token_budget: int = 4000, structured_output: bool = True,
+                 metrics: Optional[MetricsRegistry] = None, use_ocr: bool = True,
+                 ocr_engine: Optional[Callable[[bytes], str]] = None, ocr_processes: Optional[int] = None):
+        """
+        Initialize the NCA Questionnaire System
+        
+        Args:
+            gemini_api_key: Google Gemini API key
+            db_path: Path for ChromaDB storage
+            max_concurrency: Maximum number of pages sent to Gemini in parallel
+            tokens_per_minute: Optional Gemini token budget shared by all requests
+            max_retries: Retries for failed Gemini calls
+            retry_backoff: Base delay in seconds for exponential retry backoff
+            use_llm_cache: Cache Gemini responses on disk, keyed by model, prompt version and input text
+            llm_cache_max_bytes: Size bound of the response cache (LRU eviction)
+            catalogue_ttl: Optional lifetime in seconds of cached per-country question catalogues
+            catalogue_max_questions: Total number of questions kept in the catalogue cache
+            response_store: Store for user responses (defaults to SQLite under db_path)
+            write_behind: Buffer response writes and flush them in batches (journaled under db_path)
+            near_duplicate_threshold: Cosine similarity above which extracted questions are
+                merged as near-duplicates (None keeps exact-text deduplication only)
+            embedding_service: (host, port) of a shared embedding service to use instead
+                of loading the embedding model in this process
+            embedding_service_authkey: Shared secret of the embedding service
+                (defaults to NCA_EMBEDDING_AUTHKEY)
+            use_vector_cache: Reuse question embeddings across saves, keyed by text hash
+            search_cache_size: Number of search results kept in memory (cleared when questions change)
+            layout_confidence_threshold: Pages whose layout-based extraction reaches this confidence
+                skip Gemini (None sends every page to Gemini)
+            prompt_token_budget: Estimated token budget of one extraction prompt; small pages
+                are packed together and larger pages split at section boundaries
+            structured_output: Ask Gemini for schema-constrained JSON (disabled automatically
+                if the model rejects it)
+            metrics: Registry receiving stage timings and counters (shared with the bot)
+            use_ocr: Recognize pages without a text layer (scans) instead of skipping them
+            ocr_engine: Picklable callable turning a rendered PNG page into text
+                (Tesseract via pytesseract when installed)
+            ocr_processes: Size of the OCR process pool (defaults to the CPU count)
+        
+        Gemini, the ChromaDB client and collections, the embedding model and the
+        vector cache are created (and their libraries imported) on first use, so
+        workers that never touch them do not pay for them.
+        """
+        init_start = time.perf_counter()
+        self.gemini_api_key = gemini_api_key
+        self.model_name = 'gemini-pro'
+        self.db_path = db_path
+        self._components: Dict[str, Any] = {}
+        self._component_lock = threading.RLock()
+        self.startup_timings: Dict[str, float] = {}
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.add_collector(self._collect_metrics)
+        
+        self.llm_cache = LLMResponseCache(
+            os.path.join(db_path, "llm_cache.sqlite3"),
+            max_bytes=llm_cache_max_bytes
+        ) if use_llm_cache else None
+        self.page_manifest = PageManifest(os.path.join(db_path, "page_manifest.sqlite3"))
+        
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.rate_limiter = TokenRateLimiter(tokens_per_minute) if tokens_per_minute else None
+        
+        if importlib.util.find_spec("chromadb") is None:
+            raise ImportError("ChromaDB not installed. Run: pip install chromadb")
+        
+        self.embedding_service = embedding_service
+        self.embedding_service_authkey = embedding_service_authkey
+        self.use_vector_cache = use_vector_cache
+        
+        self.layout_extractor = LayoutQuestionExtractor()
+        self.layout_confidence_threshold = layout_confidence_threshold
+        self.extraction_counts = {'layout': 0, 'llm': 0, 'empty': 0}
+        self.use_ocr = use_ocr
+        self.ocr_engine = ocr_engine
+        self.ocr_processes = ocr_processes
+        self.extraction_lock = threading.Lock()
+        self.prompt_builder = PromptBuilder(prompt_token_budget, count_tokens=self._estimate_tokens)
+        self.structured_output = structured_output
+        self.prompt_stats = {
+            'calls': 0, 'cached_calls': 0, 'segments': 0, 'prompt_tokens': 0,
+            'response_tokens': 0, 'questions': 0, 'parse_failures': 0
+        }
+        
+        self.search_cache: OrderedDict = OrderedDict()
+        self.search_cache_size = search_cache_size
+        self.query_vectors: OrderedDict = OrderedDict()  # query text -> vector, not persisted
+        self.search_version = 0
+        self.search_lock = threading.Lock()
+        
+        self.near_duplicate_threshold = near_duplicate_threshold
+        
+        if response_store is None:
+            response_store = SQLiteResponseStore(os.path.join(db_path, "responses.sqlite3"))
+            self._import_chroma_responses(response_store)
+        self.response_store = response_store
+        if write_behind:
+            self.response_store = WriteBehindResponseStore(
+                self.response_store,
+                journal_path=os.path.join(db_path, "responses.journal")
+            )
+        
+        self.countries = self._load_supported_countries()
+        self.catalogue = QuestionCatalogueCache(
+            lambda country: self._fetch_questions({"country": country}),
+            ttl=catalogue_ttl,
+            max_questions=catalogue_max_questions
+        )
+        self.startup_timings['init'] = time.perf_counter() - init_start
+    
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Create a heavy component on first use and record how long it took"""
+        component = self._components.get(name)
+        if component is None:
+            with self._component_lock:
+                component = self._components.get(name)
+                if component is None:
+                    start = time.perf_counter()
+                    component = factory()
+                    self.startup_timings[name] = time.perf_counter() - start
+                    self._components[name] = component
+        return component
+    
+    def _create_model(self):
+        import google.generativeai as genai
+        
+        genai.configure(api_key=self.gemini_api_key)
+        return genai.GenerativeModel(self.model_name)
+    
+    @property
+    def model(self):
+        """Gemini model (configured on first use)"""
+        return self._component('gemini', self._create_model)
+    
+    @property
+    def client(self):
+        """ChromaDB client (opened on first use)"""
+        return self._component('chroma_client', self._create_client)
+    
+    def _create_client(self):
+        import chromadb
+        
+        return chromadb.PersistentClient(path=self.db_path)
+    
+    @property
+    def questions_collection(self):
+        return self._component('questions_collection', lambda: self.client.get_or_create_collection(
+            name="nca_questions",
+            embedding_function=self.embedding_function
+        ))
+    
+    @property
+    def responses_collection(self):
+        return self._component('responses_collection', lambda: self.client.get_or_create_collection(
+            name="user_responses",
+            embedding_function=self.embedding_function
+        ))
+    
+    def _create_embedding_function(self):
+        from .embeddings import EMBEDDING_MODEL_NAME, LazyEmbeddingFunction
+        
+        return LazyEmbeddingFunction(model_name=EMBEDDING_MODEL_NAME, service_address=self.embedding_service,
+                                     service_authkey=self.embedding_service_authkey)
+    
+    @property
+    def embedding_function(self):
+        """Question embedding function (the model itself is loaded on the first call)"""
+        return self._component('embedding_function', self._create_embedding_function)
+    
+    @embedding_function.setter
+    def embedding_function(self, embedding_function):
+        with self._component_lock:
+            self._components['embedding_function'] = embedding_function
+            self._components.pop('vector_cache', None)  # keyed by the embedding function
+            self.query_vectors.clear()
+    
+    def _create_vector_cache(self):
+        from .embeddings import EmbeddingVectorCache, embedding_function_id
+        
+        return EmbeddingVectorCache(os.path.join(self.db_path, "embeddings"),
+                                    embedding_function_id(self.embedding_function))
+    
+    @property
+    def vector_cache(self):
+        """On-disk embedding cache (None when disabled)"""
+        if not self.use_vector_cache:
+            return None
+        return self._component('vector_cache', self._create_vector_cache)
+    
+    def _create_deduplicator(self):
+        from .embeddings import QuestionDeduplicator
+        
+        return QuestionDeduplicator(self.embed_texts, threshold=self.near_duplicate_threshold)
+    
+    @property
+    def deduplicator(self) -> Optional['QuestionDeduplicator']:
+        """Near-duplicate merger used on ingest (None unless a threshold is configured)"""
+        if self.near_duplicate_threshold is None:
+            return None
+        return self._component('deduplicator', self._create_deduplicator)
+    
+    def _create_ocr(self):
+        return PageOCR(
+            LLMResponseCache(os.path.join(self.db_path, "ocr_cache.sqlite3")),
+            engine=self.ocr_engine,
+            processes=self.ocr_processes
+        )
+    
+    @property
+    def ocr(self) -> Optional[PageOCR]:
+        """OCR of scanned pages (None when disabled)"""
+        if not self.use_ocr:
+            return None
+        return self._component('ocr', self._create_ocr)
+    
+    def embed_texts(self, texts: List[str], persist: bool = True) -> 'np.ndarray':
+        """
+        Embed texts with the question embedding model
+        
+        Args:
+            texts: Texts to embed
+            persist: Reuse and store vectors in the on-disk vector cache (False for
+                one-off texts such as search queries)
+        """
+        import numpy as np
+        
+        with self.metrics.timer('stage_seconds', stage='embedding'):
+            if persist and self.vector_cache:
+                return self.vector_cache.embed(texts, self.embedding_function)
+            return np.asarray(self.embedding_function(texts), dtype=np.float32)
+    
+    def _embed_query(self, query: str) -> 'np.ndarray':
+        """Vector of a search query, kept in a bounded in-memory LRU instead of the vector cache"""
+        with self.search_lock:
+            vector = self.query_vectors.get(query)
+            if vector is not None:
+                self.query_vectors.move_to_end(query)
+                return vector
+        
+        vector = self.embed_texts([query], persist=False)[0]
+        with self.search_lock:
+            self.query_vectors[query] = vector
+            while len(self.query_vectors) > max(self.search_cache_size, 1):
+                self.query_vectors.popitem(last=False)
+        return vector
+    
+    def startup_report(self) -> Dict[str, Any]:
+        """Time spent constructing the system and initializing each lazily created component"""
+        components = {}
+        for name in ('gemini', 'chroma_client', 'questions_collection', 'responses_collection'):
+            components[name] = {
+                'initialized': name in self._components,
+                'seconds': self.startup_timings.get(name)
+            }
+        # Embedding functions installed through the setter may not report these
+        embedding_function = self._components.get('embedding_function')
+        if embedding_function is None:
+            components['embedding_model'] = {'initialized': False, 'seconds': None, 'source': None}
+        else:
+            components['embedding_model'] = {
+                'initialized': getattr(embedding_function, 'loaded', 'unknown'),
+                'seconds': getattr(embedding_function, 'load_seconds', 'unknown'),
+                'source': getattr(embedding_function, 'source', 'unknown')
+            }
+        return {
+            'init_seconds': self.startup_timings.get('init'),
+            'components': components
+        }
+    
+    def _import_chroma_responses(self, store: SQLiteResponseStore):
+        """Copy answers from the ChromaDB user_responses collection used by earlier versions (once)"""
+        if not os.path.exists(os.path.join(self.db_path, "chroma.sqlite3")):
+            return  # no ChromaDB database, so nothing to migrate (and chromadb is not imported)
+        
+        def load() -> List[Tuple[str, str, UserResponse]]:
+            try:
+                collection = self.client.get_collection(name="user_responses",
+                                                        embedding_function=self.embedding_function)
+            except Exception:
+                return []  # never created
+            return ChromaResponseStore(collection).all_records()
+        
+        try:
+            imported = store.import_once("chroma:user_responses", load)
+            if imported:
+                logger.info("Imported %d responses from ChromaDB into the response store", imported)
+        except Exception as e:
+            self._log_error('import_responses', "Error importing responses from ChromaDB", e)
+    
+    def _load_supported_countries(self) -> List[str]:
+        """Load list of supported countries"""
+        return [
+            "United Arab Emirates", "Saudi Arabia", "Kuwait", "Qatar", 
+            "Bahrain", "Oman", "Jordan", "Lebanon", "Egypt", "Morocco",
+            "Tunisia", "Algeria", "Iraq", "Yemen", "Syria", "Sudan", 
+            "Libya", "Palestine"
+        ]
+    
+    # =================== CASE 1: UPLOAD QUESTIONNAIRE BY COUNTRY ===================
+    
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """Stream (zero-based page index, text) pairs; scanned pages are recognized by OCR"""
+        for page_num, text, _ in self._iter_page_layouts(pdf_path, skip=lambda text: True):
+            yield page_num, text
+    
+    def _iter_page_layouts(self, pdf_path: str, skip: Optional[Callable[[str], bool]] = None
+                           ) -> Iterator[Tuple[int, str, Optional[LayoutExtraction]]]:
+        """
+        Stream (zero-based page index, text, layout extraction) for every page
+        
+        Pages without a text layer are recognized in the OCR process pool while
+        reading continues; pages are still yielded in order, holding at most a
+        few pages beyond the oldest one being recognized. The layout extraction
+        is None for recognized pages, when layout extraction is disabled, or
+        when skip(page_text) is true.
+        """
+        ocr = self.ocr
+        lookahead = 2 * (ocr.processes or os.cpu_count() or 1) if ocr else 0
+        window = deque()  # (page index, text, layout, OCR future or None) in page order
+        
+        def resolve(page_num: int, text: str, layout: Optional[LayoutExtraction], future
+                    ) -> Tuple[int, str, Optional[LayoutExtraction]]:
+            if future is not None:
+                with self.metrics.timer('stage_seconds', stage='ocr'):
+                    text = ocr.result(future)
+            return page_num, text, layout
+        
+        with self.metrics.timer('stage_seconds', stage='pdf_parse'):
+            doc = _open_pdf(pdf_path)
+        try:
+            for page_num in range(len(doc)):
+                with self.metrics.timer('stage_seconds', stage='pdf_parse'):
+                    page = doc[page_num]
+                    text = page.get_text()
+                layout = None
+                future = None
+                if ocr and ocr.needs_ocr(page, text):
+                    future = ocr.submit(pdf_path, page_num, page_content_hash(page))
+                elif self.layout_confidence_threshold is not None and not (skip and skip(text)):
+                    try:
+                        with self.metrics.timer('stage_seconds', stage='layout_extraction'):
+                            layout = self.layout_extractor.extract(page)
+                    except Exception as e:
+                        self._log_error('layout_extraction', "Error reading page layout", e)
+                window.append((page_num, text, layout, future))
+                
+                while window and (window[0][3] is None or window[0][3].done() or len(window) > lookahead):
+                    yield resolve(*window.popleft())
+            
+            while window:
+                yield resolve(*window.popleft())
+        finally:
+            # Pages still queued when the caller stops early (e.g. country detection)
+            for _, _, _, future in window:
+                if future is not None:
+                    ocr.abandon(future)
+            doc.close()
+    
+    def extract_text_from_pdf(self, pdf_path: str) -> List[str]:
+        """Extract text from all pages of PDF"""
+        return [text for _, text in self.iter_pdf_pages(pdf_path)]
+    
+    def _match_country(self, text: str) -> Optional[str]:
+        """Return the first supported country explicitly mentioned in the text"""
+        text_lower = text.lower()
+        for country in self.countries:
+            if country.lower() in text_lower:
+                return country
+        return None
+    
+    def detect_country_from_pdf(self, pdf_path: str) -> str:
+        """
+        Detect the country by streaming pages, stopping at the first page that names one
+        
+        Only the first 2000 characters are buffered for the Gemini fallback.
+        """
+        with self.metrics.timer('stage_seconds', stage='country_detection'):
+            prefix = ""
+            for _, page_text in self.iter_pdf_pages(pdf_path):
+                country = self._match_country(page_text)
+                if country:
+                    return country
+                if len(prefix) < 2000:
+                    prefix = (prefix + " " + page_text) if prefix else page_text
+            
+            return self.extract_country_from_text(prefix[:2000])
+    
+    def extract_country_from_text(self, text: str) -> str:
+        """Extract country information from the document text"""
+        # Check for explicit country mentions
+        country = self._match_country(text)
+        if country:
+            return country
+        
+        # Use Gemini to extract country
+        prompt = f"""
+        Extract the country name from the following NCA document text.
+        Return only the country name from this list: {', '.join(self.countries)}
+        If no country is found, return 'Unknown'.
+        
+        Text: {text[:2000]}...
+        """
+        
+        try:
+            country = self._generate_content(
+                prompt, cache_key=self._llm_cache_key(COUNTRY_PROMPT_VERSION, text[:2000]),
+                cacheable=lambda response: response.strip() in self.countries or response.strip() == 'Unknown'
+            ).strip()
+            return country if country in self.countries else 'Unknown'
+        except Exception as e:
+            self._log_error('country_detection', "Error extracting country", e)
+            return 'Unknown'
+    
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough token estimate used for rate limiting (~4 characters per token)"""
+        return len(text) // 4 + 1
+    
+    def _llm_cache_key(self, template_version: str, text: str) -> Optional[str]:
+        """Cache key for a prompt built from `text` with the given template version"""
+        if not self.llm_cache:
+            return None
+        return LLMResponseCache.make_key(self.model_name, template_version, text)
+    
+    def _generate_content(self, prompt: str, cache_key: Optional[str] = None,
+                          generation_config: Optional[Dict[str, Any]] = None,
+                          usage: Optional[Dict[str, Any]] = None,
+                          cacheable: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Call Gemini with rate limiting and retry with exponential backoff
+        
+        Args:
+            prompt: Prompt text
+            cache_key: Optional response cache key; cached responses skip the API call
+            generation_config: Optional Gemini generation config (e.g. JSON response schema)
+            usage: Optional dict filled with prompt/response token counts and whether the cache answered
+            cacheable: Optional check of the response; responses failing it are not cached
+            
+        Returns:
+            Response text
+        """
+        if cache_key:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.inc('llm_calls_total', outcome='cached')
+                if usage is not None:
+                    usage.update(cached=True, prompt_tokens=0, response_tokens=0)
+                return cached
+        
+        estimated_tokens = self._estimate_tokens(prompt)
+        attempt = 0
+        
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated_tokens)
+            try:
+                with self.metrics.timer('stage_seconds', stage='llm_call'):
+                    if generation_config:
+                        response = self.model.generate_content(prompt, generation_config=generation_config)
+                    else:
+                        response = self.model.generate_content(prompt)
+                    text = response.text
+            except Exception as e:
+                if generation_config and self._is_schema_rejection(e):
+                    # The request itself is invalid - retrying will not help
+                    self.metrics.inc('llm_calls_total', outcome='rejected')
+                    raise
+                if isinstance(e, ValueError):
+                    # Blocked or empty response - retrying will not help
+                    self.metrics.inc('llm_calls_total', outcome='blocked')
+                    raise
+                if attempt >= self.max_retries:
+                    self.metrics.inc('llm_calls_total', outcome='failed')
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * (1 + random.random())
+                attempt += 1
+                self.metrics.inc('llm_calls_total', outcome='retried')
+                logger.warning("Gemini call failed (%s), retry %d/%d in %.1fs", e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+                continue
+            
+            self.metrics.inc('llm_calls_total', outcome='ok')
+            
+            metadata = getattr(response, 'usage_metadata', None)
+            if self.rate_limiter:
+                total_tokens = getattr(metadata, 'total_token_count', 0) or 0
+                if total_tokens > estimated_tokens:
+                    self.rate_limiter.debit(total_tokens - estimated_tokens)
+            if usage is not None:
+                usage.update(
+                    cached=False,
+                    prompt_tokens=getattr(metadata, 'prompt_token_count', 0) or estimated_tokens,
+                    response_tokens=getattr(metadata, 'candidates_token_count', 0) or self._estimate_tokens(text)
+                )
+            
+            if cache_key and (cacheable is None or cacheable(text)):
+                self.llm_cache.put(cache_key, text)
+            
+            return text
+    
+    @staticmethod
+    def _is_schema_rejection(error: Exception) -> bool:
+        """
+        Whether Gemini (or the SDK) rejected the structured-output settings of a request
+        
+        Matches invalid-argument errors (HTTP 400, or the SDK refusing an unknown
+        config field) that name the response schema or MIME type; rate limits,
+        server errors and network failures are not rejections.
+        """
+        invalid_argument = (
+            type(error).__name__ in ('InvalidArgument', 'BadRequest')
+            or getattr(error, 'code', None) == 400
+            or isinstance(error, (TypeError, ValueError, KeyError))
+        )
+        message = str(error).lower()
+        return invalid_argument and any(
+            field in message for field in ('response_schema', 'response_mime_type', 'schema')
+        )
+    
+    def extract_questions_from_pdf(self, pdf_path: str, max_concurrency: Optional[int] = None) -> List[Question]:
+        """
+        Extract questions from PDF and convert to structured Question objects
+        
+        Pages are sent to Gemini concurrently; results are reassembled in
+        page order before duplicates are removed.
+        
+        Args:
+            pdf_path: Path to PDF file
+            max_concurrency: Override for the number of pages processed in parallel
+            
+        Returns:
+            List of Question objects
+        """
+        logger.info("Extracting text from PDF...")
+        
+        # Extract country
+        country = self.detect_country_from_pdf(pdf_path)
+        logger.info("Detected country: %s", country)
+        
+        questions = []
+        pages = self._iter_page_layouts(pdf_path)
+        for _, page_questions in self._iter_extracted_pages(pages, country, max_concurrency):
+            questions.extend(page_questions)
+        
+        # Remove duplicates
+        unique_questions = self._remove_duplicate_questions(questions)
+        logger.info("Extracted %d unique questions", len(unique_questions))
+        
+        return unique_questions
+    
+    def _iter_extracted_pages(self, pages: Iterable[Tuple[int, str, Optional[LayoutExtraction]]], country: str,
+                              max_concurrency: Optional[int] = None) -> Iterator[Tuple[int, List[Question]]]:
+        """
+        Extract questions from a stream of (zero-based page index, text, layout extraction)
+        
+        Pages with a confident layout extraction skip Gemini; the rest are packed
+        into token-budgeted prompts. At most 2 * max_concurrency prompts are in
+        flight, so memory stays bounded regardless of document size.
+        
+        Yields:
+            (page index, questions) in input order
+        """
+        workers = max(1, max_concurrency or self.max_concurrency)
+        order = deque()
+        texts: Dict[int, str] = {}
+        records: Dict[int, List[Dict]] = {}
+        outstanding: Dict[int, int] = {}
+        assigned = set()  # pages whose prompt units have all been submitted
+        
+        def llm_pages() -> Iterator[Tuple[int, str]]:
+            for page_num, page_text, layout in pages:
+                order.append(page_num)
+                texts[page_num] = page_text
+                outstanding[page_num] = 0
+                if not page_text.strip():
+                    # Blank (or unrecognized scanned) pages have nothing to extract
+                    self._count_extraction('empty')
+                    records[page_num] = []
+                    assigned.add(page_num)
+                elif self._accepts_layout(layout):
+                    self._count_extraction('layout')
+                    records[page_num] = layout.records
+                    assigned.add(page_num)
+                else:
+                    self._count_extraction('llm')
+                    records[page_num] = []
+                    yield page_num, page_text
+        
+        def ready_pages() -> Iterator[Tuple[int, List[Question]]]:
+            while order and order[0] in assigned and outstanding[order[0]] == 0:
+                page_num = order.popleft()
+                assigned.discard(page_num)
+                page_text = texts.pop(page_num)
+                page_records = records.pop(page_num)
+                del outstanding[page_num]
+                try:
+                    with self.metrics.timer('stage_seconds', stage='classification'):
+                        page_questions = self._build_page_questions(
+                            page_records, country, page_num + 1, self._page_fingerprint(page_text)
+                        )
+                except Exception as e:
+                    self._log_error('question_extraction', "Error extracting questions", e)
+                    page_questions = []
+                yield page_num, page_questions
+        
+        def complete(unit: PromptUnit, future):
+            try:
+                unit_records = future.result()
+            except Exception as e:
+                self._log_error('question_extraction', "Error extracting questions", e)
+                unit_records = {}
+            for segment in unit.segments:
+                outstanding[segment.page_num] -= 1
+            for page_num, page_records in unit_records.items():
+                records[page_num].extend(page_records)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for unit in self.prompt_builder.units(llm_pages()):
+                first, last = unit.segments[0].page_num + 1, unit.segments[-1].page_num + 1
+                if first == last:
+                    logger.info("Processing page %d...", first)
+                else:
+                    logger.info("Processing pages %d-%d...", first, last)
+                for segment in unit.segments:
+                    outstanding[segment.page_num] += 1
+                    if segment.last_part:
+                        assigned.add(segment.page_num)
+                in_flight.append((unit, executor.submit(self._request_unit_questions, unit)))
+                
+                if len(in_flight) >= workers * 2:
+                    complete(*in_flight.popleft())
+                yield from ready_pages()
+            
+            while in_flight:
+                complete(*in_flight.popleft())
+                yield from ready_pages()
+            yield from ready_pages()
+    
+    @staticmethod
+    def _page_fingerprint(page_text: str) -> str:
+        """Content hash identifying an unchanged page across PDF revisions"""
+        return hashlib.sha256(page_text.encode()).hexdigest()
+    
+    def _accepts_layout(self, layout: Optional[LayoutExtraction]) -> bool:
+        """Whether a layout extraction is confident enough to skip Gemini"""
+        return (layout is not None and self.layout_confidence_threshold is not None
+                and layout.confidence >= self.layout_confidence_threshold)
+    
+    def _count_extraction(self, source: str, pages: int = 1):
+        with self.extraction_lock:
+            self.extraction_counts[source] += pages
+    
+    def extraction_stats(self) -> Dict[str, int]:
+        """Number of pages extracted from their layout and by Gemini"""
+        with self.extraction_lock:
+            return dict(self.extraction_counts)
+    
+    def _extract_questions_from_page(self, page_text: str, country: str, page_num: int,
+                                     layout: Optional[LayoutExtraction] = None) -> List[Question]:
+        """Extract questions from a single page, using its layout when that is confident enough"""
+        page_hash = self._page_fingerprint(page_text)
+        
+        try:
+            if not page_text.strip():
+                self._count_extraction('empty')
+                return []
+            if self._accepts_layout(layout):
+                self._count_extraction('layout')
+                questions_data = layout.records
+            else:
+                # Use Gemini to extract structured questions
+                self._count_extraction('llm')
+                questions_data = self._request_page_questions(page_text)
+            with self.metrics.timer('stage_seconds', stage='classification'):
+                return self._build_page_questions(questions_data, country, page_num, page_hash)
+            
+        except Exception as e:
+            self._log_error('question_extraction', "Error extracting questions", e)
+            return []
+    
+    def _request_page_questions(self, page_text: str) -> List[Dict]:
+        """Ask Gemini for the raw question records of a page (split if over the prompt budget)"""
+        questions_data = []
+        for unit in self.prompt_builder.units([(0, page_text)]):
+            questions_data.extend(self._request_unit_questions(unit).get(0, []))
+        return questions_data
+    
+    def _segment_cache_key(self, segment: PromptSegment) -> Optional[str]:
+        """Cache key of a segment's question records: its text and the prompt version, not its page number or pack"""
+        return self._llm_cache_key(f"{EXTRACTION_PROMPT_VERSION}/segment", segment.text)
+    
+    def _request_unit_questions(self, unit: PromptUnit) -> Dict[int, List[Dict]]:
+        """
+        Ask Gemini for the questions of one prompt unit
+        
+        Question records are cached per segment, so an unchanged page is served
+        from the cache however it is numbered or packed; only the segments that
+        miss are sent to Gemini.
+        
+        Returns:
+            {zero-based page index: raw question records}; segments whose
+            response cannot be parsed fall back to manual parsing
+        """
+        unit_records: Dict[int, List[Dict]] = {segment.page_num: [] for segment in unit.segments}
+        missed = []
+        for segment in unit.segments:
+            cache_key = self._segment_cache_key(segment)
+            cached = self.llm_cache.get(cache_key) if cache_key else None
+            try:
+                unit_records[segment.page_num].extend(json.loads(cached))
+            except (TypeError, ValueError):  # not cached (None) or unreadable
+                missed.append(segment)
+        
+        usage: Dict[str, Any] = {'cached': True}
+        parse_failed = False
+        if missed:
+            request = PromptUnit(missed, sum(self.prompt_builder.count_tokens(segment.text) for segment in missed))
+            missed_records, parse_failed = self._request_segment_questions(request, usage)
+            for page_num, page_records in missed_records.items():
+                unit_records[page_num].extend(page_records)
+        else:
+            self.metrics.inc('llm_calls_total', outcome='cached')
+        
+        with self.extraction_lock:
+            stats = self.prompt_stats
+            stats['calls'] += 1
+            stats['cached_calls'] += 1 if usage.get('cached') else 0
+            stats['segments'] += len(unit.segments)
+            stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            stats['response_tokens'] += usage.get('response_tokens', 0)
+            stats['questions'] += sum(len(page_records) for page_records in unit_records.values())
+            stats['parse_failures'] += 1 if parse_failed else 0
+        
+        return unit_records
+    
+    def _request_segment_questions(self, unit: PromptUnit, usage: Dict[str, Any]) -> Tuple[Dict[int, List[Dict]], bool]:
+        """
+        Send a unit to Gemini and cache the parsed records of each of its segments
+        
+        Returns:
+            ({zero-based page index: raw question records}, whether parsing failed)
+        """
+        prompt = self.prompt_builder.render(unit)
+        
+        generation_config = None
+        if self.structured_output:
+            generation_config = {
+                'response_mime_type': 'application/json',
+                'response_schema': EXTRACTION_RESPONSE_SCHEMA
+            }
+        try:
+            response_text = self._generate_content(prompt, None, generation_config, usage)
+        except Exception as e:
+            if not generation_config or not self._is_schema_rejection(e):
+                raise
+            logger.warning("Structured output rejected (%s), continuing with plain JSON prompts", e)
+            self.structured_output = False
+            response_text = self._generate_content(prompt, None, None, usage)
+        
+        with self.metrics.timer('stage_seconds', stage='response_parse'):
+            try:
+                unit_records = PromptBuilder.parse_response(response_text, unit)
+            except (ValueError, TypeError):  # json.JSONDecodeError is a ValueError
+                # Manually parsed records are not cached, so the page is retried on re-ingest
+                unit_records = {segment.page_num: [] for segment in unit.segments}
+                for segment in unit.segments:
+                    unit_records[segment.page_num].extend(self._manual_question_parsing(segment.text))
+                return unit_records, True
+        
+        # Every segment of a unit is a distinct page (split pages get one unit per part)
+        for segment in unit.segments:
+            cache_key = self._segment_cache_key(segment)
+            if cache_key:
+                self.llm_cache.put(cache_key, json.dumps(unit_records[segment.page_num]))
+        return unit_records, False
+    
+    def prompt_report(self) -> Dict[str, Any]:
+        """Gemini extraction cost so far: calls, tokens and tokens per extracted question"""
+        with self.extraction_lock:
+            report = dict(self.prompt_stats)
+        billed_calls = report['calls'] - report['cached_calls']
+        tokens = report['prompt_tokens'] + report['response_tokens']
+        report['segments_per_call'] = report['segments'] / report['calls'] if report['calls'] else 0.0
+        report['tokens_per_call'] = tokens / billed_calls if billed_calls else 0.0
+        report['tokens_per_question'] = tokens / report['questions'] if report['questions'] else 0.0
+        return report
+    
+    def _log_error(self, operation: str, message: str, error: Exception):
+        """Log a handled error with its traceback and count it against the operation"""
+        self.metrics.inc('errors_total', operation=operation)
+        logger.error("%s: %s", message, error, exc_info=True)
+    
+    def _collect_metrics(self) -> Iterator[Tuple[str, str, Dict[str, Any], float]]:
+        """Export the counters kept by the caches and the extraction stats"""
+        for method, pages in self.extraction_stats().items():
+            yield 'extraction_pages_total', 'counter', {'method': method}, pages
+        
+        prompts = self.prompt_report()
+        yield 'extraction_prompts_total', 'counter', {}, prompts['calls']
+        yield 'extraction_parse_failures_total', 'counter', {}, prompts['parse_failures']
+        yield 'extraction_fallback_ratio', 'gauge', {}, (
+            prompts['parse_failures'] / prompts['calls'] if prompts['calls'] else 0.0
+        )
+        yield 'llm_tokens_total', 'counter', {'kind': 'prompt'}, prompts['prompt_tokens']
+        yield 'llm_tokens_total', 'counter', {'kind': 'response'}, prompts['response_tokens']
+        
+        caches = {'catalogue': self.catalogue.stats()}
+        if self.llm_cache:
+            caches['llm'] = self.llm_cache.stats()
+        vector_cache = self._components.get('vector_cache')
+        if vector_cache:
+            caches['embedding'] = vector_cache.stats()
+        ocr = self._components.get('ocr')
+        if ocr:
+            ocr_stats = ocr.stats()
+            for outcome in ('recognized', 'cached', 'failed', 'unavailable'):
+                yield 'ocr_pages_total', 'counter', {'outcome': outcome}, ocr_stats[outcome]
+            caches['ocr'] = ocr_stats
+        for cache, stats in caches.items():
+            yield 'cache_hits_total', 'counter', {'cache': cache}, stats['hits']
+            yield 'cache_misses_total', 'counter', {'cache': cache}, stats['misses']
+    
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Stage timings, bot latencies and counters as JSON-serializable data"""
+        return self.metrics.snapshot()
+    
+    def prometheus_metrics(self) -> str:
+        """Stage timings, bot latencies and counters in the Prometheus text format"""
+        return self.metrics.to_prometheus()
+    
+    @classmethod
+    def _build_page_questions(cls, questions_data: List[Dict], country: str,
+                              page_num: int, page_hash: str) -> List[Question]:
+        """Turn raw question records into classified Question objects"""
+        classifier = get_keyword_classifier()
+        questions = []
+        for position, q_data in enumerate(questions_data):
+            classification = classifier.classify(q_data['text'])
+            question = Question(
+                id=cls._generate_question_id(q_data['text'], country),
+                text=q_data['text'],
+                type=QuestionType(q_data.get('type', 'text')),
+                category=q_data.get('category', 'General'),
+                country=country,
+                required=q_data.get('required', True),
+                options=q_data.get('options'),
+                help_text=q_data.get('help_text', ''),
+                regulatory_context=classification.regulatory_context,
+                compliance_area=classification.compliance_area,
+                page=page_num,
+                page_hash=page_hash,
+                position=position
+            )
+            questions.append(question)
+        
+        return questions
+    
+    @classmethod
+    def _manual_question_parsing(cls, text: str) -> List[Dict]:
+        """Fallback manual parsing when JSON parsing fails"""
+        classifier = get_keyword_classifier()
+        questions = []
+        lines = text.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            classification = classifier.classify(line)
+            if classification.is_question:
+                questions.append({
+                    'text': line,
+                    'type': classification.question_type,
+                    'category': classification.category,
+                    'required': True,
+                    'options': list(SELECTION_PLACEHOLDER_OPTIONS) if classification.has_select else None,
+                    'help_text': ''
+                })
+        
+        return questions
+    
+    def classify_document(self, lines: 'pd.Series', country: str, page: int = 0,
+                          page_hash: str = "") -> 'pd.DataFrame':
+        """
+        Vectorized counterpart of the manual parsing path for a whole document
+        
+        Args:
+            lines: Every candidate line of the document
+            country: Country the questions belong to
+            page: Page number recorded on the questions
+            page_hash: Page fingerprint recorded on the questions
+            
+        Returns:
+            DataFrame with one row per detected question and one column per Question field
+        """
+        import numpy as np
+        import pandas as pd
+        
+        lines = pd.Series(lines, dtype=object).fillna('').astype(str).str.strip()
+        classified = get_keyword_classifier().classify_frame(lines)
+        mask = classified['is_question'].to_numpy(dtype=bool)
+        text = lines[mask].reset_index(drop=True)
+        found = classified[mask].reset_index(drop=True)
+        
+        ids = (text + f"_{country}").map(lambda content: hashlib.md5(content.encode()).hexdigest())
+        options = found['has_select'].map(
+            lambda has_select: list(SELECTION_PLACEHOLDER_OPTIONS) if has_select else None
+        )
+        return pd.DataFrame({
+            'id': ids,
+            'text': text,
+            'type': found['question_type'].map(QuestionType),
+            'category': found['category'],
+            'country': country,
+            'required': True,
+            'options': options,
+            'help_text': '',
+            'regulatory_context': found['regulatory_context'],
+            'compliance_area': found['compliance_area'],
+            'page': page,
+            'page_hash': page_hash,
+            'position': np.arange(len(text)),
+            'duplicates': None
+        }, columns=QUESTION_FIELDS)
+    
+    @staticmethod
+    def questions_from_frame(frame: 'pd.DataFrame') -> List[Question]:
+        """Build Question objects from a classify_document() frame"""
+        return [Question(**record) for record in frame.to_dict('records')]
+    
+    @staticmethod
+    def _is_question_line(line: str) -> bool:
+        """Determine if a line contains a question"""
+        return get_keyword_classifier().classify(line).is_question
+    
+    @staticmethod
+    def _infer_question_type(question: str) -> str:
+        """Infer question type from text"""
+        return get_keyword_classifier().classify(question).question_type
+    
+    @staticmethod
+    def _extract_options(question: str) -> Optional[List[str]]:
+        """Extract options for selection questions"""
+        # This is a simplified implementation - you might need more sophisticated parsing
+        if 'select' in question.lower():
+            return list(SELECTION_PLACEHOLDER_OPTIONS)  # Placeholder
+        return None
+    
+    @staticmethod
+    def _generate_question_id(question: str, country: str) -> str:
+        """Generate unique ID for question"""
+        content = f"{question}_{country}"
+        return hashlib.md5(content.encode()).hexdigest()
+    
+    @staticmethod
+    def _categorize_question(question: str) -> str:
+        """Categorize question based on content"""
+        return get_keyword_classifier().classify(question).category
+    
+    @staticmethod
+    def _extract_regulatory_context(question: str) -> str:
+        """Extract regulatory context from question"""
+        return get_keyword_classifier().classify(question).regulatory_context
+    
+    @staticmethod
+    def _identify_compliance_area(question: str) -> str:
+        """Identify compliance area"""
+        return get_keyword_classifier().classify(question).compliance_area
+    
+    def _remove_duplicate_questions(self, questions: List[Question]) -> List[Question]:
+        """Remove duplicate questions (and near-duplicates when a threshold is configured)"""
+        seen = set()
+        unique_questions = []
+        
+        for q in questions:
+            if q.text not in seen:
+                seen.add(q.text)
+                unique_questions.append(q)
+        
+        if self.deduplicator and len(unique_questions) > 1:
+            try:
+                with self.metrics.timer('stage_seconds', stage='deduplication'):
+                    unique_questions, duplicate_groups = self.deduplicator.deduplicate(unique_questions)
+                merged = sum(len(group.members) - 1 for group in duplicate_groups)
+                if merged:
+                    logger.info("Merged %d near-duplicate questions into %d", merged, len(duplicate_groups))
+            except Exception as e:
+                self._log_error('deduplication', "Error detecting near-duplicate questions", e)
+        
+        return unique_questions
+    
+    def find_shared_questions(self, countries: Optional[List[str]] = None,
+                              threshold: float = 0.9) -> List[DuplicateGroup]:
+        """
+        Find near-duplicate questions across stored questionnaires
+        
+        Args:
+            countries: Countries to compare (defaults to every stored question)
+            threshold: Cosine similarity above which questions are grouped
+            
+        Returns:
+            Groups of equivalent questions; groups spanning several countries come first
+        """
+        try:
+            where = {"country": {"$in": countries}} if countries else None
+            questions = [
+                self._question_from_record(question_id, doc, metadata)
+                for question_id, doc, metadata in self._iter_question_records(where)
+            ]
+            questions.sort(key=lambda q: (q.country, q.page, q.position, q.id))
+            
+            from .embeddings import QuestionDeduplicator
+            
+            deduplicator = QuestionDeduplicator(self.embed_texts, threshold=threshold)
+            duplicate_groups = deduplicator.find_groups(questions)
+            duplicate_groups.sort(key=lambda group: (-len(group.countries), -len(group.members)))
+            return duplicate_groups
+            
+        except Exception as e:
+            self._log_error('shared_questions', "Error finding shared questions", e)
+            return []
+    
+    def _question_metadata(self, question: Question) -> Dict[str, Any]:
+        """Metadata stored alongside a question document (without timestamp)"""
+        return {
+            'country': question.country,
+            'category': question.category,
+            'type': question.type.value,
+            'required': question.required,
+            'options': json.dumps(question.options) if question.options else None,
+            'help_text': question.help_text,
+            'regulatory_context': question.regulatory_context,
+            'compliance_area': question.compliance_area,
+            'page': question.page,
+            'page_hash': question.page_hash,
+            'position': question.position,
+            'duplicates': json.dumps(question.duplicates) if question.duplicates else None
+        }
+    
+    def _question_from_record(self, question_id: str, text: str, metadata: Dict[str, Any]) -> Question:
+        """Rebuild a Question from a stored document and its metadata"""
+        return Question(
+            id=question_id,
+            text=text,
+            type=QuestionType(metadata['type']),
+            category=metadata['category'],
+            country=metadata['country'],
+            required=metadata['required'],
+            options=json.loads(metadata['options']) if metadata.get('options') else None,
+            help_text=metadata['help_text'],
+            regulatory_context=metadata['regulatory_context'],
+            compliance_area=metadata['compliance_area'],
+            page=metadata.get('page', 0),
+            page_hash=metadata.get('page_hash', ''),
+            position=metadata.get('position', 0),
+            duplicates=json.loads(metadata['duplicates']) if metadata.get('duplicates') else None
+        )
+    
+    def _upsert_questions(self, questions: List[Question]):
+        """Upsert questions in a single collection call"""
+        documents = []
+        metadatas = []
+        ids = []
+        timestamp = datetime.now().isoformat()
+        
+        for question in questions:
+            documents.append(question.text)
+            metadata = self._question_metadata(question)
+            metadata['timestamp'] = timestamp
+            metadatas.append(metadata)
+            ids.append(question.id)
+        
+        embeddings = self.embed_texts(documents)
+        with self.metrics.timer('stage_seconds', stage='db_write'):
+            self.questions_collection.upsert(
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=metadatas,
+                ids=ids
+            )
+        
+        for country in set(question.country for question in questions):
+            self.catalogue.invalidate(country)
+        self._invalidate_search()
+    
+    def _invalidate_search(self):
+        with self.search_lock:
+            self.search_version += 1
+            self.search_cache.clear()
+    
+    def save_questions_to_db(self, questions: List[Question]):
+        """Save questions to vector database (existing IDs are updated in place)"""
+        try:
+            self._upsert_questions(questions)
+            
+            logger.info("Saved %d questions to database", len(questions))
+            
+        except Exception as e:
+            self._log_error('save_questions', "Error saving questions", e)
+    
+    def _iter_question_records(self, where: Optional[Dict[str, Any]],
+                               page_size: int = 1000) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Yield (id, document, metadata) for every stored question matching a metadata filter
+        
+        Uses paginated metadata-only fetches, so no query text is embedded and
+        results are never truncated.
+        """
+        offset = 0
+        while True:
+            with self.metrics.timer('stage_seconds', stage='db_read'):
+                results = self.questions_collection.get(
+                    where=where,
+                    limit=page_size,
+                    offset=offset,
+                    include=["documents", "metadatas"]
+                )
+            ids = results['ids']
+            yield from zip(ids, results['documents'], results['metadatas'])
+            
+            if len(ids) < page_size:
+                return
+            offset += page_size
+    
+    def _fetch_questions(self, where: Dict[str, Any]) -> List[Question]:
+        """Fetch all questions matching a metadata filter in document order"""
+        questions = [
+            self._question_from_record(question_id, doc, metadata)
+            for question_id, doc, metadata in self._iter_question_records(where)
+        ]
+        questions.sort(key=lambda q: (q.page, q.position, q.id))
+        return questions
+    
+    def _get_stored_questions(self, country: str) -> Dict[str, Dict[str, Any]]:
+        """Return {question_id: {'text': ..., **metadata}} for every stored question of a country"""
+        return {
+            question_id: dict(metadata, text=doc)
+            for question_id, doc, metadata in self._iter_question_records({"country": country})
+        }
+    
+    def _diff_questions(self, stored: Dict[str, Dict[str, Any]], questions: List[Question]) -> Dict[str, Any]:
+        """Compute the add/update/delete diff between stored and freshly extracted questions"""
+        added, updated, unchanged = [], [], 0
+        current_ids = set()
+        
+        for question in questions:
+            current_ids.add(question.id)
+            record = stored.get(question.id)
+            if record is None:
+                added.append(question.id)
+                continue
+            
+            metadata = self._question_metadata(question)
+            if record['text'] != question.text or any(record.get(k) != v for k, v in metadata.items()):
+                updated.append(question.id)
+            else:
+                unchanged += 1
+        
+        deleted = [question_id for question_id in stored if question_id not in current_ids]
+        
+        return {
+            'added': added,
+            'updated': updated,
+            'deleted': deleted,
+            'unchanged': unchanged
+        }
+    
+    def _apply_question_diff(self, country: str, questions: List[Question], diff: Dict[str, Any]):
+        """Apply a question diff with one batched upsert and one batched delete"""
+        changed_ids = set(diff['added']) | set(diff['updated'])
+        changed = [q for q in questions if q.id in changed_ids]
+        
+        if changed:
+            self.save_questions_to_db(changed)
+        if diff['deleted']:
+            with self.metrics.timer('stage_seconds', stage='db_write'):
+                self.questions_collection.delete(ids=diff['deleted'])
+            self.catalogue.invalidate(country)
+            self._invalidate_search()
+    
+    def _extract_questions_incremental(self, pdf_path: str,
+                                       max_concurrency: Optional[int] = None) -> Tuple[str, List[Question], int, int]:
+        """
+        Extract questions, re-processing only pages whose fingerprint is new for the country
+        
+        Returns:
+            (country, unique questions, total pages, re-processed pages)
+        """
+        country = self.detect_country_from_pdf(pdf_path)
+        logger.info("Detected country: %s", country)
+        
+        known_pages = self.page_manifest.get_pages(country)
+        page_results: List[List[Question]] = []
+        fingerprints = []
+        changed_pages = 0
+        
+        def is_known(page_text: str) -> bool:
+            return self._page_fingerprint(page_text) in known_pages
+        
+        def pages_to_extract() -> Iterator[Tuple[int, str, Optional[LayoutExtraction]]]:
+            nonlocal changed_pages
+            for page_num, page_text, layout in self._iter_page_layouts(pdf_path, skip=is_known):
+                fingerprint = self._page_fingerprint(page_text)
+                fingerprints.append(fingerprint)
+                if fingerprint in known_pages:
+                    page_results.append([
+                        self._question_from_record(record['id'], record['text'], dict(record, page=page_num + 1))
+                        for record in known_pages[fingerprint]
+                    ])
+                else:
+                    page_results.append([])
+                    changed_pages += 1
+                    yield page_num, page_text, layout
+        
+        for page_num, page_questions in self._iter_extracted_pages(pages_to_extract(), country, max_concurrency):
+            page_results[page_num] = page_questions
+        logger.info("Re-processed %d of %d pages", changed_pages, len(page_results))
+        
+        # Only pages that yielded questions are remembered, so failed extractions are retried next time
+        manifest = {}
+        for fingerprint, page_questions in zip(fingerprints, page_results):
+            if page_questions:
+                manifest[fingerprint] = [
+                    dict(self._question_metadata(q), id=q.id, text=q.text) for q in page_questions
+                ]
+        self.page_manifest.replace_pages(country, manifest)
+        
+        questions = []
+        for page_questions in page_results:
+            questions.extend(page_questions)
+        
+        return country, self._remove_duplicate_questions(questions), len(page_results), changed_pages
+    
+    def upload_questionnaire(self, pdf_path: str, incremental: bool = False) -> Dict[str, Any]:
+        """
+        Main method to upload questionnaire from PDF
+        
+        Args:
+            pdf_path: Path to PDF file
+            incremental: Diff against the stored questionnaire for the country,
+                re-processing only changed pages and deleting dropped questions
+            
+        Returns:
+            Summary of uploaded questionnaire
+        """
+        with self.metrics.timer('stage_seconds', stage='upload'):
+            return self._upload_questionnaire(pdf_path, incremental)
+    
+    def _upload_questionnaire(self, pdf_path: str, incremental: bool) -> Dict[str, Any]:
+        if incremental:
+            errors_before = self.metrics.counter('errors_total', operation='question_extraction')
+            country, questions, total_pages, reprocessed_pages = self._extract_questions_incremental(pdf_path)
+            if not questions:
+                extraction_failed = self.metrics.counter('errors_total', operation='question_extraction') > errors_before
+                return self._remove_emptied_questionnaire(country, extraction_failed, total_pages, reprocessed_pages)
+        else:
+            questions = self.extract_questions_from_pdf(pdf_path)
+        
+        if questions:
+            if incremental:
+                diff = self._diff_questions(self._get_stored_questions(country), questions)
+                self._apply_question_diff(country, questions, diff)
+            else:
+                self.save_questions_to_db(questions)
+            
+            # Create summary
+            country = questions[0].country
+            categories = {}
+            for q in questions:
+                categories[q.category] = categories.get(q.category, 0) + 1
+            
+            summary = {
+                'success': True,
+                'country': country,
+                'total_questions': len(questions),
+                'categories': categories,
+                'message': f'Successfully uploaded {len(questions)} questions for {country}'
+            }
+            if incremental:
+                summary['diff'] = diff
+                summary['pages'] = {'total': total_pages, 'reprocessed': reprocessed_pages}
+            return summary
+        else:
+            return {
+                'success': False,
+                'message': 'No questions could be extracted from the PDF'
+            }
+    
+    def _remove_emptied_questionnaire(self, country: str, extraction_failed: bool,
+                                      total_pages: int, reprocessed_pages: int) -> Dict[str, Any]:
+        """
+        Incremental upload of a revision without questions: delete the country's stored questions
+        
+        When extraction errors were logged during the upload the revision may only
+        look empty, so nothing is deleted and the upload fails.
+        """
+        stored = self._get_stored_questions(country)
+        pages = {'total': total_pages, 'reprocessed': reprocessed_pages}
+        if not stored:
+            return {
+                'success': False,
+                'country': country,
+                'pages': pages,
+                'message': 'No questions could be extracted from the PDF'
+            }
+        if extraction_failed:
+            return {
+                'success': False,
+                'country': country,
+                'pages': pages,
+                'message': (f'No questions could be extracted from the PDF and extraction errors occurred; '
+                            f'kept the {len(stored)} stored questions for {country}')
+            }
+        
+        diff = self._diff_questions(stored, [])
+        self._apply_question_diff(country, [], diff)
+        return {
+            'success': True,
+            'country': country,
+            'total_questions': 0,
+            'categories': {},
+            'diff': diff,
+            'pages': pages,
+            'message': f'Revised questionnaire has no questions; removed {len(diff["deleted"])} questions for {country}'
+        }
+    
+    def _resolve_pdf_paths(self, source: str) -> List[str]:
+        """Expand a directory or glob pattern into a sorted list of PDF paths"""
+        if os.path.isdir(source):
+            paths = glob.glob(os.path.join(source, '*.pdf')) + glob.glob(os.path.join(source, '*.PDF'))
+        else:
+            paths = glob.glob(source, recursive=True)
+        return sorted(set(path for path in paths if os.path.isfile(path)))
+    
+    def bulk_upload_questionnaires(self, source: str, processes: Optional[int] = None,
+                                   max_files_in_flight: int = 4, batch_size: int = 5000) -> Dict[str, Any]:
+        """
+        Upload every questionnaire in a directory or matching a glob pattern
+        
+        PyMuPDF parsing and the heuristic classifiers run in a process pool,
+        Gemini calls from all files share one bounded dispatcher, and questions
+        are written to ChromaDB in large batches.
+        
+        Args:
+            source: Directory containing PDFs, or a glob pattern
+            processes: Size of the process pool (defaults to the CPU count)
+            max_files_in_flight: Number of files being ingested at the same time
+            batch_size: Number of questions per database write
+            
+        Returns:
+            Summary with a per-file report including stage timings
+        """
+        paths = self._resolve_pdf_paths(source)
+        if not paths:
+            return {
+                'success': False,
+                'message': f'No PDF files found for {source}',
+                'reports': []
+            }
+        
+        start = time.perf_counter()
+        get_max_batch_size = getattr(self.client, 'get_max_batch_size', None)
+        if get_max_batch_size:
+            batch_size = min(batch_size, get_max_batch_size())
+        
+        writer = QuestionBatchWriter(self, batch_size)
+        dispatcher = LLMDispatcher(self.max_concurrency)
+        
+        try:
+            with ProcessPoolExecutor(max_workers=processes) as pool, \
+                    ThreadPoolExecutor(max_workers=max_files_in_flight) as coordinators:
+                reports = list(coordinators.map(
+                    lambda path: self._bulk_ingest_file(path, pool, dispatcher, writer), paths
+                ))
+        finally:
+            dispatcher.shutdown()
+        
+        writer.flush()
+        for report in reports:
+            if report['path'] in writer.failed:
+                report['success'] = False
+                report['error'] = writer.failed[report['path']]
+        
+        successful = [report for report in reports if report['success']]
+        summary = {
+            'success': not writer.failed and len(successful) > 0,
+            'files': len(paths),
+            'files_succeeded': len(successful),
+            'total_questions': sum(report['total_questions'] for report in successful),
+            'db_batches': writer.batches,
+            'db_write_seconds': writer.write_seconds,
+            'total_seconds': time.perf_counter() - start,
+            'reports': reports,
+            'message': f'Uploaded {writer.written} questions from {len(successful)} of {len(paths)} files'
+        }
+        if writer.failed:
+            summary['error'] = f"Saving questions failed for {len(writer.failed)} files"
+        return summary
+    
+    def _bulk_ingest_file(self, pdf_path: str, pool: ProcessPoolExecutor,
+                          dispatcher: LLMDispatcher, writer: QuestionBatchWriter) -> Dict[str, Any]:
+        """Run one file through the bulk pipeline and report per-stage timings"""
+        start = time.perf_counter()
+        timings = {}
+        report = {
+            'path': pdf_path,
+            'success': False,
+            'country': None,
+            'pages': 0,
+            'total_questions': 0,
+            'timings': timings
+        }
+        
+        def request_unit(unit: PromptUnit) -> Dict[int, List[Dict]]:
+            try:
+                return self._request_unit_questions(unit)
+            except Exception as e:
+                self._log_error('question_extraction', "Error extracting questions", e)
+                return {}
+        
+        try:
+            stage = time.perf_counter()
+            ocr = self.ocr
+            parsed = pool.submit(
+                _parse_pdf_for_ingest, pdf_path, self.countries, self.layout_confidence_threshold,
+                ocr.min_text_chars if ocr else None
+            ).result()
+            timings['parse'] = time.perf_counter() - stage
+            pages = parsed['pages']
+            report['pages'] = len(pages)
+            
+            if parsed['scanned']:
+                # Scanned pages are rendered and recognized in the same process pool
+                stage = time.perf_counter()
+                futures = {
+                    page_num: ocr.submit(pdf_path, page_num, content_hash, pool=pool)
+                    for page_num, content_hash in parsed['scanned'].items()
+                }
+                for page_num, future in futures.items():
+                    text = ocr.result(future)
+                    pages[page_num] = (text, self._page_fingerprint(text), None)
+                timings['ocr'] = time.perf_counter() - stage
+                report['ocr_pages'] = len(futures)
+            
+            stage = time.perf_counter()
+            country = parsed['country']
+            if country is None and parsed['scanned']:
+                country = next(filter(None, (self._match_country(pages[page_num][0])
+                                             for page_num in sorted(parsed['scanned']))), None)
+            country = country or self.extract_country_from_text(
+                " ".join(text for text, _, _ in pages)[:2000]
+            )
+            timings['country'] = time.perf_counter() - stage
+            report['country'] = country
+            
+            stage = time.perf_counter()
+            # Pages extracted from their layout in the parse stage skip Gemini;
+            # the rest are packed into token-budgeted prompts; blank pages are skipped
+            page_records = {
+                page_num: list(layout_records) if layout_records is not None and text.strip() else []
+                for page_num, (text, _, layout_records) in enumerate(pages)
+            }
+            llm_pages = [(page_num, text) for page_num, (text, _, layout_records) in enumerate(pages)
+                         if layout_records is None and text.strip()]
+            empty_pages = sum(1 for text, _, _ in pages if not text.strip())
+            futures = [dispatcher.submit(request_unit, unit) for unit in self.prompt_builder.units(llm_pages)]
+            for future in futures:
+                for page_num, records in future.result().items():
+                    page_records[page_num].extend(records)
+            pages_data = [
+                (page_num + 1, page_records[page_num], page_hash)
+                for page_num, (_, page_hash, _) in enumerate(pages)
+            ]
+            report['layout_pages'] = len(pages) - len(llm_pages) - empty_pages
+            report['empty_pages'] = empty_pages
+            report['llm_calls'] = len(futures)
+            self._count_extraction('layout', report['layout_pages'])
+            self._count_extraction('llm', len(llm_pages))
+            self._count_extraction('empty', empty_pages)
+            timings['llm'] = time.perf_counter() - stage
+            
+            stage = time.perf_counter()
+            questions = pool.submit(_classify_questions_for_ingest, pages_data, country).result()
+            questions = self._remove_duplicate_questions(questions)
+            timings['classify'] = time.perf_counter() - stage
+            
+            # Remember the pages once stored, so an incremental re-upload skips them
+            manifest: Dict[str, List[Dict[str, Any]]] = {}
+            for question in questions:
+                manifest.setdefault(question.page_hash, []).append(
+                    dict(self._question_metadata(question), id=question.id, text=question.text)
+                )
+            writer.add(questions, pdf_path, lambda: self.page_manifest.replace_pages(country, manifest))
+            report['success'] = len(questions) > 0
+            report['total_questions'] = len(questions)
+            logger.info("Ingested %s: %d questions for %s", pdf_path, len(questions), country)
+            
+        except Exception as e:
+            report['error'] = str(e)
+            self._log_error('bulk_ingest', f"Error ingesting {pdf_path}", e)
+        
+        timings['total'] = time.perf_counter() - start
+        for name, stage in (('parse', 'pdf_parse'), ('ocr', 'ocr'), ('country', 'country_detection'),
+                            ('classify', 'classification')):
+            if name in timings:
+                self.metrics.observe('stage_seconds', timings[name], stage=stage)
+        self.metrics.observe('stage_seconds', timings['total'], stage='upload')
+        return report
+    
+    # =================== CASE 2: INTERACTIVE CHATBOT ===================
+    
+    def get_countries(self) -> List[str]:
+        """Get list of available countries"""
+        return self.countries
+    
+    def get_question_catalogue(self, country: str) -> QuestionCatalogue:
+        """Get the cached, shared question catalogue of a country"""
+        return self.catalogue.get(country)
+    
+    def get_questions_for_country(self, country: str) -> List[Question]:
+        """Get all questions for a specific country"""
+        try:
+            return list(self.get_question_catalogue(country).questions)
+            
+        except Exception as e:
+            self._log_error('get_questions', "Error getting questions for country", e)
+            return []
+    
+    def get_questions_by_category(self, country: str, category: str) -> List[Question]:
+        """Get questions by category for a specific country"""
+        try:
+            return list(self.get_question_catalogue(country).by_category.get(category, ()))
+            
+        except Exception as e:
+            self._log_error('get_questions', "Error getting questions by category", e)
+            return []
+    
+    def search_questions(self, query: str, country: Optional[str] = None, category: Optional[str] = None,
+                         compliance_area: Optional[str] = None, top_k: int = 10,
+                         offset: int = 0) -> List[SearchResult]:
+        """
+        Semantic search over stored questions
+        
+        Query embeddings are reused through the vector cache, and results are
+        kept in memory until questions are saved or deleted.
+        
+        Args:
+            query: Free-text query
+            country: Only search questions of this country
+            category: Only search questions of this category
+            compliance_area: Only search questions of this compliance area
+            top_k: Number of results to return
+            offset: Number of top-ranked results to skip (for pagination)
+            
+        Returns:
+            Questions ranked by cosine similarity to the query, with scores
+        """
+        import numpy as np
+        
+        filters = [
+            {field: value}
+            for field, value in (('country', country), ('category', category), ('compliance_area', compliance_area))
+            if value
+        ]
+        cache_key = (query, country, category, compliance_area, top_k, offset)
+        with self.search_lock:
+            version = self.search_version
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                self.search_cache.move_to_end(cache_key)
+                self.metrics.inc('cache_hits_total', cache='search')
+                return list(cached)
+        self.metrics.inc('cache_misses_total', cache='search')
+        
+        try:
+            query_vector = self._embed_query(query)
+            with self.metrics.timer('stage_seconds', stage='db_read'):
+                results = self.questions_collection.query(
+                    query_embeddings=[query_vector],
+                    n_results=offset + top_k,
+                    where=filters[0] if len(filters) == 1 else ({"$and": filters} if filters else None),
+                    include=["documents", "metadatas", "embeddings"]
+                )
+            
+            ranked = []
+            for question_id, doc, metadata, vector in zip(results['ids'][0], results['documents'][0],
+                                                          results['metadatas'][0], results['embeddings'][0]):
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = float(np.linalg.norm(vector) * np.linalg.norm(query_vector)) or 1.0
+                score = float(np.dot(vector, query_vector)) / norm
+                ranked.append(SearchResult(self._question_from_record(question_id, doc, metadata), round(score, 4)))
+            ranked.sort(key=lambda result: -result.score)
+            page = ranked[offset:offset + top_k]
+            
+        except Exception as e:
+            self._log_error('search', "Error searching questions", e)
+            return []
+        
+        with self.search_lock:
+            if version == self.search_version and self.search_cache_size > 0:
+                self.search_cache[cache_key] = tuple(page)
+                while len(self.search_cache) > self.search_cache_size:
+                    self.search_cache.popitem(last=False)
+        return page
+    
+    def get_similarity_index(self, questions: List[Question]) -> 'QuestionSimilarityIndex':
+        """Cross-country similarity index over the given questions (vectors come from the vector cache)"""
+        import numpy as np
+        from .embeddings import QuestionSimilarityIndex
+        
+        vectors = self.embed_texts([q.text for q in questions])
+        if len(vectors):
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return QuestionSimilarityIndex(questions, vectors, self.search_version)
+    
+    def _get_questions_by_id(self, question_ids: List[str]) -> List[Question]:
+        """Stored questions with the given ids (unknown ids are skipped)"""
+        if not question_ids:
+            return []
+        with self.metrics.timer('stage_seconds', stage='db_read'):
+            results = self.questions_collection.get(ids=question_ids, include=["documents", "metadatas"])
+        return [
+            self._question_from_record(question_id, doc, metadata)
+            for question_id, doc, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+        ]
+    
+    def suggest_answers(self, user_id: str, questions: Iterable[Question], exclude_session: Optional[str] = None,
+                        min_confidence: float = 0.8) -> Dict[str, Dict[str, Any]]:
+        """
+        Propose answers from the user's earlier sessions
+        
+        An earlier answer to the same question counts with similarity 1.0;
+        otherwise the most similar answered question (from any country) is used.
+        The confidence is the similarity times the confidence of the earlier answer.
+        Only the given questions and the ones the user answered are embedded.
+        
+        Args:
+            user_id: User to suggest answers for
+            questions: Questions that need answers
+            exclude_session: Session whose own answers are not reused
+            min_confidence: Suggestions below this confidence are dropped
+            
+        Returns:
+            {question_id: {'answer', 'confidence', 'source_question_id', 'source_country', 'similarity'}}
+        """
+        try:
+            prior = self.response_store.get(user_id, exclude_session=exclude_session)
+            if not prior:
+                return {}
+            
+            questions = list(questions)
+            question_ids = {question.id for question in questions}
+            history = self._get_questions_by_id([qid for qid in prior if qid not in question_ids])
+            index = self.get_similarity_index(questions + history)
+            suggestions = {}
+            for question in questions:
+                candidates = [(question.id, 1.0)] + index.similar(question.id)
+                best = None
+                for source_id, similarity in candidates:
+                    response = prior.get(source_id)
+                    if response is None:
+                        continue
+                    confidence = similarity * float(response.get('confidence', 1.0))
+                    if confidence >= min_confidence and (best is None or confidence > best['confidence']):
+                        best = {
+                            'answer': response['answer'],
+                            'confidence': round(confidence, 4),
+                            'source_question_id': source_id,
+                            'source_country': index.countries.get(source_id, question.country),
+                            'similarity': similarity
+                        }
+                if best:
+                    suggestions[question.id] = best
+            return suggestions
+            
+        except Exception as e:
+            self._log_error('suggest_answers', "Error suggesting answers", e)
+            return {}
+    
+    def save_user_response(self, user_id: str, question_id: str, answer: Any, session_id: str = None,
+                           confidence: float = 1.0):
+        """Save user response to database"""
+        try:
+            response = UserResponse(
+                question_id=question_id,
+                answer=answer,
+                timestamp=datetime.now().isoformat(),
+                confidence=confidence
+            )
+            
+            with self.metrics.timer('stage_seconds', stage='response_write'):
+                self.response_store.save(user_id, session_id or 'default', response)
+            
+        except Exception as e:
+            self._log_error('save_response', "Error saving response", e)
+    
+    def flush_responses(self):
+        """Write any buffered responses to the response store"""
+        flush = getattr(self.response_store, 'flush', None)
+        if flush:
+            try:
+                with self.metrics.timer('stage_seconds', stage='response_write'):
+                    flush()
+            except Exception as e:
+                self._log_error('save_response', "Error flushing responses", e)
+    
+    def get_user_responses(self, user_id: str, session_id: str = None) -> Dict[str, Any]:
+        """Get all responses for a user session"""
+        try:
+            with self.metrics.timer('stage_seconds', stage='response_read'):
+                return self.response_store.get(user_id, session_id)
+            
+        except Exception as e:
+            self._log_error('get_responses', "Error getting user responses", e)
+            return {}
+    
+    def generate_completion_report(self, user_id: str, country: str, session_id: str = None) -> Dict[str, Any]:
+        """Generate completion report for user"""
+        questions = self.get_questions_for_country(country)
+        responses = self.get_user_responses(user_id, session_id)
+        
+        total_questions = len(questions)
+        answered_questions = len(responses)
+        completion_rate = (answered_questions / total_questions * 100) if total_questions > 0 else 0
+        
+        # Category breakdown
+        category_stats = {}
+        for question in questions:
+            category = question.category
+            if category not in category_stats:
+                category_stats[category] = {'total': 0, 'answered': 0}
+            category_stats[category]['total'] += 1
+            if question.id in responses:
+                category_stats[category]['answered'] += 1
+        
+        # Calculate category completion rates
+        for category, stats in category_stats.items():
+            stats['completion_rate'] = (stats['answered'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        
+        return {
+            'country': country,
+            'total_questions': total_questions,
+            'answered_questions': answered_questions,
+            'completion_rate': completion_rate,
+            'category_stats': category_stats,
+            'missing_questions': [q.id for q in questions if q.id not in responses]
+        }
+
+def _parse_pdf_for_ingest(pdf_path: str, countries: List[str], layout_threshold: Optional[float] = None,
+                          ocr_min_text_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Process-pool worker: read page texts with fingerprints and detect the country by keyword
+    
+    Pages are (text, fingerprint, layout question records); the records are
+    None unless layout extraction reached layout_threshold. When
+    ocr_min_text_chars is given, pages needing OCR are returned in 'scanned'
+    as {page index: page_content_hash} for the caller to recognize.
+    """
+    pages = []
+    scanned = {}
+    country = None
+    extractor = LayoutQuestionExtractor() if layout_threshold is not None else None
+    
+    doc = _open_pdf(pdf_path)
+    try:
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            text = page.get_text()
+            layout_records = None
+            if ocr_min_text_chars is not None and needs_ocr(page, text, ocr_min_text_chars):
+                scanned[page_num] = page_content_hash(page)
+            elif extractor:
+                try:
+                    layout = extractor.extract(page)
+                    if layout.confidence >= layout_threshold:
+                        layout_records = layout.records
+                except Exception as e:
+                    logger.error("Error reading page layout: %s", e, exc_info=True)
+            pages.append((text, NCAQuestionnaireSystem._page_fingerprint(text), layout_records))
+            if country is None:
+                text_lower = text.lower()
+                country = next((c for c in countries if c.lower() in text_lower), None)
+    finally:
+        doc.close()
+    
+    return {'pages': pages, 'scanned': scanned, 'country': country}
+
+def _classify_questions_for_ingest(pages_data: List[Tuple[int, List[Dict], str]], country: str) -> List[Question]:
+    """Process-pool worker: build classified questions from raw (page, records, page hash) tuples"""
+    questions = []
+    for page_num, questions_data, page_hash in pages_data:
+        try:
+            questions.extend(
+                NCAQuestionnaireSystem._build_page_questions(questions_data, country, page_num, page_hash)
+            )
+        except Exception as e:
+            logger.error("Error extracting questions: %s", e, exc_info=True)
+    return questions
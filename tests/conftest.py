@@ -0,0 +1,69 @@
+"""
+Shared fixtures: the offline system from benchmarks/offline_benchmark.py
+
+Gemini is replaced by the deterministic fake model (with no latency) and
+ChromaDB runs in memory with hashing embeddings, so tests need no API key.
+In-memory ChromaDB clients share one database per process, so its
+collections are dropped after every test.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture
+def fake_model():
+    from offline_benchmark import FakeGenerativeModel
+
+    latency, calls = FakeGenerativeModel.latency, FakeGenerativeModel.calls
+    FakeGenerativeModel.latency = 0.0
+    FakeGenerativeModel.calls = 0
+    yield FakeGenerativeModel
+    FakeGenerativeModel.latency, FakeGenerativeModel.calls = latency, calls
+
+
+@pytest.fixture
+def make_system(tmp_path, fake_model):
+    """Factory of offline systems sharing tmp_path/db unless another db_path is given"""
+    from offline_benchmark import OfflineSystem
+
+    systems = []
+
+    def make(**options):
+        options.setdefault('db_path', str(tmp_path / 'db'))
+        options.setdefault('use_ocr', False)
+        system = OfflineSystem('offline', **options)
+        systems.append(system)
+        return system
+
+    yield make
+    for system in systems:
+        system.flush_responses()
+    if systems:
+        client = systems[0].client
+        for collection in client.list_collections():
+            client.delete_collection(getattr(collection, 'name', collection))
+
+
+@pytest.fixture
+def write_questionnaire(tmp_path):
+    """Factory writing a questionnaire PDF from a list of pages, each a list of question lines"""
+    import fitz
+
+    def write(name, country, pages):
+        doc = fitz.open()
+        for page_num, questions in enumerate(pages):
+            lines = [f"NCA Questionnaire - {country}"] if page_num == 0 else []
+            lines.append(f"Section {page_num + 1}: Client Due Diligence")
+            doc.new_page().insert_text((50, 72), "\n".join(lines + questions), fontsize=10)
+        path = str(tmp_path / name)
+        doc.save(path)
+        doc.close()
+        return path
+
+    return write
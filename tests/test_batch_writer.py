@@ -0,0 +1,89 @@
+"""
+Tests for QuestionBatchWriter failure handling
+"""
+from nca_questionnaire.ingest import QuestionBatchWriter
+from nca_questionnaire.models import Question, QuestionType
+
+
+class FakeSystem:
+    """Records upserted questions; fails every write containing a question in fail_on"""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.stored = []
+        self.errors = []
+
+    def _upsert_questions(self, questions):
+        if self.fail_on & set(q.id for q in questions):
+            raise IOError("database unavailable")
+        self.stored.extend(q.id for q in questions)
+
+    def _log_error(self, operation, message, error):
+        self.errors.append(operation)
+
+
+def questions(prefix, count):
+    return [
+        Question(id=f"{prefix}{i}", text=f"Question {prefix}{i}?", type=QuestionType.YES_NO, category='General',
+                 country='Qatar', page=1, position=i)
+        for i in range(count)
+    ]
+
+
+def test_callbacks_run_once_all_questions_are_stored():
+    system = FakeSystem()
+    writer = QuestionBatchWriter(system, batch_size=5)
+    written = []
+
+    writer.add(questions('a', 2), 'a.pdf', lambda: written.append('a.pdf'))
+    writer.add(questions('b', 2), 'b.pdf', lambda: written.append('b.pdf'))
+    assert written == [] and system.stored == []
+    writer.flush()
+
+    assert written == ['a.pdf', 'b.pdf']
+    assert sorted(system.stored) == ['a0', 'a1', 'b0', 'b1']
+    assert writer.failed == {} and writer.outstanding == {}
+
+
+def test_failed_write_marks_only_files_in_the_failed_batch():
+    system = FakeSystem(fail_on={'b0'})
+    writer = QuestionBatchWriter(system, batch_size=2)
+    written = []
+
+    writer.add(questions('a', 2), 'a.pdf', lambda: written.append('a.pdf'))
+    writer.add(questions('b', 2), 'b.pdf', lambda: written.append('b.pdf'))
+    writer.add(questions('c', 2), 'c.pdf', lambda: written.append('c.pdf'))
+    writer.flush()
+
+    assert list(writer.failed) == ['b.pdf']
+    assert written == ['a.pdf', 'c.pdf']
+    assert sorted(system.stored) == ['a0', 'a1', 'c0', 'c1']
+    assert system.errors == ['save_questions']
+    assert writer.pending == {} and writer.outstanding == {}
+
+
+def test_failure_in_a_shared_chunk_fails_every_file_in_it():
+    system = FakeSystem(fail_on={'a1'})
+    writer = QuestionBatchWriter(system, batch_size=10)
+    written = []
+
+    writer.add(questions('a', 2), 'a.pdf', lambda: written.append('a.pdf'))
+    writer.add(questions('b', 2), 'b.pdf', lambda: written.append('b.pdf'))
+    writer.flush()
+
+    assert sorted(writer.failed) == ['a.pdf', 'b.pdf']
+    assert written == []
+
+
+def test_question_shared_by_two_files_waits_for_both():
+    system = FakeSystem()
+    writer = QuestionBatchWriter(system, batch_size=10)
+    written = []
+
+    shared = questions('s', 1)
+    writer.add(shared + questions('a', 1), 'a.pdf', lambda: written.append('a.pdf'))
+    writer.add(shared, 'b.pdf', lambda: written.append('b.pdf'))
+    writer.flush()
+
+    assert sorted(written) == ['a.pdf', 'b.pdf']
+    assert sorted(system.stored) == ['a0', 's0']
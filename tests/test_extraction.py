@@ -0,0 +1,105 @@
+"""
+Tests for Gemini error classification and the per-page extraction cache
+"""
+import fitz
+import pytest
+from google.api_core import exceptions
+
+from nca_questionnaire import NCAQuestionnaireSystem
+
+PAGES = [[f"Does the entity keep client records for item {page}.{i}?" for i in range(3)] for page in range(4)]
+SCHEMA_MESSAGE = "Invalid JSON payload received. Unknown name \"response_schema\" at 'generation_config'"
+
+
+@pytest.mark.parametrize('error', [
+    exceptions.InvalidArgument(SCHEMA_MESSAGE),
+    exceptions.BadRequest("response_mime_type must be one of text/plain, application/json"),
+    TypeError("GenerationConfig.__init__() got an unexpected keyword argument 'response_schema'"),
+])
+def test_schema_errors_are_rejections(error):
+    assert NCAQuestionnaireSystem._is_schema_rejection(error)
+
+
+@pytest.mark.parametrize('error', [
+    exceptions.ResourceExhausted("Quota exceeded for generate_content with response_schema"),
+    exceptions.InternalServerError("An internal error occurred"),
+    exceptions.ServiceUnavailable("The service is currently unavailable"),
+    ConnectionError("Connection reset by peer while sending response_schema"),
+    TimeoutError("Request timed out"),
+    exceptions.InvalidArgument("Request contains an invalid argument: temperature"),
+])
+def test_transient_and_unrelated_errors_are_not_rejections(error):
+    assert not NCAQuestionnaireSystem._is_schema_rejection(error)
+
+
+def fail_structured_requests(monkeypatch, fake_model, error):
+    """Make the fake model raise error for every request with a generation_config"""
+    generate_content = fake_model.generate_content
+    structured_calls = []
+
+    def generate(self, prompt, **kwargs):
+        if kwargs.get('generation_config'):
+            structured_calls.append(prompt)
+            raise error
+        return generate_content(self, prompt, **kwargs)
+
+    monkeypatch.setattr(fake_model, 'generate_content', generate)
+    return structured_calls
+
+
+def upload(make_system, write_questionnaire):
+    system = make_system(use_llm_cache=False, layout_confidence_threshold=None, max_retries=2, retry_backoff=0.001)
+    return system, system.upload_questionnaire(write_questionnaire('qatar.pdf', 'Qatar', PAGES[:1]))
+
+
+def test_schema_rejection_disables_structured_output(monkeypatch, fake_model, make_system, write_questionnaire):
+    structured_calls = fail_structured_requests(monkeypatch, fake_model, exceptions.InvalidArgument(SCHEMA_MESSAGE))
+    system, summary = upload(make_system, write_questionnaire)
+
+    assert summary['success'] and summary['total_questions'] == 3
+    assert len(structured_calls) == 1
+    assert system.metrics.counter('llm_calls_total', outcome='rejected') == 1
+    assert system.metrics.counter('llm_calls_total', outcome='retried') == 0
+    assert system.structured_output is False
+
+
+@pytest.mark.parametrize('error', [
+    exceptions.ResourceExhausted("Resource has been exhausted (e.g. check quota)"),
+    exceptions.InternalServerError("An internal error occurred"),
+    exceptions.ServiceUnavailable("The service is currently unavailable"),
+    ConnectionError("Connection reset by peer"),
+], ids=['429', '500', '503', 'network'])
+def test_transient_errors_are_retried_and_keep_structured_output(monkeypatch, fake_model, make_system,
+                                                                 write_questionnaire, error):
+    structured_calls = fail_structured_requests(monkeypatch, fake_model, error)
+    system, summary = upload(make_system, write_questionnaire)
+
+    assert len(structured_calls) == 3  # first attempt and max_retries retries
+    assert system.metrics.counter('llm_calls_total', outcome='retried') == 2
+    assert system.metrics.counter('llm_calls_total', outcome='rejected') == 0
+    assert system.structured_output is True
+
+
+def test_segment_cache_survives_reordered_pages(fake_model, make_system, write_questionnaire, tmp_path):
+    path = write_questionnaire('qatar.pdf', 'Qatar', PAGES)
+    system = make_system(layout_confidence_threshold=None)
+
+    fake_model.calls = 0
+    assert system.upload_questionnaire(path)['total_questions'] == 12
+    assert fake_model.calls > 0
+
+    fake_model.calls = 0
+    assert system.upload_questionnaire(path)['total_questions'] == 12
+    assert fake_model.calls == 0
+    assert system.metrics.counter('llm_calls_total', outcome='cached') > 0
+
+    # A new first page shifts every page number, but only the new page needs Gemini
+    doc = fitz.open(path)
+    doc.new_page(0).insert_text((50, 72), "Is the new cover page signed by the compliance officer?", fontsize=10)
+    shifted = str(tmp_path / 'qatar_v2.pdf')
+    doc.save(shifted)
+    doc.close()
+
+    fake_model.calls = 0
+    assert system.upload_questionnaire(shifted)['total_questions'] == 13
+    assert fake_model.calls == 1
@@ -0,0 +1,30 @@
+"""
+Import-time regression test for chatbot-only and validation-only workers
+
+Runs the scenarios of benchmarks/import_time_benchmark.py in fresh
+interpreters. The budget can be raised on slow machines with
+NCA_IMPORT_BUDGET_MS.
+"""
+import os
+import statistics
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from import_time_benchmark import SCENARIOS, run_scenario  # noqa: E402
+
+BUDGET_MS = float(os.environ.get('NCA_IMPORT_BUDGET_MS', '250'))
+REPEAT = 3
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_import_time(scenario, tmp_path):
+    runs = [run_scenario(SCENARIOS[scenario], str(tmp_path)) for _ in range(REPEAT)]
+
+    heavy = sorted(set(module for run in runs for module in run['heavy']))
+    assert not heavy, f"{scenario} imports heavy modules: {', '.join(heavy)}"
+
+    median_ms = statistics.median(run['seconds'] for run in runs) * 1000
+    assert median_ms <= BUDGET_MS, f"{scenario} took {median_ms:.1f} ms (budget {BUDGET_MS:.0f} ms)"
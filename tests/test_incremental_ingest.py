@@ -0,0 +1,64 @@
+"""
+Tests for incremental re-ingest: page reuse and the stored question diff
+"""
+import pytest
+
+PAGES = [[f"Does the entity keep client records for item {page}.{i}?" for i in range(3)] for page in range(3)]
+
+
+@pytest.fixture
+def system(make_system, write_questionnaire):
+    system = make_system()
+    summary = system.upload_questionnaire(write_questionnaire('v1.pdf', 'Qatar', PAGES), incremental=True)
+    assert summary['success'] and summary['diff']['added'] and summary['pages'] == {'total': 3, 'reprocessed': 3}
+    return system
+
+
+def stored_texts(system):
+    return sorted(q.text for q in system.get_questions_for_country('Qatar'))
+
+
+def test_unchanged_revision_reuses_every_page(system, fake_model, write_questionnaire):
+    fake_model.calls = 0
+    summary = system.upload_questionnaire(write_questionnaire('v2.pdf', 'Qatar', PAGES), incremental=True)
+
+    assert summary['pages'] == {'total': 3, 'reprocessed': 0}
+    assert summary['diff'] == {'added': [], 'updated': [], 'deleted': [], 'unchanged': 9}
+    assert fake_model.calls == 0
+    assert stored_texts(system) == sorted(text for page in PAGES for text in page)
+
+
+def test_changed_page_is_reprocessed_and_diffed(system, write_questionnaire):
+    before = {q.text: q.id for q in system.get_questions_for_country('Qatar')}
+    pages = [list(page) for page in PAGES]
+    pages[1][0] = "Is the compliance officer appointed for item 1.0?"
+
+    summary = system.upload_questionnaire(write_questionnaire('v2.pdf', 'Qatar', pages), incremental=True)
+
+    assert summary['pages'] == {'total': 3, 'reprocessed': 1}
+    diff = summary['diff']
+    assert diff['deleted'] == [before[PAGES[1][0]]]
+    assert len(diff['added']) == 1
+    assert diff['unchanged'] + len(diff['updated']) == 8
+    assert stored_texts(system) == sorted(text for page in pages for text in page)
+
+
+def test_revision_without_questions_deletes_stored_questions(system, write_questionnaire):
+    summary = system.upload_questionnaire(write_questionnaire('v2.pdf', 'Qatar', [[]]), incremental=True)
+
+    assert summary['success'] and summary['total_questions'] == 0
+    assert len(summary['diff']['deleted']) == 9
+    assert system.get_questions_for_country('Qatar') == []
+
+
+def test_reupload_after_bulk_upload_reuses_pages(make_system, write_questionnaire, tmp_path):
+    system = make_system()
+    write_questionnaire('qatar.pdf', 'Qatar', PAGES)
+    write_questionnaire('kuwait.pdf', 'Kuwait', [[f"Is the beneficial owner identified for {i}?"] for i in range(2)])
+
+    bulk = system.bulk_upload_questionnaires(str(tmp_path), processes=1)
+    assert bulk['success'] and bulk['files_succeeded'] == 2
+
+    summary = system.upload_questionnaire(str(tmp_path / 'qatar.pdf'), incremental=True)
+    assert summary['pages']['reprocessed'] == 0
+    assert summary['diff']['unchanged'] == 9
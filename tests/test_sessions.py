@@ -0,0 +1,73 @@
+"""
+Tests for resuming questionnaire sessions
+"""
+import pytest
+
+from nca_questionnaire import NCAQuestionnaireBot
+from nca_questionnaire.bot import SessionManager
+
+PAGES = [[f"Does the entity keep client records for item {page}.{i}?" for i in range(2)] for page in range(2)]
+
+
+@pytest.fixture
+def system(make_system, write_questionnaire):
+    system = make_system()
+    assert system.upload_questionnaire(write_questionnaire('qatar.pdf', 'Qatar', PAGES))['success']
+    return system
+
+
+def test_resumed_session_continues_at_first_unanswered_question(system):
+    bot = NCAQuestionnaireBot(system)
+    session_id = bot.start_session('u1', 'Qatar', session_id='s1')['session_id']
+    first = bot.get_next_question(session_id)['question']['id']
+    bot.submit_answer('Yes', session_id)
+    second = bot.get_next_question(session_id)['question']['id']
+    bot.end_session(session_id)
+    system.flush_responses()
+
+    other = NCAQuestionnaireBot(system)
+    assert other.start_session('u1', 'Qatar', session_id='s1')['session_id'] == 's1'
+    assert other.get_next_question('s1')['question']['id'] == second
+    progress = other.get_progress('s1')
+    assert progress['answered_questions'] == 1
+    assert first not in progress['missing_questions']
+    assert other.verify_progress('s1')['consistent']
+
+
+def test_new_session_does_not_resume(system):
+    bot = NCAQuestionnaireBot(system)
+    bot.start_session('u1', 'Qatar', session_id='s1')
+    bot.submit_answer('Yes', 's1')
+    system.flush_responses()
+
+    bot.start_session('u1', 'Qatar', session_id='s1', resume=False)
+    assert bot.get_progress('s1')['answered_questions'] == 0
+
+
+def test_idle_session_is_spilled_and_restored(system):
+    sessions = SessionManager(system, max_idle=0, sweep_interval=3600)
+    bot = NCAQuestionnaireBot(system, session_manager=sessions)
+    bot.start_session('u1', 'Qatar', session_id='s1')
+    bot.submit_answer('Yes', 's1')
+    expected = bot.get_next_question('s1')['question']['id']
+
+    assert sessions.evict_idle() == 1
+    assert len(sessions) == 0
+
+    assert bot.get_next_question('s1')['question']['id'] == expected
+    assert bot.get_progress('s1')['answered_questions'] == 1
+    assert sessions.stats()['restored'] == 1
+
+
+def test_session_of_another_user_is_not_resumed(system):
+    sessions = SessionManager(system, max_idle=0, sweep_interval=3600)
+    bot = NCAQuestionnaireBot(system, session_manager=sessions)
+    bot.start_session('u1', 'Qatar', session_id='s1')
+    bot.submit_answer('Yes', 's1')
+
+    result = bot.start_session('u2', 'Qatar', session_id='s1')
+    assert result['success'] is False
+
+    sessions.evict_idle()
+    assert bot.start_session('u2', 'Qatar', session_id='s1')['success'] is False
+    assert bot.get_progress('s1')['answered_questions'] == 1
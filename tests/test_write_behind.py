@@ -0,0 +1,169 @@
+"""
+Tests for WriteBehindResponseStore: read visibility, failed flushes and journal replay
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from nca_questionnaire.models import UserResponse
+from nca_questionnaire.store import SQLiteResponseStore, WriteBehindResponseStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def response(question_id, answer, timestamp='2026-01-01T00:00:00'):
+    return UserResponse(question_id=question_id, answer=answer, timestamp=timestamp, confidence=1.0)
+
+
+def answers(store, user_id='u1'):
+    return {question_id: entry['answer'] for question_id, entry in store.get(user_id).items()}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'responses.sqlite3'), str(tmp_path / 'responses.journal')
+
+
+def open_store(paths, **options):
+    options.setdefault('max_batch', 1000)
+    options.setdefault('max_delay', 60.0)
+    return WriteBehindResponseStore(SQLiteResponseStore(paths[0]), journal_path=paths[1], **options)
+
+
+class BlockingStore(SQLiteResponseStore):
+    """SQLite store whose save_many waits for release (or fails) so a flush can be observed midway"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    def save_many(self, records):
+        self.started.set()
+        self.release.wait(10)
+        if self.fail:
+            raise IOError("database unavailable")
+        super().save_many(records)
+
+
+def test_get_sees_buffered_answers(paths):
+    store = open_store(paths)
+    store.save_many([('u1', 's1', response('q1', 'yes')), ('u2', 's1', response('q1', 'no'))])
+
+    assert answers(store) == {'q1': 'yes'}
+    assert store.get('u1', exclude_session='s1') == {}
+    store.close()
+
+
+def test_get_sees_answers_while_they_are_flushed(paths):
+    inner = BlockingStore(paths[0])
+    store = WriteBehindResponseStore(inner, max_batch=1000, max_delay=60.0, journal_path=paths[1])
+    store.save_many([('u1', 's1', response('q1', 'yes'))])
+
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert inner.started.wait(10)
+    try:
+        assert not store.pending
+        assert answers(store) == {'q1': 'yes'}
+        store.save_many([('u1', 's1', response('q2', 'no'))])
+        assert answers(store) == {'q1': 'yes', 'q2': 'no'}
+    finally:
+        inner.release.set()
+        flusher.join()
+
+    assert answers(store) == {'q1': 'yes', 'q2': 'no'}
+    store.close()
+    assert answers(SQLiteResponseStore(paths[0])) == {'q1': 'yes', 'q2': 'no'}
+
+
+def test_failed_flush_keeps_newer_answers(paths):
+    inner = BlockingStore(paths[0])
+    inner.fail = True
+    store = WriteBehindResponseStore(inner, max_batch=1000, max_delay=60.0, journal_path=paths[1])
+    store.save_many([('u1', 's1', response('q1', 'old')), ('u1', 's1', response('q2', 'kept'))])
+
+    errors = []
+
+    def flush():
+        try:
+            store.flush()
+        except IOError as e:
+            errors.append(e)
+
+    flusher = threading.Thread(target=flush)
+    flusher.start()
+    assert inner.started.wait(10)
+    store.save_many([('u1', 's1', response('q1', 'new'))])
+    inner.release.set()
+    flusher.join()
+
+    assert errors and store.stats()['failed_flushes'] == 1
+    assert answers(store) == {'q1': 'new', 'q2': 'kept'}
+    assert not os.path.exists(store.journal_file + '.flushing')
+    with open(store.journal_file, encoding='utf-8') as journal:
+        replay_order = [(entry['question_id'], entry['answer']) for entry in map(json.loads, journal)]
+    assert replay_order == [('q2', 'kept'), ('q1', 'new')]
+
+    inner.fail = False
+    store.close()
+    assert answers(SQLiteResponseStore(paths[0])) == {'q1': 'new', 'q2': 'kept'}
+
+
+def test_save_after_close_raises(paths):
+    store = open_store(paths)
+    store.close()
+
+    with pytest.raises(RuntimeError):
+        store.save_many([('u1', 's1', response('q1', 'yes'))])
+
+
+def test_close_removes_journal_and_lock(paths):
+    store = open_store(paths)
+    store.save_many([('u1', 's1', response('q1', 'yes'))])
+    store.close()
+
+    directory = os.path.dirname(paths[0])
+    assert not [name for name in os.listdir(directory) if name.startswith('responses.journal')]
+
+
+def test_journal_of_crashed_process_is_replayed(paths):
+    script = (
+        "import os, sys\n"
+        "sys.path.insert(0, {root!r})\n"
+        "from nca_questionnaire.models import UserResponse\n"
+        "from nca_questionnaire.store import SQLiteResponseStore, WriteBehindResponseStore\n"
+        "store = WriteBehindResponseStore(SQLiteResponseStore({db!r}), max_batch=1000, max_delay=60.0,\n"
+        "                                 journal_path={journal!r})\n"
+        "store.save_many([('u1', 's1', UserResponse('q1', 'first', 't1')),\n"
+        "                 ('u1', 's1', UserResponse('q1', 'second', 't2'))])\n"
+        "os._exit(0)\n"
+    ).format(root=ROOT, db=paths[0], journal=paths[1])
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=60)
+    assert answers(SQLiteResponseStore(paths[0])) == {}
+
+    store = open_store(paths)
+    assert answers(store.store) == {'q1': 'second'}
+    store.close()
+
+    reopened = open_store(paths)
+    assert answers(reopened.store) == {'q1': 'second'}
+    reopened.close()
+
+
+def test_journal_of_live_store_is_not_replayed(paths):
+    first = open_store(paths)
+    first.save_many([('u1', 's1', response('q1', 'yes'))])
+
+    second = open_store(paths)
+    assert answers(second.store) == {}
+    assert os.path.exists(first.journal_file)
+    second.close()
+
+    first.close()
+    assert answers(SQLiteResponseStore(paths[0])) == {'q1': 'yes'}